@@ -0,0 +1,122 @@
+"""
+Compare the RemateID set operations of `classify` on Python sets and on numpy code arrays.
+
+Run from the repo root:
+
+    python -m cumplo_sanitizer.benchmarks.classify_codes --rows 200000 --investments 20000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from cumplo_sanitizer.benchmarks.string_dtypes import synthetic_exports
+from cumplo_sanitizer.src import cumplo_core, cumplo_ids, cumplo_pipeline
+
+# Flows per investment on the synthetic flow schedule, and their statuses
+_FLOWS = 6
+_STATUSES = ["on-time", "late-paid", "pending", "future"]
+
+
+def synthetic_inputs(rows: int, investments: int, seed: int = 0) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Movements with 'RemateID' (as `classify` gets them) and a random flow schedule for
+    `investments` investments; a tenth of them are not on the flows.
+    """
+    rng = np.random.default_rng(seed)
+    movs_df, flows_df = synthetic_exports(rows, investments, seed)
+    movs_df = cumplo_pipeline.extract_remate_ids(cumplo_pipeline.extract_solicitud(movs_df))
+
+    scheduled = flows_df["ID"].to_numpy()[: investments - investments // 10]
+    flow_schedule = pd.DataFrame(
+        {
+            "RemateID": np.repeat(scheduled, _FLOWS),
+            "due_date": pd.Timestamp("2022-01-05")
+            + pd.to_timedelta(rng.integers(0, 1200, len(scheduled) * _FLOWS), unit="D"),
+            "amount": 10000.0,
+            "status": rng.choice(_STATUSES, len(scheduled) * _FLOWS, p=[0.6, 0.1, 0.05, 0.25]),
+        }
+    )
+    return movs_df, flow_schedule
+
+
+def _timed(function, *args) -> (float, object):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def _python_sets(all_ids, flow_ids, active_ids, late_ids, uncollectible_ids, unexecuted_ids):
+    # The set arithmetic `classify` did before, over np.int32 codes
+    not_present_in_flows_ids = set(all_ids) - set(flow_ids)
+    active_ids = set(active_ids) - set(unexecuted_ids)
+    late_ids = set(late_ids) - set(unexecuted_ids)
+    late_but_collectibles = late_ids - (set(uncollectible_ids) - set(unexecuted_ids))
+    completed_ids = set(all_ids) - active_ids - set(unexecuted_ids) - late_but_collectibles
+    return len(not_present_in_flows_ids), len(completed_ids)
+
+
+def _numpy_sets(all_ids, flow_ids, active_ids, late_ids, uncollectible_ids, unexecuted_ids):
+    not_present_in_flows_ids = np.setdiff1d(all_ids, flow_ids)
+    active_ids = np.setdiff1d(active_ids, unexecuted_ids)
+    late_ids = np.setdiff1d(late_ids, unexecuted_ids)
+    late_but_collectibles = np.setdiff1d(late_ids, np.setdiff1d(uncollectible_ids, unexecuted_ids))
+    completed_ids = np.setdiff1d(
+        all_ids, np.concatenate([active_ids, unexecuted_ids, late_but_collectibles])
+    )
+    return len(not_present_in_flows_ids), len(completed_ids)
+
+
+def run(movs_df: pd.DataFrame, flow_schedule: pd.DataFrame) -> dict:
+    """
+    Time the encoding and the set operations of `classify`, and `classify` itself, with a
+    new registry and with one kept across calls (as `cumplo_worker.Worker` does).
+    """
+    timings = {}
+    registry = cumplo_ids.RemateIDRegistry.from_ids([])
+    timings["encode_adding, new registry"], (codes, schedule_codes) = _timed(
+        registry.encode_adding, movs_df["RemateID"], flow_schedule["RemateID"]
+    )
+    timings["encode_adding, kept registry"], _ = _timed(
+        registry.encode_adding, movs_df["RemateID"], flow_schedule["RemateID"]
+    )
+
+    coded_df = movs_df[["Fecha", "Descripción", "Cargo", "Abono"]].assign(RemateID=codes)
+    known_df = coded_df[codes != cumplo_ids.MISSING_CODE]
+    flow_ids, active_ids, late_ids, uncollectible_ids = (
+        np.asarray(ids, dtype=np.int32)
+        for ids in cumplo_core.ids_from_flow_schedule(
+            flow_schedule.assign(RemateID=schedule_codes), 60
+        )
+    )
+    unexecuted_ids = np.asarray(cumplo_core.extract_unexecuted(known_df, 200), dtype=np.int32)
+    ids = (np.unique(codes), flow_ids, active_ids, late_ids, uncollectible_ids, unexecuted_ids)
+    timings["set operations, python sets"], expected = _timed(_python_sets, *ids)
+    timings["set operations, numpy"], result = _timed(_numpy_sets, *ids)
+    assert result == expected, (result, expected)
+
+    timings["classify, new registry"], _ = _timed(
+        cumplo_pipeline.classify, movs_df.copy(), flow_schedule
+    )
+    timings["classify, kept registry"], _ = _timed(
+        lambda: cumplo_pipeline.classify(movs_df.copy(), flow_schedule, registry=registry)
+    )
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--investments", type=int, default=20_000)
+    args = parser.parse_args()
+
+    movs_df, flow_schedule = synthetic_inputs(args.rows, args.investments)
+    results = pd.Series(run(movs_df, flow_schedule), name="seconds")
+    print(f"{args.rows} movements, {args.investments} investments")
+    print(results.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compare 'object' and 'string[pyarrow]' text columns on the sanitize stages.
+
+Run from the repo root:
+
+    python -m cumplo_sanitizer.benchmarks.string_dtypes --rows 200000 --investments 2000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_pipeline, some_utils
+
+# Description templates, as found on 'Resumen de movimientos'
+_TEMPLATES = [
+    "Inversión, solicitud: {solicitud}",
+    "Pago de inversión, solicitud: {solicitud}",
+    "Pago de inversión, solicitud: {solicitud}",
+    "Pago de inversión, solicitud: {solicitud}",
+    "Devolución de fondos por crédito no concretado, solicitud: {solicitud}",
+]
+
+
+def synthetic_exports(rows: int, investments: int, seed: int = 0) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Random movements and flows (as `load_movements`/`load_flows` return them, with
+    'object' text columns) for `investments` investments.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.arange(10000, 10000 + investments)
+    solicitudes = [
+        (
+            f"Crédito Empresa Número {remate_id} {remate_id}"
+            if remate_id % 3
+            else f"Crédito Pyme {remate_id}"
+        )
+        for remate_id in ids
+    ]
+    flows_df = pd.DataFrame({"ID": ids.astype(str), "Solicitud": solicitudes})
+
+    investment = rng.integers(0, investments, rows)
+    template = rng.integers(0, len(_TEMPLATES), rows)
+    movs_df = pd.DataFrame(
+        {
+            "Fecha": pd.Timestamp("2020-01-01")
+            + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D"),
+            "Descripción": [
+                _TEMPLATES[t].format(solicitud=solicitudes[i]) for t, i in zip(template, investment)
+            ],
+            "Cargo": np.where(template == 0, 100000, 0),
+            "Abono": np.where(template == 0, 0, rng.integers(1000, 50000, rows)),
+        }
+    )
+    return movs_df, flows_df
+
+
+def _timed(function, *args) -> (float, object):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def run(movs_df: pd.DataFrame, flows_df: pd.DataFrame, dtype: str) -> dict:
+    """
+    Time the sanitize stages, and a few full column `.str` calls, with text columns as `dtype`.
+    """
+    movs_df = movs_df.astype({"Descripción": dtype})
+    flows_df = flows_df.astype({"ID": dtype, "Solicitud": dtype})
+
+    timings = {}
+    timings["extract_solicitud"], movs_df = _timed(cumplo_pipeline.extract_solicitud, movs_df)
+    timings["extract_remate_ids"], movs_df = _timed(cumplo_pipeline.extract_remate_ids, movs_df)
+    timings["resolve_ids_from_flows"], movs_df = _timed(
+        cumplo_pipeline.resolve_ids_from_flows, movs_df, flows_df, False
+    )
+    timings["extract_actors"], movs_df = _timed(cumplo_pipeline.extract_actors, movs_df)
+
+    # The same `.str` calls over every row, without `some_utils.apply_on_uniques`
+    descriptions = movs_df["Descripción"]
+    timings["full column .str.startswith"], _ = _timed(
+        lambda: descriptions.str.startswith("Pago de inversión")
+    )
+    timings["full column .str.split"], _ = _timed(lambda: descriptions.str.split().str[-1])
+    timings["full column .str.extract"], _ = _timed(
+        lambda: descriptions.str.extract(cumplo_pipeline.SOLICITUD_PATTERNS[0])
+    )
+
+    text_columns = ["Descripción", "Solicitud", "RemateID", "Actor"]
+    timings["memory (MB)"] = movs_df[text_columns].memory_usage(deep=True).sum() / 1e6
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--investments", type=int, default=2_000)
+    args = parser.parse_args()
+
+    movs_df, flows_df = synthetic_exports(args.rows, args.investments)
+    results = pd.DataFrame(
+        {dtype: run(movs_df, flows_df, dtype) for dtype in ["object", some_utils.STRING_DTYPE]}
+    )
+    results["ratio"] = results[some_utils.STRING_DTYPE] / results["object"]
+    print(f"{args.rows} movements, {args.investments} investments (seconds, unless noted)")
+    print(results.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import collections
+import copy
+import hashlib
+import inspect
+import json
+import os
+import shutil
+from os import path
+
+import pandas as pd
+
+# Extension of the cached stage outputs
+CACHE_EXTENSION = "pkl"
+
+# Bytes read at once when hashing files
+_CHUNK_SIZE = 1 << 20
+
+
+def file_fingerprint(file_path: str) -> str:
+    """
+    Return the sha256 of the contents of a file ('missing' when it does not exist).
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the file (ie: an export or the 'fix_data.csv').
+
+    Returns
+    -------
+    str
+        The hex digest of the file contents.
+    """
+    if file_path is None or not path.exists(file_path):
+        return "missing"
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_fingerprint(*modules) -> str:
+    """
+    Return a sha256 of the source code of the given modules, used as the code version.
+
+    Examples
+    --------
+    >>> code_fingerprint(cumplo_core, some_utils)
+    """
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    On-disk memoization of the pipeline stage outputs.
+
+    Each output is stored on '<cache_dir>/<stage>/<key>.pkl', where the key is a hash of the
+    stage name, the code version, the stage parameters and the key of the upstream stage
+    (or the fingerprints of the input files, for the first one). As every key depends on
+    the upstream one, changing a stage parameter (or an input) gives new keys to that stage
+    and all the downstream ones, while the upstream outputs are still found on disk.
+
+    Outputs are pickled so dtypes (ie: `some_utils.STRING_DTYPE`) and indexes are kept as
+    they are; only load caches written by yourself.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Folder where the outputs are stored (created when needed).
+    code_version : str, optional
+        Part of every key; use `code_fingerprint` of the modules the stages run.
+
+    Examples
+    --------
+    >>> cache = StageCache("./data_out/cache/", code_fingerprint(cumplo_pipeline))
+    >>> key = cache.key("classify", upstream_key, despreciable_amount=200)
+    >>> movs_df = cache.load("classify", key)
+    >>> if movs_df is None:
+    ...     movs_df = cache.save("classify", key, classify(upstream_df, flow_schedule))
+    """
+
+    def __init__(self, cache_dir: str, code_version: str = ""):
+        self.cache_dir = cache_dir
+        self.code_version = code_version
+
+    def key(self, stage: str, upstream: str | None = None, **parameters) -> str:
+        """
+        Return the key of a stage output.
+
+        Parameters
+        ----------
+        stage : str
+            The stage name.
+        upstream : str, optional
+            The key of the upstream stage output.
+        **parameters
+            The stage parameters (any JSON serializable value, or with a `str`
+            representation, as dates).
+        """
+        payload = json.dumps(
+            {
+                "stage": stage,
+                "upstream": upstream,
+                "code_version": self.code_version,
+                "parameters": parameters,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def path(self, stage: str, key: str) -> str:
+        """Return the path of a stage output."""
+        return path.join(self.cache_dir, stage, f"{key}.{CACHE_EXTENSION}")
+
+    def has(self, stage: str, key: str) -> bool:
+        """Return True when the stage output is on disk."""
+        return path.exists(self.path(stage, key))
+
+    def load(self, stage: str, key: str):
+        """Return the stored stage output, or None when it is not on disk."""
+        if not self.has(stage, key):
+            return None
+        return pd.read_pickle(self.path(stage, key))
+
+    def save(self, stage: str, key: str, value):
+        """
+        Store a stage output and return it.
+
+        The output is written to a temporary file first, and then renamed, so an interrupted
+        run never leaves a half written output.
+        """
+        output_path = self.path(stage, key)
+        os.makedirs(path.dirname(output_path), exist_ok=True)
+
+        temporary_path = f"{output_path}.{os.getpid()}.tmp"
+        pd.to_pickle(value, temporary_path)
+        os.replace(temporary_path, output_path)
+        return value
+
+    def clear(self, stage: str | None = None) -> None:
+        """Remove the stored outputs of a stage (or of every stage)."""
+        folder = self.cache_dir if stage is None else path.join(self.cache_dir, stage)
+        if path.exists(folder):
+            shutil.rmtree(folder)
+
+
+class MemoryStageCache(StageCache):
+    """
+    A `StageCache` that keeps the outputs in memory instead of on disk (ie: on a long
+    running worker), with the same keys.
+
+    Outputs are copied when stored and when loaded, as the stages modify their input frames
+    in place. Only the `max_entries` most recently used outputs are kept.
+
+    Examples
+    --------
+    >>> cache = MemoryStageCache(code_fingerprint(cumplo_pipeline), max_entries=32)
+    >>> movs_df, flow_schedule = cumplo_pipeline.run_stages(movs_path, flows_path, cache)
+    """
+
+    def __init__(self, code_version: str = "", max_entries: int = 64):
+        super().__init__(cache_dir=None, code_version=code_version)
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def has(self, stage: str, key: str) -> bool:
+        return (stage, key) in self._entries
+
+    def load(self, stage: str, key: str):
+        if not self.has(stage, key):
+            return None
+        self._entries.move_to_end((stage, key))
+        return copy.deepcopy(self._entries[(stage, key)])
+
+    def save(self, stage: str, key: str, value):
+        self._entries[(stage, key)] = copy.deepcopy(value)
+        self._entries.move_to_end((stage, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self, stage: str | None = None) -> None:
+        for entry in [entry for entry in self._entries if stage is None or entry[0] == stage]:
+            del self._entries[entry]
@@ -0,0 +1,239 @@
+import datetime
+import os
+from os import path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# Per-investment summary of the last run, to diff the next one against
+SUMMARY_FILE_NAME = "estado_summary.feather"
+# Folder of the change feed; one arrow file per run with changes, never rewritten
+CHANGES_DIR_NAME = "estado_changes"
+# Name of each log file, from the run timestamp
+RUN_FILE_FORMAT = "%Y%m%dT%H%M%S%f"
+
+# Smallest 'net' change that counts (half a cent); sums in another order differ a bit
+NET_TOLERANCE = 0.005
+
+SUMMARY_COLUMNS = ["RemateID", "Estado", "net", "first_seen", "last_seen"]
+CHANGES_SCHEMA = pa.schema(
+    [
+        ("run_at", pa.timestamp("us")),
+        ("RemateID", pa.string()),
+        ("old_estado", pa.string()),
+        ("new_estado", pa.string()),
+        ("old_net", pa.float64()),
+        ("new_net", pa.float64()),
+        ("net_delta", pa.float64()),
+        ("first_seen", pa.timestamp("ns")),
+        ("last_seen", pa.timestamp("ns")),
+    ]
+)
+
+
+def estado_summary(movs_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarize the classified movements, one row per investment.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        The classified movements, with columns 'RemateID', 'Estado', 'Fecha', 'Abono' and
+        'Cargo'.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns 'RemateID', 'Estado', 'net' ('Abono' - 'Cargo'), 'first_seen' and 'last_seen'
+        (first and last 'Fecha'), sorted by 'RemateID'. Movements without 'RemateID' are
+        left out.
+    """
+    movs_df = movs_df.dropna(subset=["RemateID"])
+    summary = (
+        movs_df.assign(
+            RemateID=movs_df["RemateID"].astype(str),
+            Estado=movs_df["Estado"].astype(str),
+            net=movs_df["Abono"].astype(float) - movs_df["Cargo"].astype(float),
+        )
+        .groupby("RemateID", sort=True)
+        .agg(
+            Estado=("Estado", "first"),
+            net=("net", "sum"),
+            first_seen=("Fecha", "min"),
+            last_seen=("Fecha", "max"),
+        )
+        .reset_index()
+    )
+    return summary[SUMMARY_COLUMNS]
+
+
+def diff_summaries(
+    previous: pd.DataFrame, current: pd.DataFrame, run_at: datetime.datetime
+) -> pd.DataFrame:
+    """
+    Compare two `estado_summary` outputs, and return the investments that changed.
+
+    Parameters
+    ----------
+    previous, current : pd.DataFrame
+        Summaries of the previous and the current runs.
+    run_at : datetime.datetime
+        Timestamp of the current run, stored on every change.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per investment whose 'Estado' or 'net' (by more than `NET_TOLERANCE`)
+        changed (new investments included, with a missing 'old_estado'; and investments no
+        longer on the output, with a missing 'new_estado'), with the columns of
+        `CHANGES_SCHEMA`. 'first_seen' and 'last_seen'
+        come from the current run, or from the previous one when the investment is gone.
+
+    Examples
+    --------
+    >>> changes = diff_summaries(previous, current, datetime.datetime.now())
+    >>> changes[(changes["old_estado"] == "Active") & (changes["new_estado"] == "Uncollectible")]
+    """
+    joined = pd.merge(
+        previous.astype({"RemateID": str, "Estado": object}),
+        current.astype({"RemateID": str, "Estado": object}),
+        on="RemateID",
+        how="outer",
+        suffixes=("_old", "_new"),
+        sort=True,
+    )
+    old_net = joined["net_old"].astype(float)
+    new_net = joined["net_new"].astype(float)
+    estado_changed = joined["Estado_old"].fillna("") != joined["Estado_new"].fillna("")
+    net_changed = ~np.isclose(old_net.fillna(0), new_net.fillna(0), rtol=0, atol=NET_TOLERANCE)
+    changed = estado_changed | net_changed
+    joined, old_net, new_net = joined[changed], old_net[changed], new_net[changed]
+
+    changes = pd.DataFrame(
+        {
+            "run_at": pd.Timestamp(run_at),
+            "RemateID": joined["RemateID"],
+            "old_estado": joined["Estado_old"],
+            "new_estado": joined["Estado_new"],
+            "old_net": old_net,
+            "new_net": new_net,
+            "net_delta": new_net.fillna(0) - old_net.fillna(0),
+            "first_seen": joined["first_seen_new"].fillna(joined["first_seen_old"]),
+            "last_seen": joined["last_seen_new"].fillna(joined["last_seen_old"]),
+        },
+        columns=CHANGES_SCHEMA.names,
+    )
+    return changes.reset_index(drop=True)
+
+
+def append_changes(changes: pd.DataFrame, changes_dir: str) -> str:
+    """
+    Append a run's changes to the change feed, as a new arrow file on `changes_dir`.
+
+    Returns
+    -------
+    str
+        The path to the written file, or None when there are no changes.
+    """
+    if changes.empty:
+        return None
+    os.makedirs(changes_dir, exist_ok=True)
+    run_at = pd.Timestamp(changes["run_at"].iloc[0])
+    file_path = path.join(changes_dir, f"{run_at.strftime(RUN_FILE_FORMAT)}.arrow")
+
+    table = pa.Table.from_pandas(changes, schema=CHANGES_SCHEMA, preserve_index=False)
+    tmp_path = f"{file_path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, CHANGES_SCHEMA) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def record_changes(
+    movs_df: pd.DataFrame, data_out_folder: str, run_at: datetime.datetime | None = None
+) -> pd.DataFrame:
+    """
+    Diff the classified movements against the previous run, and append the changes to the
+    change feed.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        The classified movements of this run.
+    data_out_folder : str
+        Folder with the output; the summary of the last run ('estado_summary.feather') and
+        the change feed ('estado_changes/') are kept there.
+    run_at : datetime.datetime, optional
+        Timestamp of the run (default is now).
+
+    Returns
+    -------
+    pd.DataFrame
+        The changes of this run (see `diff_summaries`). The first run (without a previous
+        summary) only stores its summary, and has no changes; otherwise the whole portfolio
+        would be in the feed as new investments.
+
+    Description
+    -----------
+    Only the per-investment summaries are compared (a keyed join on 'RemateID'), never the
+    full outputs, and the summary of this run replaces the previous one afterwards.
+    The change feed is append only: each run with changes adds a small arrow file, so
+    alerting reads the changes (see `load_changes`) instead of the full output.
+
+    Examples
+    --------
+    >>> record_changes(movs_df, "./data_out/")
+    >>> load_changes("./data_out/", new_estados=["Uncollectible"])
+    """
+    run_at = datetime.datetime.now() if run_at is None else run_at
+    summary_path = path.join(data_out_folder, SUMMARY_FILE_NAME)
+    current = estado_summary(movs_df)
+    previous = pd.read_feather(summary_path) if path.exists(summary_path) else current
+    changes = diff_summaries(previous, current, run_at)
+    append_changes(changes, path.join(data_out_folder, CHANGES_DIR_NAME))
+
+    current.to_feather(f"{summary_path}.tmp")
+    os.replace(f"{summary_path}.tmp", summary_path)
+    return changes
+
+
+def load_changes(
+    data_out_folder: str,
+    since: datetime.datetime | None = None,
+    new_estados: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Load the change feed, optionally filtered.
+
+    Parameters
+    ----------
+    data_out_folder : str
+        Folder with the output (see `record_changes`).
+    since : datetime.datetime, optional
+        Only load the changes of runs at or after this timestamp.
+    new_estados : list[str], optional
+        Only load the changes to these 'Estado' values.
+
+    Returns
+    -------
+    pd.DataFrame
+        The changes, in run order.
+    """
+    changes_dir = path.join(data_out_folder, CHANGES_DIR_NAME)
+    files = sorted(
+        path.join(changes_dir, name)
+        for name in (os.listdir(changes_dir) if path.isdir(changes_dir) else [])
+        if name.endswith(".arrow")
+    )
+    if since is not None:
+        # Log files are named after their run, skip the older ones without opening them
+        first = pd.Timestamp(since).strftime(RUN_FILE_FORMAT)
+        files = [file_path for file_path in files if path.basename(file_path) >= first]
+
+    filter_expr = None
+    if new_estados is not None:
+        filter_expr = ds.field("new_estado").isin(list(new_estados))
+    dataset = ds.dataset(files, schema=CHANGES_SCHEMA, format="arrow")
+    return dataset.to_table(filter=filter_expr).to_pandas()
@@ -12,6 +12,41 @@ from pyxirr import InvalidPaymentsError, xirr
 # from cumplo_sanitizer.src import some_utils ## works for tests but it doesnt work for jypyter!!
 from . import some_utils
 
+# Flows sheet layout; one header line with the payment dates, and 5 footer (label) lines
+FLOWS_HEADER_LINES = 1
+FLOWS_FOOTER_LINES = 5
+
+# Flow cells text colors and meaning !!
+C_RED = "FFCE494F"  # red | pending!!
+C_GRAY = "FF808080"  # gray | expected, future payment
+C_GREEN = "FF95BB65"  # green | payment on time!!
+C_ORANGE = "FFFFA500"  # orange | payment late, but payed :)
+
+# Status of each flow on the flow schedule, by text color
+FLOW_STATUSES = {
+    C_GRAY: "future",
+    C_RED: "pending",
+    C_GREEN: "on-time",
+    C_ORANGE: "late-paid",
+}
+
+# Header of the manual fixes csv (see `insert_fix`)
+FIX_DATA_HEADER = ["RemateID", "Actor", "Date_YYYY-MM-DD", "Abono", "Cargo"]
+
+# Negative balance from which a completed investment can be uncollectible
+UNCOLLECTIBLE_AMOUNT = 1000
+
+# Movements with this description (prefix) are refunds of investments that never happened
+REFUND_PREFIX = "Devolución de fondos por crédito no concretado"
+
+# Order in which `cumplo_pipeline.classify` (the reference implementation) assigns the
+# 'Estado's; each one overrides the ones before it, ie: an Active investment that is also
+# Uncollectible is Uncollectible. `cumplo_sweep` and `cumplo_polars` follow it too
+ESTADO_PRECEDENCE = ["Unexecuted", "Completed", "Active", "Uncollectible"]
+
+# Granularities accepted by `forecast_inflows`, as pandas period aliases (weeks start on Monday)
+FORECAST_PERIODS = {"week": "W", "month": "M"}
+
 
 def find_negative_earning_ids(movs: pd.DataFrame) -> list[str]:
     """
@@ -161,6 +196,14 @@ def insert_fix(original_df: pd.DataFrame, fixdata_csv_path: str) -> pd.DataFrame
         new_rows.append(row)
 
     fixes_df = pd.DataFrame(new_rows)
+
+    # Keep the string dtypes of the original columns (ie: 'string[pyarrow]')
+    string_dtypes = {
+        column: dtype
+        for column, dtype in original_df.dtypes.items()
+        if column in fixes_df.columns and isinstance(dtype, pd.StringDtype)
+    }
+    fixes_df = fixes_df.astype(string_dtypes)
     new_df = pd.concat([original_df, fixes_df])
     new_df = new_df.reset_index(drop=True)
     return new_df
@@ -291,22 +334,81 @@ def explore_by_id(df: pd.DataFrame, filter_by_ids: list[str] = None):
     widgets.interact(_interactive_df, index_text_value=index_text)
 
 
-def extract_active_and_late_ids(
-    flows_file_path: str, grace_period_days
-) -> (list[str], list[str], list[str], list[str]):
+def extract_flow_schedule(flows_file_path: str) -> pd.DataFrame:
     """
-    Analyze a spreadsheet of financial flows and categorize investments based on their status.
+    Read the flows spreadsheet as a long table, with one row per flow and its payment status.
 
-    The function reads from an Excel file, identifying investments as 'active', 'late',
-    or 'uncollectible' based on their payment status, which is indicated by the text color
-    in the spreadsheet. It categorizes investments into these groups and returns lists
-    of IDs for each category.
+    The flows sheet has one row per investment and one column per payment date; the
+    status of each flow is encoded in its text color. This function scans the sheet once
+    and returns a tidy table, so schedule questions can be answered with vectorized queries
+    instead of parsing the workbook again.
 
     Parameters
     ----------
     flows_file_path : str
         The path to the Excel file containing the flow data.
 
+    Returns
+    -------
+    pd.DataFrame
+        A DataFrame with columns:
+        - 'RemateID': the investment id (str).
+        - 'due_date': the payment date of the flow (column header).
+        - 'amount': the expected amount (cell value, NaN if the cell is empty).
+        - 'status': 'future' (gray), 'pending' (red), 'on-time' (green) or
+          'late-paid' (orange).
+
+    Notes
+    -----
+    - Cells with other text colors (like the zeros between flows) are not flows.
+    - Use `cumplo_storage.save_flow_schedule` to store the table as arrow.
+
+    Examples
+    --------
+    >>> schedule = extract_flow_schedule('path/to/flows.xlsx')
+    >>> schedule.query("status == 'pending'").groupby("RemateID")["amount"].sum()
+    # Pending amount per investment.
+    """
+    workbook = openpyxl.load_workbook(flows_file_path, data_only=True)
+    sheet = workbook.active
+
+    due_dates = [cell.value for cell in sheet[FLOWS_HEADER_LINES]]
+    records = []
+    # Skip headers and footer (label) lines!
+    for row in sheet.iter_rows(
+        min_row=1 + FLOWS_HEADER_LINES, max_row=sheet.max_row - FLOWS_FOOTER_LINES
+    ):
+        if row[0].value is None:
+            continue
+        # get row-investment_id
+        r_id = str(int(row[0].value))
+        for column, cell in enumerate(row):
+            font_color = cell.font.color
+            if font_color is None or font_color.rgb not in FLOW_STATUSES:
+                continue
+            amount = cell.value if cell.value not in (None, "") else float("nan")
+            records.append((r_id, due_dates[column], amount, FLOW_STATUSES[font_color.rgb]))
+
+    # Close file!
+    workbook.close()
+
+    flow_schedule = pd.DataFrame(records, columns=["RemateID", "due_date", "amount", "status"])
+    flow_schedule["due_date"] = pd.to_datetime(flow_schedule["due_date"])
+    flow_schedule["amount"] = flow_schedule["amount"].astype(float)
+    return flow_schedule
+
+
+def ids_from_flow_schedule(
+    flow_schedule: pd.DataFrame, grace_period_days: int
+) -> (list[str], list[str], list[str], list[str]):
+    """
+    Categorize investments as active, late or uncollectible from their flow schedule.
+
+    Parameters
+    ----------
+    flow_schedule : pd.DataFrame
+        The flow schedule, as returned by `extract_flow_schedule`.
+
     grace_period_days : int
         The number of days to use as the grace period when determining if an investment
         is uncollectible.
@@ -315,95 +417,195 @@ def extract_active_and_late_ids(
     -------
     tuple of list[str]
         A tuple containing four lists:
-        1. All investment IDs found in the document.
+        1. All investment IDs found in the schedule.
         2. IDs of active investments (payments expected in the future).
         3. IDs of late investments (payments overdue but not yet declared uncollectible).
         4. IDs of uncollectible investments (payments overdue beyond the grace period).
 
     Notes
     -----
-    - This function relies on the 'openpyxl' library to read the Excel file.
+    - Flows without amount (empty cells) are not taken into account to categorize.
     - The function uses the 'is_date_past_grace_period' method from 'some_utils'
-      to determine if an investment is uncollectible.
-    - Text colors in the spreadsheet are used to determine the status of payments:
-      'gray' for active, 'red' for late, and other colors are not considered in this context.
+      (once per distinct due date) to determine if an investment is uncollectible.
 
     Examples
     --------
-    >>> extract_active_and_late_ids('path/to/flows.xlsx', 30)
+    >>> ids_from_flow_schedule(extract_flow_schedule('path/to/flows.xlsx'), 30)
     # Returns four lists of investment IDs categorized as all, active, late, and uncollectible.
     """
-    # Active means at least one flow in gray (text color = gray)
-    # Late  means at least one flow in red (text color = red)
+    # Active means at least one flow in gray (future)
+    # Late  means at least one flow in red (pending)
     # uncollectible are all those investments that have a 'late' flow older than 'grace_period_days'
+    all_ids = flow_schedule["RemateID"].unique()
+    flows = flow_schedule[flow_schedule["amount"].notna()]
 
-    # Colors and meaning !!
-    c_red = "FFCE494F"  # red | pending!!
-    c_gray = "FF808080"  # gray | expected, future payment
-    # c_green = 'FF95BB65' # green | payment on time!!
-    # c_orange = 'FFFFA500' # orange | payment late, but payed :)
+    active_ids = flows.loc[flows["status"] == "future", "RemateID"].unique()
 
-    workbook = openpyxl.load_workbook(flows_file_path, data_only=True)
-    sheet = workbook.active
+    pending = flows[flows["status"] == "pending"]
+    late_ids = pending["RemateID"].unique()
 
-    # Store all ids on document.
-    # Some investment that are recently payed could not be registered here,
-    # so we will have to know what ids exist in the dococument
-    all_ids = set()
-
-    # Get those that are currentlty active and on track
-    # ie, it has 'future payments' => *grey* cells!
-    active_ids = set()
-
-    # Also, we know that *red* cells means a positive flow that never happend
-    late_ids = set()
-
-    # And for those that are late, we will compare the late flow with the current date and
-    # see if the diference is more than `grace_period_days`.
-    # If its more than that, we declare the investment as uncollectible :(
-    uncollectible_ids = set()
-
-    # row range starts on '2' to skip headers!
-    sheet_headers_lines = 1
-    sheet_footer_lines = 5
-    # On Pandas; when possible; iterate over each column and then check each row.
-    # This provides a better performance (here ~5x aprox!).
-    for column in range(1, sheet.max_column + 1):
-        for row in range(1 + sheet_headers_lines, sheet.max_row + 1 - sheet_footer_lines):
-            cell = sheet.cell(row=row, column=column)
-            if cell.value is None or cell.value == "":
-                continue
+    is_uncollectible = some_utils.apply_on_uniques(
+        pending["due_date"],
+        lambda date: some_utils.is_date_past_grace_period(grace_period_days, date),
+        elementwise=True,
+    )
+    uncollectible_ids = pending.loc[is_uncollectible.astype(bool), "RemateID"].unique()
 
-            font_color = cell.font.color
-            if font_color is None:
-                continue
+    # return elements as lists
+    return (list(all_ids), list(active_ids), list(late_ids), list(uncollectible_ids))
 
-            # get row-investment_id
-            id = str(int(sheet.cell(row=row, column=1).value))
 
-            # store this id in the all_ids set...
-            all_ids.add(id)
+def expected_inflows(flow_schedule: pd.DataFrame, late_haircut: float = 0.0) -> pd.DataFrame:
+    """
+    Turn the future (gray) flows of the flow schedule into dated expected inflows.
 
-            # Some payment for the future => Currently active
-            if font_color.rgb == c_gray:
-                active_ids.add(id)
-                continue
+    Parameters
+    ----------
+    flow_schedule : pd.DataFrame
+        The flow schedule, as returned by `extract_flow_schedule`.
+    late_haircut : float, optional
+        Fraction (0 to 1) taken off the future flows of late investments, those with a
+        pending (red) flow (default is 0, no haircut).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per future flow with amount, sorted by 'due_date' and 'RemateID', with
+        columns 'RemateID', 'due_date', 'amount', 'late' (the investment has a pending
+        flow) and 'expected' ('amount', minus the haircut when late).
+
+    Raises
+    ------
+    ValueError
+        If `late_haircut` is not between 0 and 1.
+
+    Notes
+    -----
+    Late investments are found as `ids_from_flow_schedule` does (a pending flow with
+    amount), on the same table; the workbook is not read again.
+    """
+    if not 0 <= late_haircut <= 1:
+        raise ValueError(f"late_haircut must be between 0 and 1, got {late_haircut}")
 
-            # Some late pending payment => (late_and_active and late_and_uncollectible...)
-            if font_color.rgb == c_red:
-                late_ids.add(id)
+    flows = flow_schedule[flow_schedule["amount"].notna()]
+    late_ids = flows.loc[flows["status"] == "pending", "RemateID"].unique()
 
-                # Check the date!
-                date = sheet.cell(row=1, column=column).value
-                is_uncollectible = some_utils.is_date_past_grace_period(grace_period_days, date)
+    inflows = flows.loc[flows["status"] == "future", ["RemateID", "due_date", "amount"]]
+    inflows = inflows.assign(late=inflows["RemateID"].isin(late_ids))
+    inflows["expected"] = inflows["amount"].where(
+        ~inflows["late"], inflows["amount"] * (1 - late_haircut)
+    )
+    return inflows.sort_values(["due_date", "RemateID"], kind="stable", ignore_index=True)
 
-                if is_uncollectible:
-                    uncollectible_ids.add(id)
 
-    # Close file!
-    workbook.close()
-    # return elements as lists
-    return (list(all_ids), list(active_ids), list(late_ids), list(uncollectible_ids))
+def forecast_inflows(
+    flow_schedule: pd.DataFrame,
+    period: str = "month",
+    actors: pd.Series = None,
+    late_haircut: float = 0.0,
+) -> pd.DataFrame:
+    """
+    Forecast the cash inflows by week or month (and 'Actor'), from the future flows.
+
+    Parameters
+    ----------
+    flow_schedule : pd.DataFrame
+        The flow schedule, as returned by `extract_flow_schedule`.
+    period : str, optional
+        'month' (default) or 'week' (weeks start on Monday).
+    actors : pd.Series, optional
+        'Actor' by 'RemateID' (ie: `movs_df.groupby("RemateID")["Actor"].first()`); when
+        given, the forecast is also split by 'Actor' (missing values for unknown IDs).
+    late_haircut : float, optional
+        Fraction (0 to 1) taken off the future flows of late investments (see
+        `expected_inflows`; default is 0).
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns 'period' (its first day), 'Actor' (only with `actors`), 'investments'
+        (number of investments), 'flows', 'amount' (as scheduled), 'late_amount' (the part
+        of it from late investments) and 'expected' (after the haircut).
+
+    Raises
+    ------
+    ValueError
+        If `period` is not one of `FORECAST_PERIODS`, or `late_haircut` is not between 0
+        and 1.
+
+    Examples
+    --------
+    >>> forecast_inflows(flow_schedule, "week", late_haircut=0.5)
+    >>> forecast_inflows(flow_schedule, actors=movs_df.groupby("RemateID")["Actor"].first())
+    """
+    if period not in FORECAST_PERIODS:
+        raise ValueError(f"Unknown period: {period}, use one of {list(FORECAST_PERIODS)}")
+
+    inflows = expected_inflows(flow_schedule, late_haircut)
+    inflows["period"] = inflows["due_date"].dt.to_period(FORECAST_PERIODS[period]).dt.start_time
+    inflows["late_amount"] = inflows["amount"].where(inflows["late"], 0.0)
+    keys = ["period"]
+    if actors is not None:
+        inflows["Actor"] = inflows["RemateID"].map(actors)
+        keys.append("Actor")
+
+    return (
+        inflows.groupby(keys, dropna=False, sort=True)
+        .agg(
+            investments=("RemateID", "nunique"),
+            flows=("amount", "size"),
+            amount=("amount", "sum"),
+            late_amount=("late_amount", "sum"),
+            expected=("expected", "sum"),
+        )
+        .reset_index()
+    )
+
+
+def extract_active_and_late_ids(
+    flows_file_path: str, grace_period_days
+) -> (list[str], list[str], list[str], list[str]):
+    """
+    Analyze a spreadsheet of financial flows and categorize investments based on their status.
+
+    The function reads from an Excel file, identifying investments as 'active', 'late',
+    or 'uncollectible' based on their payment status, which is indicated by the text color
+    in the spreadsheet. It categorizes investments into these groups and returns lists
+    of IDs for each category.
+
+    Parameters
+    ----------
+    flows_file_path : str
+        The path to the Excel file containing the flow data.
+
+    grace_period_days : int
+        The number of days to use as the grace period when determining if an investment
+        is uncollectible.
+
+    Returns
+    -------
+    tuple of list[str]
+        A tuple containing four lists:
+        1. All investment IDs found in the document.
+        2. IDs of active investments (payments expected in the future).
+        3. IDs of late investments (payments overdue but not yet declared uncollectible).
+        4. IDs of uncollectible investments (payments overdue beyond the grace period).
+
+    Notes
+    -----
+    - The spreadsheet is read with 'extract_flow_schedule', and the lists are derived from
+      that table with 'ids_from_flow_schedule'. When the schedule is already available,
+      use 'ids_from_flow_schedule' directly.
+    - Text colors in the spreadsheet are used to determine the status of payments:
+      'gray' for active, 'red' for late, and other colors are not considered in this context.
+
+    Examples
+    --------
+    >>> extract_active_and_late_ids('path/to/flows.xlsx', 30)
+    # Returns four lists of investment IDs categorized as all, active, late, and uncollectible.
+    """
+    flow_schedule = extract_flow_schedule(flows_file_path)
+    return ids_from_flow_schedule(flow_schedule, grace_period_days)
 
 
 def extract_unexecuted(df: pd.DataFrame, despreciable_amount: int) -> list[str]:
@@ -441,24 +643,12 @@ def extract_unexecuted(df: pd.DataFrame, despreciable_amount: int) -> list[str]:
     >>> extract_unexecuted(df, 50)
     # Returns a list of IDs, including 'ID2'.
     """
-    dfg = df.groupby("RemateID")
-
-    unexecuted_ids = set()
-    for group_key, df_group in dfg:
-        earnings = df_group["Abono"].sum()
-        cost = df_group["Cargo"].sum()
-        investment_diff = earnings - cost
+    is_refund = df["Descripción"].str.startswith(REFUND_PREFIX, na=False)
+    dfg = df.assign(is_refund=is_refund.astype(bool)).groupby("RemateID")
+    investment_diff = dfg["Abono"].sum() - dfg["Cargo"].sum()
 
-        if abs(investment_diff) <= abs(despreciable_amount):
-            unexecuted_ids.add(group_key)
-        elif (
-            df_group["Descripción"]
-            .str.startswith("Devolución de fondos por crédito no concretado")
-            .any()
-        ):
-            unexecuted_ids.add(group_key)
-
-    return list(unexecuted_ids)
+    unexecuted = (investment_diff.abs() <= abs(despreciable_amount)) | dfg["is_refund"].any()
+    return list(investment_diff.index[unexecuted])
 
 
 def extract_just_payed(
@@ -503,20 +693,15 @@ def extract_just_payed(
     df_not_in_flows = df[df["RemateID"].isin(not_present_in_flows_ids)]
 
     dfg = df_not_in_flows.groupby("RemateID")
+    investment_diff = dfg["Abono"].sum() - dfg["Cargo"].sum()
 
-    just_payed = set()
-    for group_key, df_group in dfg:
-        earnings = df_group["Abono"].sum()
-        cost = df_group["Cargo"].sum()
-        investment_diff = earnings - cost
-
-        if investment_diff <= -1 * abs(considerable_amount):
-            just_payed.add(group_key)
-
-    return list(just_payed)
+    just_payed = investment_diff <= -1 * abs(considerable_amount)
+    return list(investment_diff.index[just_payed])
 
 
-def extract_uncollectibles(df: pd.DataFrame, grace_period_days: int) -> list[str]:
+def extract_uncollectibles(
+    df: pd.DataFrame, grace_period_days: int, uncollectible_amount: int = UNCOLLECTIBLE_AMOUNT
+) -> list[str]:
     """
     Extracts IDs of investments considered uncollectible based on earnings, costs, and grace period.
 
@@ -535,6 +720,10 @@ def extract_uncollectibles(df: pd.DataFrame, grace_period_days: int) -> list[str
         The number of days defining the grace period. Investments with their latest date beyond
         this period are considered for being marked as uncollectible.
 
+    uncollectible_amount : int, optional
+        The threshold (default is `UNCOLLECTIBLE_AMOUNT`, 1000) that, when the negative of the
+        investment's net difference is equal or greater, makes the investment a candidate.
+
     Returns
     -------
     list[str]
@@ -550,21 +739,160 @@ def extract_uncollectibles(df: pd.DataFrame, grace_period_days: int) -> list[str
     >>> extract_uncollectibles(df, 30)
     # Returns a list of IDs which are considered uncollectible.
     """
-    uncollectible_ids = set()
-
     dfg = df.groupby("RemateID")
-    for group_key, df_group in dfg:
-        earnings = df_group["Abono"].sum()
-        cost = df_group["Cargo"].sum()
-        date = df_group["Fecha"].max()
+    investment_diff = dfg["Abono"].sum() - dfg["Cargo"].sum()
+
+    # Only negative investments are checked against the grace period (once per distinct date)
+    dates = dfg["Fecha"].max()[investment_diff <= -1 * abs(uncollectible_amount)]
+    is_past_grace_period = some_utils.apply_on_uniques(
+        dates,
+        lambda date: some_utils.is_date_past_grace_period(grace_period_days, date),
+        elementwise=True,
+    )
+    return list(dates.index[is_past_grace_period.astype(bool)])
+
+
+def detect_missing_movements(
+    movs: pd.DataFrame,
+    flow_schedule: pd.DataFrame,
+    early_days: int = 7,
+    max_delay_days: int = 60,
+    amount_tolerance: int = 100,
+) -> pd.DataFrame:
+    """
+    Reconcile the paid flows against the movements, and report missing or collapsed payments.
+
+    Every paid cell of the flows file (green, on time, or orange, paid late) is matched with
+    the first day with payments ('Abono' > 0) of the same 'RemateID' on or after its due date,
+    using a single as-of join over the whole portfolio.
+    Then, for each (RemateID, payment date), the expected amount and number of flows are
+    compared with the paid amount and number of movements.
+
+    Parameters
+    ----------
+    movs : pd.DataFrame
+        The sanitized movements, with columns 'RemateID', 'Fecha', 'Abono' and 'Actor'.
+    flow_schedule : pd.DataFrame
+        The flow schedule, as returned by `extract_flow_schedule`.
+    early_days : int, optional
+        Days a payment can be registered before its due date (default is 7).
+    max_delay_days : int, optional
+        Days after the due date a payment is searched for (default is 60).
+    amount_tolerance : int, optional
+        Differences up to this amount are not reported (default is 100).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per (RemateID, Fecha) with issues, and columns 'RemateID', 'Actor', 'Fecha',
+        'expected_amount', 'paid_amount', 'missing_amount', 'expected_count', 'paid_count',
+        'amount_mismatch' and 'count_mismatch'.
+        'Fecha' is the payment date, or the due date when no payment was found at all.
+
+    Notes
+    -----
+    - Late paid (orange) cells could have no amount; those are only checked by count.
+    - Use `fix_candidates` to turn the result into rows for `fix_data.csv`.
 
-        investment_diff = earnings - cost
+    Examples
+    --------
+    >>> issues = detect_missing_movements(movs_df, extract_flow_schedule(flows_file_path))
+    >>> fix_candidates(issues).to_csv("./data_out/fix_candidates.csv", index=False)
+    """
+    paid_flows = flow_schedule[flow_schedule["status"].isin(["on-time", "late-paid"])].copy()
+    paid_flows["search_from"] = paid_flows["due_date"] - pd.Timedelta(days=early_days)
+
+    # Days with payments, per investment
+    payments = movs[(movs["Abono"] > 0) & movs["RemateID"].isin(paid_flows["RemateID"])]
+    payments = (
+        payments.assign(Fecha=payments["Fecha"].dt.normalize())
+        .groupby(["RemateID", "Fecha"], as_index=False)
+        .agg(paid_amount=("Abono", "sum"), paid_count=("Abono", "size"))
+    )
+
+    # First payment day on or after each (early) due date
+    matched = pd.merge_asof(
+        paid_flows.sort_values("search_from"),
+        payments.sort_values("Fecha")[["RemateID", "Fecha"]],
+        left_on="search_from",
+        right_on="Fecha",
+        by="RemateID",
+        direction="forward",
+        tolerance=pd.Timedelta(days=early_days + max_delay_days),
+    )
+
+    # Flows without payment are reported on their due date
+    no_payment_mask = matched["Fecha"].isna()
+    matched.loc[no_payment_mask, "Fecha"] = matched.loc[no_payment_mask, "due_date"]
+
+    expected = matched.groupby(["RemateID", "Fecha"], as_index=False).agg(
+        expected_amount=("amount", "sum"),
+        known_amounts=("amount", "count"),
+        expected_count=("amount", "size"),
+    )
+    result = expected.merge(payments, on=["RemateID", "Fecha"], how="left")
+    result[["paid_amount", "paid_count"]] = result[["paid_amount", "paid_count"]].fillna(0)
+
+    result["missing_amount"] = result["expected_amount"] - result["paid_amount"]
+    all_amounts_known = result["known_amounts"] == result["expected_count"]
+    result["amount_mismatch"] = all_amounts_known & (
+        result["missing_amount"].abs() > abs(amount_tolerance)
+    )
+    result["count_mismatch"] = result["paid_count"] < result["expected_count"]
+
+    result = result[result["amount_mismatch"] | result["count_mismatch"]]
+
+    actors = movs.dropna(subset=["RemateID"]).groupby("RemateID")["Actor"].first()
+    result.insert(1, "Actor", result["RemateID"].map(actors))
+    result["paid_count"] = result["paid_count"].astype(int)
+
+    columns = [
+        "RemateID",
+        "Actor",
+        "Fecha",
+        "expected_amount",
+        "paid_amount",
+        "missing_amount",
+        "expected_count",
+        "paid_count",
+        "amount_mismatch",
+        "count_mismatch",
+    ]
+    return result[columns].sort_values(["RemateID", "Fecha"]).reset_index(drop=True)
+
+
+def fix_candidates(issues: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn the issues found by `detect_missing_movements` into `fix_data.csv` rows.
 
-        if investment_diff <= -1 * abs(1000) and some_utils.is_date_past_grace_period(
-            grace_period_days, date
-        ):
-            uncollectible_ids.add(group_key)
+    Only the payments with a missing (positive) amount are proposed as fixes; they have to be
+    reviewed (ie: on cumplo.cl) before being appended to `fix_data.csv`.
 
-    # negative_investments
+    Parameters
+    ----------
+    issues : pd.DataFrame
+        The result of `detect_missing_movements`.
 
-    return list(uncollectible_ids)
+    Returns
+    -------
+    pd.DataFrame
+        A DataFrame with the `fix_data.csv` columns:
+        'RemateID', 'Actor', 'Date_YYYY-MM-DD', 'Abono' and 'Cargo'.
+
+    Examples
+    --------
+    >>> candidates = fix_candidates(detect_missing_movements(movs_df, flow_schedule))
+    >>> candidates.to_csv("./data_out/fix_candidates.csv", index=False)
+    """
+    missing = issues[issues["amount_mismatch"] & (issues["missing_amount"] > 0)]
+    candidates = pd.DataFrame(
+        {
+            "RemateID": missing["RemateID"],
+            "Actor": missing["Actor"].fillna(""),
+            "Date_YYYY-MM-DD": missing["Fecha"].dt.strftime("%Y-%m-%d"),
+            "Abono": missing["missing_amount"].round().astype(int),
+            "Cargo": 0,
+        },
+        columns=FIX_DATA_HEADER,
+    )
+    return candidates.reset_index(drop=True)
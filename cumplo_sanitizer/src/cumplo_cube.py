@@ -0,0 +1,264 @@
+import os
+from os import path
+
+import pandas as pd
+
+from . import cumplo_changes, cumplo_ingest, some_utils
+
+# Folder with the materialized cube (and what is needed to update it), on the output folder
+CUBE_DIR_NAME = "reporting_cube"
+CUBE_FILE_NAME = "cube.feather"
+# Movements and fingerprint of each month, to find the months to update on the next run
+MONTH_STATE_FILE_NAME = "month_state.feather"
+
+# Cube coordinates, besides 'month'; 'vintage' is the year of the first movement of an investment
+DIMENSIONS = ["Estado", "Actor", "Tipo", "vintage"]
+# Additive measures, so any roll-up is a sum of cells
+MEASURES = ["invested", "returned", "net", "movements"]
+# Granularities accepted by `rollup`, as pandas period aliases
+PERIODS = {"month": "M", "quarter": "Q", "year": "Y"}
+
+_TEXT_DIMENSIONS = ["Estado", "Actor", "Tipo"]
+
+
+def _coordinates(movs_df: pd.DataFrame) -> (pd.Series, pd.Series):
+    # The month and vintage of each movement; the vintage needs the whole history
+    fechas = pd.to_datetime(movs_df["Fecha"])
+    first_year = fechas.groupby(movs_df["RemateID"].astype(object)).transform("min").dt.year
+    # Movements without 'RemateID' are their own vintage
+    vintages = first_year.fillna(fechas.dt.year).astype("int32")
+    return fechas.dt.to_period("M").dt.to_timestamp(), vintages
+
+
+def _prepare(movs_df: pd.DataFrame, months: pd.Series, vintages: pd.Series) -> pd.DataFrame:
+    # One row per movement, with its cube coordinates and amounts
+    rows = pd.DataFrame(
+        {
+            "month": months,
+            "Estado": movs_df["Estado"],
+            "Actor": movs_df.get("Actor", pd.NA),
+            "Tipo": movs_df.get("Tipo", pd.NA),
+            "vintage": vintages,
+            "invested": movs_df["Cargo"].astype(float),
+            "returned": movs_df["Abono"].astype(float),
+        }
+    )
+    return rows.astype({column: some_utils.STRING_DTYPE for column in _TEXT_DIMENSIONS})
+
+
+def _month_state(movs_df: pd.DataFrame, months: pd.Series, vintages: pd.Series) -> pd.DataFrame:
+    # Number of movements and an order independent fingerprint (sum of row hashes) by month
+    amounts = movs_df[["Cargo", "Abono"]].astype(float) / (2 * cumplo_changes.NET_TOLERANCE)
+    missing = pd.Series(pd.NA, index=movs_df.index, dtype=object)
+    coordinates = pd.DataFrame(
+        {
+            "Estado": movs_df["Estado"].astype(object),
+            "Actor": movs_df.get("Actor", missing).astype(object),
+            "Tipo": movs_df.get("Tipo", missing).astype(object),
+            "vintage": vintages,
+        }
+    ).join(amounts.round().astype("int64"))
+    hashes = pd.util.hash_pandas_object(coordinates, index=False)
+    return (
+        hashes.groupby(months.to_numpy(), sort=True)
+        .agg(movements="size", fingerprint="sum")
+        .rename_axis("month")
+        .reset_index()
+    )
+
+
+def _aggregate(rows: pd.DataFrame) -> pd.DataFrame:
+    cube = (
+        rows.groupby(["month"] + DIMENSIONS, dropna=False, sort=False)
+        .agg(
+            invested=("invested", "sum"),
+            returned=("returned", "sum"),
+            movements=("invested", "size"),
+        )
+        .reset_index()
+    )
+    cube["net"] = cube["returned"] - cube["invested"]
+    return cube
+
+
+def _finish(cube: pd.DataFrame) -> pd.DataFrame:
+    cube = cube[cube["movements"] > 0]
+    cube = cube.sort_values(["month"] + DIMENSIONS, kind="stable", ignore_index=True)
+    return cube.astype({"movements": "int64"})[["month"] + DIMENSIONS + MEASURES]
+
+
+def build_cube(movs_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate the classified movements by month, 'Estado', 'Actor', 'Tipo' and vintage.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        The classified movements, with columns 'RemateID', 'Fecha', 'Estado', 'Cargo' and
+        'Abono' ('Actor' and 'Tipo' are missing values when absent).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per non empty cell, with columns 'month' (first day), `DIMENSIONS` and
+        `MEASURES`: 'invested' (sum of 'Cargo'), 'returned' (sum of 'Abono'), 'net' and
+        'movements' (number of movements).
+
+    Notes
+    -----
+    Only additive measures are kept, so coarser levels are sums of cells (see `rollup`);
+    a distinct count of investments can't be rolled up, and isn't on the cube.
+    """
+    return _finish(_aggregate(_prepare(movs_df, *_coordinates(movs_df))))
+
+
+def update_cube(
+    cube: pd.DataFrame, month_state: pd.DataFrame, movs_df: pd.DataFrame
+) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Bring a cube up to date with new classified movements, re-aggregating only the months
+    that changed.
+
+    Parameters
+    ----------
+    cube : pd.DataFrame
+        The cube built (or updated) on the previous run.
+    month_state : pd.DataFrame
+        The state of each month on the previous run (as returned by this function, or kept
+        by `materialize_cube`).
+    movs_df : pd.DataFrame
+        All the classified movements of this run.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        The updated cube (equal to `build_cube(movs_df)`, up to amounts differences under
+        `cumplo_changes.NET_TOLERANCE`), and the new state of each month.
+
+    Description
+    -----------
+    The state of a month is its number of movements and a fingerprint of their cube
+    coordinates and amounts (rounded to `cumplo_changes.NET_TOLERANCE`). Only the movements
+    of months whose state changed are prepared and aggregated again: new months, late
+    fixes, an investment whose 'Estado', 'Actor', 'Tipo' or vintage changed (it changes
+    every month with its movements), or a movement assigned to another investment. The
+    cells of every other month are kept as they are.
+    """
+    months, vintages = _coordinates(movs_df)
+    new_state = _month_state(movs_df, months, vintages)
+
+    # Nullable, so the fingerprints of months on one side only aren't made floats
+    nullable = {"movements": "Int64", "fingerprint": "UInt64"}
+    both = pd.merge(
+        month_state.astype(nullable),
+        new_state.astype(nullable),
+        on="month",
+        how="outer",
+        suffixes=("_old", "_new"),
+    )
+    changed = (both["movements_old"] != both["movements_new"]) | (
+        both["fingerprint_old"] != both["fingerprint_new"]
+    )
+    changed_months = both.loc[changed.fillna(True), "month"]
+
+    in_changed = months.isin(changed_months).to_numpy()
+    rows = _prepare(movs_df[in_changed], months[in_changed], vintages[in_changed])
+    cube = pd.concat(
+        [cube[~cube["month"].isin(changed_months)], _aggregate(rows)], ignore_index=True
+    )
+    return _finish(cube), new_state
+
+
+def materialize_cube(movs_df: pd.DataFrame, data_out_folder: str) -> pd.DataFrame:
+    """
+    Build (or update, when there is one) the reporting cube on `data_out_folder`.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        All the classified movements of this run.
+    data_out_folder : str
+        Folder with the output; the cube is kept on its 'reporting_cube' folder, along with
+        the state of each month used to update it.
+
+    Returns
+    -------
+    pd.DataFrame
+        The cube (see `build_cube` and `update_cube`).
+
+    Examples
+    --------
+    >>> materialize_cube(movs_df, "./data_out/")
+    >>> rollup(load_cube("./data_out/"), ["Estado"], period="year")
+    """
+    cube_dir = path.join(data_out_folder, CUBE_DIR_NAME)
+    if path.exists(path.join(cube_dir, MONTH_STATE_FILE_NAME)):
+        cube, month_state = update_cube(
+            load_cube(data_out_folder),
+            cumplo_ingest.load_streamed(path.join(cube_dir, MONTH_STATE_FILE_NAME)),
+            movs_df,
+        )
+    else:
+        months, vintages = _coordinates(movs_df)
+        cube = _finish(_aggregate(_prepare(movs_df, months, vintages)))
+        month_state = _month_state(movs_df, months, vintages)
+
+    os.makedirs(cube_dir, exist_ok=True)
+    # The month state is written last; without it, the next run builds from scratch
+    for file_name, df in [(CUBE_FILE_NAME, cube), (MONTH_STATE_FILE_NAME, month_state)]:
+        file_path = path.join(cube_dir, file_name)
+        df.to_feather(f"{file_path}.tmp")
+        os.replace(f"{file_path}.tmp", file_path)
+    return cube
+
+
+def load_cube(data_out_folder: str) -> pd.DataFrame:
+    """Load the cube saved by `materialize_cube`."""
+    return cumplo_ingest.load_streamed(path.join(data_out_folder, CUBE_DIR_NAME, CUBE_FILE_NAME))
+
+
+def rollup(cube: pd.DataFrame, by: list[str] | None = None, period: str = "month") -> pd.DataFrame:
+    """
+    Roll the cube up to coarser levels.
+
+    Parameters
+    ----------
+    cube : pd.DataFrame
+        The cube (see `build_cube`).
+    by : list[str], optional
+        Dimensions to keep (some of `DIMENSIONS`); the rest are summed over (default is
+        None, keep none).
+    period : str, optional
+        'month' (default), 'quarter', 'year', or None to sum over time too.
+
+    Returns
+    -------
+    pd.DataFrame
+        The `MEASURES` by period (its first day, on a 'period' column) and `by`.
+
+    Raises
+    ------
+    ValueError
+        If `by` has unknown dimensions, or `period` is not one of `PERIODS`.
+
+    Examples
+    --------
+    >>> rollup(cube, ["Estado"], period="year")
+    >>> rollup(cube, ["vintage", "Estado"], period=None)
+    """
+    by = list(by or [])
+    unknown = [dimension for dimension in by if dimension not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown dimensions: {unknown}, use some of {DIMENSIONS}")
+    if period is not None and period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}, use one of {list(PERIODS)} or None")
+
+    keys = by
+    if period is not None:
+        cube = cube.assign(
+            period=cube["month"].dt.to_period(PERIODS[period]).dt.start_time.dt.normalize()
+        )
+        keys = ["period"] + by
+    if not keys:
+        return cube[MEASURES].sum().to_frame().T.astype({"movements": "int64"})
+    return cube.groupby(keys, dropna=False)[MEASURES].sum().reset_index()
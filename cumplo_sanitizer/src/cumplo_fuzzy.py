@@ -0,0 +1,234 @@
+import difflib
+import re
+from collections import defaultdict
+
+import pandas as pd
+
+from . import some_utils
+
+try:
+    # Optional ('fuzzy' extra); difflib is used when it is not installed
+    from rapidfuzz.fuzz import ratio as _rapidfuzz_ratio
+except ImportError:
+    _rapidfuzz_ratio = None
+
+# Minimum similarity (0 to 1) to assign an ID
+DEFAULT_THRESHOLD = 0.85
+# Minimum difference between the best candidate and the best one with another ID
+DEFAULT_MARGIN = 0.05
+# Candidates reported for each 'Solicitud'
+DEFAULT_TOP = 3
+# Blocking keys shared by more flows than this (ie: 'credito') are not used to find candidates
+MAX_BLOCK_SIZE = 50
+# Length of the token prefixes used as blocking keys ('ingenieria' >> 'inge*')
+PREFIX_LENGTH = 4
+# Minimum shared tokens, and share of the longer side's tokens, for a contained 'Solicitud'
+# to count as a match (a lone 'Crédito' is contained in every flow 'Solicitud')
+MIN_SHARED_TOKENS = 2
+MIN_SHARED_SHARE = 0.5
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def tokenize(solicitud: str) -> list[str]:
+    """
+    Normalize a 'Solicitud' (see `some_utils.clean_spanish_characters`) and split it into
+    alphanumeric tokens.
+
+    Examples
+    --------
+    >>> tokenize("Crédito Más Ingeniería 23028")
+    ['credito', 'mas', 'ingenieria', '23028']
+    """
+    return _NON_ALPHANUMERIC.sub(" ", some_utils.clean_spanish_characters(solicitud)).split()
+
+
+def _ratio(a: str, b: str) -> float:
+    if _rapidfuzz_ratio is not None:
+        return _rapidfuzz_ratio(a, b) / 100
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def similarity(a_tokens: list[str], b_tokens: list[str]) -> float:
+    """
+    Token set similarity (0 to 1) of two tokenized 'Solicitud's.
+
+    Description
+    -----------
+    The shared tokens are compared with each side (shared plus own tokens), so word order
+    and extra words on one side (ie: the ID at the end of the flows 'Solicitud') don't
+    lower the score; when one side is contained in the other the similarity is 1.
+    That only holds when the shared tokens are at least `MIN_SHARED_TOKENS` and
+    `MIN_SHARED_SHARE` of the longer side's tokens; otherwise (ie: a generic 'Crédito' or
+    'Capital') only the whole sides are compared. Strings are compared with `rapidfuzz.fuzz.ratio` when installed, and with
+    `difflib.SequenceMatcher.ratio` (about the same values, but slower) otherwise.
+
+    Examples
+    --------
+    >>> similarity(tokenize("Crédito Más Ingenieria"), tokenize("Credito Mas Ingenieria 23028"))
+    1.0
+    """
+    a, b = set(a_tokens), set(b_tokens)
+    shared = " ".join(sorted(a & b))
+    a_only, b_only = " ".join(sorted(a - b)), " ".join(sorted(b - a))
+    distinctive = len(a & b) >= max(MIN_SHARED_TOKENS, MIN_SHARED_SHARE * max(len(a), len(b)))
+    if distinctive and (not a_only or not b_only):
+        return 1.0
+
+    a_side = f"{shared} {a_only}".strip()
+    b_side = f"{shared} {b_only}".strip()
+    scores = [_ratio(a_side, b_side)]
+    if distinctive:
+        scores += [_ratio(shared, a_side), _ratio(shared, b_side)]
+    return max(scores)
+
+
+def _blocking_keys(tokens: list[str]) -> set[str]:
+    return set(tokens) | {
+        f"{token[:PREFIX_LENGTH]}*" for token in tokens if len(token) > PREFIX_LENGTH
+    }
+
+
+def match_solicitudes(
+    solicitudes,
+    flows_df: pd.DataFrame,
+    threshold: float = DEFAULT_THRESHOLD,
+    margin: float = DEFAULT_MARGIN,
+    top: int = DEFAULT_TOP,
+) -> pd.DataFrame:
+    """
+    Find the flow ID of each 'Solicitud', by similarity.
+
+    Parameters
+    ----------
+    solicitudes : list-like of str
+        The 'Solicitud's to match (NAs and duplicates are dropped).
+    flows_df : pd.DataFrame
+        Flows, with columns 'ID' and 'Solicitud'.
+    threshold : float, optional
+        Minimum similarity to assign an ID (default is `DEFAULT_THRESHOLD`).
+    margin : float, optional
+        Minimum difference between the best score and the best score of any other ID
+        (default is `DEFAULT_MARGIN`); closer matches are ambiguous and not assigned.
+    top : int, optional
+        Candidates reported per 'Solicitud' (default is `DEFAULT_TOP`).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per distinct 'Solicitud', with columns 'Solicitud', 'RemateID' (the
+        assigned ID, NA when there is none), 'score' (of the best candidate, 0 when there
+        are no candidates) and 'candidates' (list of (ID, flows 'Solicitud', score), best
+        first).
+
+    Description
+    -----------
+    Comparing every 'Solicitud' with every flow is quadratic, so the flows are indexed by
+    their tokens and token prefixes first (blocking); a 'Solicitud' is only compared with
+    the flows sharing at least one of those keys. Keys shared by more than
+    `MAX_BLOCK_SIZE` flows (like 'credito') are too common to tell flows apart, and are
+    not used for blocking (but they still count on the `similarity`).
+
+    Examples
+    --------
+    >>> match_solicitudes(["Credito Mas Ingenieria"], flows_df)
+    """
+    flows = flows_df[["ID", "Solicitud"]].dropna().drop_duplicates()
+    flow_ids = flows["ID"].astype(str).tolist()
+    flow_solicitudes = flows["Solicitud"].astype(str).tolist()
+    flow_tokens = [tokenize(solicitud) for solicitud in flow_solicitudes]
+
+    index = defaultdict(list)
+    for position, tokens in enumerate(flow_tokens):
+        for key in _blocking_keys(tokens):
+            index[key].append(position)
+    index = {key: positions for key, positions in index.items() if len(positions) <= MAX_BLOCK_SIZE}
+
+    rows = []
+    for solicitud in pd.Series(solicitudes, dtype=object).dropna().unique():
+        tokens = tokenize(solicitud)
+        positions = set()
+        for key in _blocking_keys(tokens):
+            positions.update(index.get(key, ()))
+
+        scored = sorted(
+            (
+                (
+                    flow_ids[position],
+                    flow_solicitudes[position],
+                    similarity(tokens, flow_tokens[position]),
+                )
+                for position in positions
+            ),
+            key=lambda candidate: (-candidate[2], candidate[0]),
+        )
+        best_score = scored[0][2] if scored else 0.0
+        runner_up = next((score for flow_id, _, score in scored if flow_id != scored[0][0]), 0.0)
+
+        assigned = best_score >= threshold and best_score - runner_up >= margin
+        rows.append(
+            {
+                "Solicitud": solicitud,
+                "RemateID": scored[0][0] if assigned else pd.NA,
+                "score": best_score,
+                "candidates": scored[:top],
+            }
+        )
+    return pd.DataFrame(rows, columns=["Solicitud", "RemateID", "score", "candidates"])
+
+
+def resolve_ids_fuzzy(
+    movs_df: pd.DataFrame,
+    flows_df: pd.DataFrame,
+    threshold: float = DEFAULT_THRESHOLD,
+    margin: float = DEFAULT_MARGIN,
+    verbose: bool = True,
+) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Fill the 'RemateID's still missing after `cumplo_pipeline.resolve_ids_from_flows`,
+    matching 'Solicitud' by similarity instead of as a prefix.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        Movements, with columns 'Solicitud' and 'RemateID'.
+    flows_df : pd.DataFrame
+        Flows, with columns 'ID' and 'Solicitud'.
+    threshold, margin : float, optional
+        See `match_solicitudes`.
+    verbose : bool, optional
+        If True (default), print the 'Solicitud's without an assigned ID and their best
+        candidates.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        The movements with the recovered 'RemateID's, and the `match_solicitudes` report of
+        every unresolved 'Solicitud' (with a 'rows' column; the number of movements).
+
+    Examples
+    --------
+    >>> movs_df, report = resolve_ids_fuzzy(movs_df, flows_df)
+    >>> report[report["RemateID"].isna()]  # to fix by hand (see 'fix_data.csv')
+    """
+    unresolved = movs_df["RemateID"].isna() & movs_df["Solicitud"].notna()
+    rows = movs_df.loc[unresolved, "Solicitud"].astype(object).value_counts()
+
+    report = match_solicitudes(rows.index, flows_df, threshold, margin)
+    report.insert(1, "rows", report["Solicitud"].map(rows).astype(int))
+
+    matched = report.dropna(subset=["RemateID"])
+    remate_ids = (
+        movs_df.loc[unresolved, "Solicitud"]
+        .astype(object)
+        .map(dict(zip(matched["Solicitud"], matched["RemateID"])))
+    )
+    movs_df.loc[remate_ids.dropna().index, "RemateID"] = remate_ids.dropna()
+
+    if verbose:
+        for row in report[report["RemateID"].isna()].itertuples():
+            candidates = ", ".join(f"{i} '{s}' ({score:.2f})" for i, s, score in row.candidates)
+            print(
+                f"No confident match for: [{row.Solicitud}] ({row.rows} rows) - {candidates or 'no candidates'}"
+            )
+    return movs_df, report
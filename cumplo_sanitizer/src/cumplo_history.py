@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+from . import cumplo_core, cumplo_sweep
+
+# Sentinel day for "never" (ie: payment date of a pending flow)
+_NEVER = np.iinfo(np.int64).max
+
+
+def _days(values) -> np.ndarray:
+    # Days since epoch, as int64
+    return np.asarray(values, dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+
+
+def flow_payment_days(movs_df: pd.DataFrame, flow_schedule: pd.DataFrame) -> pd.Series:
+    """
+    Estimate the day each flow of the schedule was paid.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        The sanitized movements, with columns 'RemateID', 'Fecha' and 'Abono'.
+    flow_schedule : pd.DataFrame
+        The flow schedule (see `cumplo_core.extract_flow_schedule`).
+
+    Returns
+    -------
+    pd.Series
+        The payment date of each flow (aligned with `flow_schedule`), NaT when not paid
+        (pending or future flows).
+
+    Notes
+    -----
+    - On time (green) flows are paid on their due date.
+    - Late paid (orange) flows are paid on the first day with payments ('Abono' > 0) of the
+      same investment after their due date; or on their due date, when there is none.
+    """
+    paid_date = pd.Series(pd.NaT, index=flow_schedule.index, dtype="datetime64[ns]")
+    on_time = flow_schedule["status"] == "on-time"
+    paid_date[on_time] = flow_schedule.loc[on_time, "due_date"]
+
+    late_paid = flow_schedule[flow_schedule["status"] == "late-paid"]
+    if late_paid.empty:
+        return paid_date
+
+    payments = movs_df.loc[movs_df["Abono"] > 0, ["RemateID", "Fecha"]].dropna()
+    payments = payments.assign(
+        RemateID=payments["RemateID"].astype(object), Fecha=payments["Fecha"].dt.normalize()
+    )
+    matched = pd.merge_asof(
+        late_paid[["RemateID", "due_date"]]
+        .astype({"RemateID": object})
+        .reset_index()
+        .sort_values("due_date"),
+        payments.drop_duplicates().sort_values("Fecha"),
+        left_on="due_date",
+        right_on="Fecha",
+        by="RemateID",
+        direction="forward",
+    ).set_index("index")
+    paid_date[matched.index] = matched["Fecha"].fillna(matched["due_date"])
+    return paid_date
+
+
+def classify_as_of(
+    movs_df: pd.DataFrame, flow_schedule: pd.DataFrame, dates, **parameters
+) -> pd.DataFrame:
+    """
+    Classify the investments as they were at each of the given dates.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        The sanitized movements, with columns 'RemateID', 'Fecha', 'Abono', 'Cargo' and
+        'Descripción'.
+    flow_schedule : pd.DataFrame
+        The flow schedule (see `cumplo_core.extract_flow_schedule`).
+    dates : list-like of dates
+        The as-of dates (ie: `pd.date_range("2022-01-31", "2023-12-31", freq="M")`).
+    **parameters
+        Thresholds for `cumplo_sweep.estado_codes` (default values on
+        `cumplo_sweep.DEFAULT_PARAMETERS`).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per as-of date and investment with movements up to that date, with columns
+        'as_of', 'RemateID', 'Estado', 'cost', 'earnings' and 'net' (amounts up to that date).
+
+    Description
+    -----------
+    At each date only the movements up to (and including) that day are taken into account,
+    and every flow has the status it had that day:
+    - future, when it wasn't due yet (or it is still 'future' on the flows file),
+    - pending, when it was due but not paid yet (see `flow_payment_days`),
+    - paid otherwise.
+    Grace periods are counted up to the as-of date instead of today.
+
+    Movements are sorted by date once, and the per-investment aggregates are updated with
+    the movements between consecutive dates, so each extra date only costs the new
+    movements plus a classification of the investments.
+
+    Examples
+    --------
+    >>> month_ends = pd.date_range("2022-01-31", "2023-12-31", freq="M")
+    >>> history = classify_as_of(movs_df, flow_schedule, month_ends)
+    >>> history.pivot_table(index="as_of", columns="Estado", values="RemateID", aggfunc="count")
+    """
+    as_of_days = np.unique(_days(pd.to_datetime(list(dates))))
+
+    movs_df = movs_df.sort_values("Fecha", kind="stable")
+    codes, remate_ids = pd.factorize(movs_df["RemateID"], use_na_sentinel=False)
+    remate_ids = pd.Index(remate_ids, dtype=object, name="RemateID")
+    n_ids = len(remate_ids)
+
+    days = _days(movs_df["Fecha"])
+    abonos = movs_df["Abono"].to_numpy(dtype=float)
+    cargos = movs_df["Cargo"].to_numpy(dtype=float)
+    refunds = (
+        movs_df["Descripción"].str.startswith(cumplo_core.REFUND_PREFIX, na=False).to_numpy(bool)
+    )
+
+    # Flows, by investment code (only the investments with movements are classified)
+    flows = flow_schedule[flow_schedule["amount"].notna()]
+    flow_codes = remate_ids.get_indexer(flows["RemateID"].astype(object))
+    known = flow_codes >= 0
+    flows, flow_codes = flows[known], flow_codes[known]
+    due_days = _days(flows["due_date"])
+    still_future = (flows["status"] == "future").to_numpy()
+    paid_days = flow_payment_days(movs_df, flows)
+    paid_days = np.where(paid_days.isna(), _NEVER, _days(paid_days.fillna(pd.Timestamp(0))))
+
+    in_flows = remate_ids.isin(flow_schedule["RemateID"].astype(object).unique())
+
+    # Running aggregates, per investment code
+    earnings = np.zeros(n_ids)
+    cost = np.zeros(n_ids)
+    last_day = np.full(n_ids, np.iinfo(np.int64).min)
+    has_refund = np.zeros(n_ids, dtype=bool)
+    seen = np.zeros(n_ids, dtype=bool)
+
+    snapshots = []
+    start = 0
+    for as_of in as_of_days:
+        # Incremental update; only the movements since the previous date
+        stop = np.searchsorted(days, as_of, side="right")
+        new = codes[start:stop]
+        np.add.at(earnings, new, abonos[start:stop])
+        np.add.at(cost, new, cargos[start:stop])
+        np.maximum.at(last_day, new, days[start:stop])
+        np.logical_or.at(has_refund, new, refunds[start:stop])
+        seen[new] = True
+        start = stop
+
+        # Status of each flow on that date
+        future = still_future | (due_days > as_of)
+        pending = ~future & (paid_days > as_of)
+        is_active = np.zeros(n_ids, dtype=bool)
+        is_active[flow_codes[future]] = True
+        oldest_pending = np.full(n_ids, _NEVER)
+        np.minimum.at(oldest_pending, flow_codes[pending], due_days[pending])
+        is_late = oldest_pending != _NEVER
+
+        summary = pd.DataFrame(
+            {
+                "earnings": earnings,
+                "cost": cost,
+                "net": earnings - cost,
+                "has_refund": has_refund,
+                "in_flows": in_flows,
+                "is_active": is_active,
+                "is_late": is_late,
+                "days_since_last_payment": as_of - last_day,
+                "days_since_oldest_pending": np.where(is_late, as_of - oldest_pending, np.nan),
+            },
+            index=remate_ids,
+        )[seen]
+
+        estados = np.array(cumplo_sweep.ESTADOS, dtype=object)[
+            cumplo_sweep.estado_codes(summary, **parameters)
+        ]
+        snapshots.append(
+            pd.DataFrame(
+                {
+                    "as_of": pd.Timestamp(int(as_of), unit="D"),
+                    "RemateID": summary.index,
+                    "Estado": estados,
+                    "cost": summary["cost"].to_numpy(),
+                    "earnings": summary["earnings"].to_numpy(),
+                    "net": summary["net"].to_numpy(),
+                }
+            )
+        )
+
+    columns = ["as_of", "RemateID", "Estado", "cost", "earnings", "net"]
+    if not snapshots:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(snapshots, ignore_index=True)[columns]
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from . import some_utils
+
+# Code of missing (NA) or unknown RemateIDs
+MISSING_CODE = -1
+
+# RemateIDs stored as numbers; integers written as `str(int(...))` does (no sign, no zeros
+# on the left), so decoding gives back the same string
+_NUMERIC_ID_PATTERN = r"0|[1-9]\d{0,8}"
+
+
+class RemateIDRegistry:
+    """
+    A dense int32 code for every RemateID.
+
+    RemateIDs are mostly numeric strings ('15572'), plus the 'Actor' names used as ID for
+    old investments ('green logistic', see `cumplo_pipeline.extract_actors`). The numeric
+    ones are kept as integers (sorted, codes 0 to n-1), and the legacy ones on a side table
+    (sorted, the codes after the numeric ones). NA (and unknown) RemateIDs are encoded as
+    `MISSING_CODE`.
+
+    Sets, `isin` masks and groupbys on codes hash integers instead of Python strings, so
+    the ids are hashed once, by `encode`, and decoded only for the output.
+
+    Parameters
+    ----------
+    numeric_ids : np.ndarray
+        The numeric RemateIDs, as sorted integers.
+    legacy_ids : pd.Index
+        The non-numeric RemateIDs, sorted.
+
+    Examples
+    --------
+    >>> registry = RemateIDRegistry.from_ids(movs_df["RemateID"], flow_schedule["RemateID"])
+    >>> codes = registry.encode(movs_df["RemateID"])
+    >>> active_mask = np.isin(codes, registry.encode(active_ids))
+    >>> registry.decode(codes)
+    """
+
+    def __init__(self, numeric_ids: np.ndarray, legacy_ids: pd.Index):
+        self.numeric_ids = np.asarray(numeric_ids, dtype=np.int64)
+        self.legacy_ids = pd.Index(legacy_ids, dtype=object, name="RemateID")
+        self._lookup = pd.Index(
+            np.concatenate([self.numeric_ids.astype(str).astype(object), self.legacy_ids]),
+            dtype=object,
+        )
+
+    @classmethod
+    def from_ids(cls, *values) -> "RemateIDRegistry":
+        """
+        Build a registry with every RemateID (NAs excluded) of the given list-likes.
+        """
+        uniques = pd.Series(
+            pd.unique(np.concatenate([_as_objects(value) for value in values])), dtype=object
+        ).dropna()
+        is_numeric = uniques.astype(str).str.fullmatch(_NUMERIC_ID_PATTERN)
+        numeric_ids = np.sort(uniques[is_numeric].astype(np.int64).to_numpy())
+        legacy_ids = pd.Index(np.sort(uniques[~is_numeric].astype(str).to_numpy()))
+        return cls(numeric_ids, legacy_ids)
+
+    def __len__(self) -> int:
+        return len(self._lookup)
+
+    @property
+    def legacy(self) -> pd.DataFrame:
+        """The side table; the code of each legacy (non-numeric) RemateID."""
+        return pd.DataFrame(
+            {
+                "code": np.arange(len(self.numeric_ids), len(self), dtype=np.int32),
+                "RemateID": self.legacy_ids,
+            }
+        )
+
+    def encode(self, values) -> np.ndarray:
+        """
+        Return the codes of some RemateIDs (a list-like), as an int32 array.
+        """
+        return self._lookup.get_indexer(_as_objects(values)).astype(np.int32)
+
+    def encode_adding(self, *values) -> list[np.ndarray]:
+        """
+        Return the codes of each list-like of RemateIDs, adding the ones that aren't
+        registered yet (NAs excluded) first.
+
+        Adding RemateIDs renumbers every code, so codes from before the call must not be
+        mixed with the returned ones. A registry kept across calls (ie: by
+        `cumplo_worker.Worker`) only pays for `from_ids` when new RemateIDs show up.
+        """
+        # Each list-like is hashed once, to its distinct RemateIDs; only those are looked up
+        factorized = [
+            pd.factorize(value if isinstance(value, pd.Series) else _as_objects(value))
+            for value in values
+        ]
+        unique_codes = [self.encode(uniques) for _, uniques in factorized]
+        unknown = [
+            uniques[codes == MISSING_CODE] for (_, uniques), codes in zip(factorized, unique_codes)
+        ]
+        if sum(len(ids) for ids in unknown) > 0:
+            extended = RemateIDRegistry.from_ids(self._lookup, *unknown)
+            self.numeric_ids, self.legacy_ids = extended.numeric_ids, extended.legacy_ids
+            self._lookup = extended._lookup
+            unique_codes = [self.encode(uniques) for _, uniques in factorized]
+
+        # NAs are factorized as -1, and kept as `MISSING_CODE`
+        return [
+            np.append(codes, MISSING_CODE).astype(np.int32)[positions]
+            for (positions, _), codes in zip(factorized, unique_codes)
+        ]
+
+    def decode(self, codes) -> pd.api.extensions.ExtensionArray:
+        """
+        Return the RemateIDs of some codes, as `some_utils.STRING_DTYPE` (NA for
+        `MISSING_CODE`).
+        """
+        codes = np.asarray(codes)
+        remate_ids = np.full(len(codes), None, dtype=object)
+        known = codes != MISSING_CODE
+        remate_ids[known] = self._lookup.to_numpy()[codes[known]]
+        return pd.array(remate_ids, dtype=some_utils.STRING_DTYPE)
+
+
+def _as_objects(values) -> np.ndarray:
+    # Any list-like of RemateIDs (Series, arrays, lists or sets) as an object array
+    if isinstance(values, (set, frozenset)):
+        values = list(values)
+    return np.asarray(pd.Series(values, dtype=object).to_numpy(), dtype=object)
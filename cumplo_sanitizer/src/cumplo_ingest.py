@@ -0,0 +1,337 @@
+import itertools
+import os
+from collections.abc import Iterator
+from os import path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from . import cumplo_pipeline, some_utils
+
+# Rows of the export read at once
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Amounts are always float, even on chunks where every cell of the column is empty
+AMOUNT_COLUMNS = ["Cargo", "Abono"]
+
+# Columns that identify a movement across exports (see `iter_merged_chunks`)
+FINGERPRINT_COLUMNS = ["Fecha", "Descripción", "Cargo", "Abono"]
+
+
+def iter_excel_rows(file_path: str) -> Iterator[list]:
+    """
+    Yield the rows (header first) of the first sheet of an Excel file, one at a time.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to an '.xlsx' (read with openpyxl, in read-only mode) or '.xls' (read with
+        xlrd) file.
+
+    Returns
+    -------
+    Iterator[list]
+        The cell values of each row; dates as `datetime.datetime`, empty cells as None.
+
+    Raises
+    ------
+    ValueError
+        If the file is not '.xls' nor '.xlsx'.
+
+    Notes
+    -----
+    - openpyxl streams '.xlsx' rows from the zipped XML, so only the current row is in memory.
+    - xlrd keeps the raw cells of an '.xls' sheet in memory (the format is not streamable),
+      but not the Python objects of every row.
+    """
+    extension = path.splitext(file_path)[1].lower()
+    if extension == ".xlsx":
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    elif extension == ".xls":
+        import xlrd
+
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            sheet = workbook.sheet_by_index(0)
+            for index in range(sheet.nrows):
+                yield [_xls_value(cell, workbook.datemode) for cell in sheet.row(index)]
+        finally:
+            workbook.release_resources()
+    else:
+        raise ValueError(f"Unknown Excel extension: {extension}, use '.xls' or '.xlsx'")
+
+
+def _xls_value(cell, datemode: int):
+    import xlrd
+
+    if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+        return None
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        return xlrd.xldate_as_datetime(cell.value, datemode)
+    return cell.value
+
+
+def iter_movement_chunks(
+    movs_file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield a movements export as raw frames of up to `chunk_size` rows.
+
+    Parameters
+    ----------
+    movs_file_path : str
+        Path to the movements export.
+    chunk_size : int, optional
+        Maximum rows per chunk (default is `DEFAULT_CHUNK_SIZE`).
+
+    Returns
+    -------
+    Iterator[pd.DataFrame]
+        The chunks, with the export header as columns and the row position on the export as
+        index (as `pd.read_excel` does). At least one (maybe empty) chunk is yielded.
+    """
+    rows = iter_excel_rows(movs_file_path)
+    header = next(rows)
+    start = 0
+    while True:
+        batch = [row[: len(header)] for row in itertools.islice(rows, chunk_size)]
+        if not batch and start > 0:
+            return
+        yield pd.DataFrame(batch, columns=header, index=pd.RangeIndex(start, start + len(batch)))
+        if len(batch) < chunk_size:
+            return
+        start += len(batch)
+
+
+def prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Apply to a raw chunk of movements every stage that only needs its own rows.
+
+    Those are `cumplo_pipeline.load_movements` (text columns as `some_utils.STRING_DTYPE`
+    and `cumplo_pipeline.filter_movements`), `cumplo_pipeline.extract_solicitud` and
+    `cumplo_pipeline.extract_remate_ids`. The 'RemateID' resolution from flows needs every
+    movement, so it runs after the chunks are put together.
+    """
+    movs_df = cumplo_pipeline.extract_solicitud(_load_chunk(chunk))
+    return cumplo_pipeline.extract_remate_ids(movs_df)
+
+
+def _load_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    # What `cumplo_pipeline.load_movements` does to a whole export, but with float amounts
+    chunk = chunk.astype({column: float for column in AMOUNT_COLUMNS})
+    return cumplo_pipeline.filter_movements(some_utils.to_string_dtype(chunk.infer_objects()))
+
+
+def stream_movements(
+    movs_file_path: str, output_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> str:
+    """
+    Ingest a movements export chunk by chunk into an Arrow file, with bounded memory.
+
+    Parameters
+    ----------
+    movs_file_path : str
+        Path to the movements export.
+    output_path : str
+        Path to the Arrow (IPC file, ie: feather v2) output.
+    chunk_size : int, optional
+        Rows of the export processed at once (default is `DEFAULT_CHUNK_SIZE`).
+
+    Returns
+    -------
+    str
+        The path to the output.
+
+    Description
+    -----------
+    Each chunk (see `iter_movement_chunks`) goes through `prepare_chunk` and is appended to
+    the output as a record batch, so the peak memory depends on `chunk_size` and not on the
+    length of the history; and most rows ('Abono a Saldo Cumplo', zero amounts...) never
+    get to a frame bigger than a chunk. The schema is the one of the first chunk (later
+    chunks are cast to it), and the output is written to a temporary file and then renamed.
+
+    `load_streamed` reads the output back; it's the same frame `cumplo_pipeline.load_movements`
+    plus `extract_solicitud` and `extract_remate_ids` give, but with float amounts.
+
+    Examples
+    --------
+    >>> stream_movements(movs_file_path, "./data_out/movements.arrow")
+    './data_out/movements.arrow'
+    >>> movs_df = load_streamed("./data_out/movements.arrow")
+    >>> movs_df = cumplo_pipeline.resolve_ids_from_flows(movs_df, flows_df)
+    """
+    return _write_chunks(iter_movement_chunks(movs_file_path, chunk_size), output_path)
+
+
+def _write_chunks(chunks: Iterator[pd.DataFrame], output_path: str) -> str:
+    # Each raw chunk, prepared, as a record batch of a temporary file renamed at the end
+    tmp_path = f"{output_path}.tmp"
+    writer, schema = None, None
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(prepare_chunk(chunk), preserve_index=True)
+                if writer is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_file(sink, schema)
+                writer.write_table(table.cast(schema))
+            writer.close()
+    except BaseException:
+        if path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def movement_fingerprints(chunk: pd.DataFrame) -> np.ndarray:
+    """
+    Return a 64-bit hash of the `FINGERPRINT_COLUMNS` of each movement.
+
+    Values are normalized first ('Fecha' as a timestamp, empty amounts as 0.0), so the same
+    movement gets the same fingerprint on '.xls' and '.xlsx' exports.
+    """
+    normalized = pd.DataFrame(
+        {
+            "Fecha": pd.to_datetime(chunk["Fecha"]),
+            "Descripción": chunk["Descripción"].astype("string").fillna(""),
+            **{
+                column: pd.to_numeric(chunk[column]).astype(float).fillna(0.0)
+                for column in AMOUNT_COLUMNS
+            },
+        }
+    )
+    return pd.util.hash_pandas_object(normalized[FINGERPRINT_COLUMNS], index=False).to_numpy()
+
+
+def iter_merged_chunks(
+    movs_file_paths: list[str], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the movements of several (maybe overlapping) exports as raw frames, without the
+    movements repeated across exports.
+
+    Parameters
+    ----------
+    movs_file_paths : list[str]
+        Paths to the movements exports (ie: downloaded for different date ranges).
+    chunk_size : int, optional
+        Maximum rows read at once from an export (default is `DEFAULT_CHUNK_SIZE`); the
+        yielded chunks can be shorter, after the repeated rows are dropped.
+
+    Returns
+    -------
+    Iterator[pd.DataFrame]
+        The chunks, with the columns of the first export header and the position on the
+        merged movements as index. At least one (maybe empty) chunk is yielded.
+
+    Description
+    -----------
+    Each movement is identified by its fingerprint (see `movement_fingerprints`) and its
+    occurrence on its export: the first, second... movement with the same 'Fecha',
+    'Descripción', 'Cargo' and 'Abono'. The n-th occurrence is kept only if no previous
+    export had n of them, so a movement found on two overlapping exports is kept once, while
+    genuine same-day repeats (ie: two identical investments on the same day) are kept as
+    many times as the export with the most of them has.
+
+    The exports are read one after another, in chunks (see `iter_movement_chunks`); only
+    the fingerprints and their counts are kept in memory, not the rows. Movements keep the
+    order of the exports, and of the rows on them.
+
+    Examples
+    --------
+    >>> for chunk in iter_merged_chunks([movs_2022_path, movs_2023_path]):
+    ...     movs_df = prepare_chunk(chunk)
+    """
+    kept = {}
+    start, columns = 0, None
+    for movs_file_path in movs_file_paths:
+        # Occurrences of each fingerprint on this export, up to the current chunk
+        seen = {}
+        for chunk in iter_movement_chunks(movs_file_path, chunk_size):
+            columns = list(chunk.columns) if columns is None else columns
+            fingerprints = pd.Series(movement_fingerprints(chunk), dtype="uint64")
+            occurrence = fingerprints.groupby(fingerprints).cumcount() + 1
+            occurrence += fingerprints.map(seen).fillna(0).astype(int)
+            new = (occurrence > fingerprints.map(kept).fillna(0).astype(int)).to_numpy()
+
+            for fingerprint, count in fingerprints.value_counts().items():
+                seen[fingerprint] = seen.get(fingerprint, 0) + count
+                kept[fingerprint] = max(kept.get(fingerprint, 0), seen[fingerprint])
+
+            chunk = chunk.loc[new, columns]
+            if chunk.empty and start > 0:
+                continue
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+
+
+def merge_movements(
+    movs_file_paths: list[str], output_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> str:
+    """
+    Ingest several (maybe overlapping) movements exports into one Arrow file, without the
+    movements repeated across them.
+
+    Parameters
+    ----------
+    movs_file_paths : list[str]
+        Paths to the movements exports.
+    output_path : str
+        Path to the Arrow (IPC file, ie: feather v2) output.
+    chunk_size : int, optional
+        Rows of an export processed at once (default is `DEFAULT_CHUNK_SIZE`).
+
+    Returns
+    -------
+    str
+        The path to the output.
+
+    Description
+    -----------
+    As `stream_movements`, for the chunks of `iter_merged_chunks`; the exports are never
+    concatenated in memory. `load_streamed` reads the output back.
+
+    Examples
+    --------
+    >>> movs_file_paths = some_utils.get_matching_filenames("./data_in/", MOVS_PREFIX, "xls")
+    >>> merge_movements(movs_file_paths, "./data_out/movements.arrow")
+    './data_out/movements.arrow'
+    """
+    return _write_chunks(iter_merged_chunks(movs_file_paths, chunk_size), output_path)
+
+
+def load_merged_movements(
+    movs_file_paths: list[str], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> pd.DataFrame:
+    """
+    Read several (maybe overlapping) movements exports, as `cumplo_pipeline.load_movements`
+    reads one, without the movements repeated across them (see `iter_merged_chunks`).
+
+    Only the investment related movements of each chunk are kept (see
+    `cumplo_pipeline.filter_movements`) before putting them together.
+    """
+    return pd.concat(
+        [_load_chunk(chunk) for chunk in iter_merged_chunks(movs_file_paths, chunk_size)]
+    )
+
+
+def load_streamed(output_path: str) -> pd.DataFrame:
+    """
+    Read the output of `stream_movements` (or any Arrow IPC / feather file), with text
+    columns as `some_utils.STRING_DTYPE`.
+    """
+    table = pa.ipc.open_file(pa.memory_map(output_path, "r")).read_all()
+    string_dtype = pd.StringDtype("pyarrow")
+    return table.to_pandas(
+        types_mapper={pa.string(): string_dtype, pa.large_string(): string_dtype}.get
+    )
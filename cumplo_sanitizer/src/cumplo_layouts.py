@@ -0,0 +1,349 @@
+import datetime
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from collections.abc import Iterator
+from os import path
+from typing import NamedTuple
+
+import pandas as pd
+
+from . import cumplo_core, some_utils
+
+# Font colors on the flows styles table that are not flow statuses (headers and labels)
+NEUTRAL_FONT_COLORS = frozenset({"FF000000", "FFFFFFFF"})
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_CELL_REFERENCE = re.compile(r"([A-Z]+)(\d+)")
+# Cell types holding text; shared, inline and formula strings
+_TEXT_TYPES = ("s", "inlineStr", "str")
+
+
+class UnknownLayoutError(ValueError):
+    """Raised when an export doesn't match any of the `KNOWN_LAYOUTS`."""
+
+
+class ExportLayout(NamedTuple):
+    """
+    A known layout of a cumplo export.
+
+    `columns` are the header names, in order (for flows, the ones before the payment
+    date columns); movements can have other columns too. `font_colors` are the only font
+    colors allowed on the styles table (None when they are not checked).
+    """
+
+    name: str
+    kind: str
+    columns: tuple
+    extra_columns: bool
+    date_columns: bool
+    font_colors: frozenset | None
+
+
+class ExportFingerprint(NamedTuple):
+    """What `fingerprint` reads of an export; its header and the font colors of its styles."""
+
+    columns: tuple
+    date_columns: int
+    font_colors: frozenset | None
+
+
+KNOWN_LAYOUTS = [
+    ExportLayout(
+        name="flows-v1",
+        kind="flows",
+        columns=("ID", "Solicitud", "Inversión"),
+        extra_columns=False,
+        date_columns=True,
+        font_colors=frozenset(cumplo_core.FLOW_STATUSES) | NEUTRAL_FONT_COLORS,
+    ),
+    ExportLayout(
+        name="movements-v1",
+        kind="movements",
+        columns=("Fecha", "Descripción", "Cargo", "Abono"),
+        extra_columns=True,
+        date_columns=False,
+        font_colors=None,
+    ),
+]
+
+
+def _column_index(letters: str) -> int:
+    # 'A' -> 0, 'AB' -> 27
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+class _XlsxFile:
+    """The parts of an '.xlsx' workbook read by this module, straight from the zipped XML."""
+
+    def __init__(self, file_path: str):
+        self.zip = zipfile.ZipFile(file_path)
+        workbook = ET.fromstring(self.zip.read("xl/workbook.xml"))
+        properties = workbook.find(f"{_MAIN_NS}workbookPr")
+        date1904 = properties is not None and properties.get("date1904") in ("1", "true")
+        self.epoch = datetime.datetime(1904, 1, 1) if date1904 else datetime.datetime(1899, 12, 30)
+
+        # First sheet, through the workbook relationships
+        sheet_id = workbook.find(f"{_MAIN_NS}sheets")[0].get(f"{_DOC_REL_NS}id")
+        relationships = ET.fromstring(self.zip.read("xl/_rels/workbook.xml.rels"))
+        target = next(
+            relationship.get("Target")
+            for relationship in relationships.iter(f"{_PKG_REL_NS}Relationship")
+            if relationship.get("Id") == sheet_id
+        )
+        self.sheet_path = (
+            target.lstrip("/") if target.startswith("/") else posixpath.join("xl", target)
+        )
+
+    def close(self) -> None:
+        self.zip.close()
+
+    def font_colors(self) -> list:
+        """Font color (RGB, or None) of each cell style, by style index."""
+        if "xl/styles.xml" not in self.zip.namelist():
+            return [None]
+        styles = ET.fromstring(self.zip.read("xl/styles.xml"))
+        colors = []
+        for font in styles.find(f"{_MAIN_NS}fonts"):
+            color = font.find(f"{_MAIN_NS}color")
+            colors.append(None if color is None else color.get("rgb"))
+        return [colors[int(xf.get("fontId", 0))] for xf in styles.find(f"{_MAIN_NS}cellXfs")]
+
+    def shared_strings(self, limit: int | None = None) -> list[str]:
+        """The shared strings table; only its first `limit` + 1 entries when given."""
+        if "xl/sharedStrings.xml" not in self.zip.namelist():
+            return []
+        strings = []
+        with self.zip.open("xl/sharedStrings.xml") as source:
+            for _, element in ET.iterparse(source):
+                if element.tag != f"{_MAIN_NS}si":
+                    continue
+                strings.append("".join(text.text or "" for text in element.iter(f"{_MAIN_NS}t")))
+                element.clear()
+                if limit is not None and len(strings) > limit:
+                    break
+        return strings
+
+    def iter_cells(self) -> Iterator[tuple]:
+        """Yield (row, column index, style index, type, raw value) of the first sheet cells."""
+        with self.zip.open(self.sheet_path) as source:
+            for _, element in ET.iterparse(source):
+                if element.tag == f"{_MAIN_NS}row":
+                    element.clear()
+                    continue
+                if element.tag != f"{_MAIN_NS}c":
+                    continue
+                letters, row = _CELL_REFERENCE.match(element.get("r")).groups()
+                cell_type = element.get("t", "n")
+                if cell_type == "inlineStr":
+                    value = "".join(text.text or "" for text in element.iter(f"{_MAIN_NS}t"))
+                else:
+                    value = element.findtext(f"{_MAIN_NS}v")
+                yield int(row), _column_index(letters), int(element.get("s", 0)), cell_type, value
+
+    def header(self) -> list:
+        """The values of the first row; text as str, numbers as float."""
+        cells = []
+        for row, column, _, cell_type, value in self.iter_cells():
+            if row > 1:
+                break
+            cells.append((column, cell_type, value))
+
+        needed = [int(value) for _, cell_type, value in cells if cell_type == "s"]
+        strings = self.shared_strings(max(needed)) if needed else []
+        header = [None] * (max((column for column, _, _ in cells), default=-1) + 1)
+        for column, cell_type, value in cells:
+            if cell_type == "s":
+                header[column] = strings[int(value)]
+            elif cell_type in _TEXT_TYPES or value is None:
+                header[column] = value
+            else:
+                header[column] = float(value)
+        return header
+
+    def to_datetime(self, value: float) -> datetime.datetime:
+        return self.epoch + datetime.timedelta(days=value)
+
+
+def fingerprint(file_path: str) -> ExportFingerprint:
+    """
+    Read the header row and the font colors of the styles table of an export, and nothing
+    else.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to an '.xlsx' export, or to an '.xls' one (read with xlrd; only its header,
+        without font colors).
+
+    Returns
+    -------
+    ExportFingerprint
+        'columns' (the header, without the numeric cells; payment dates on flows),
+        'date_columns' (how many numeric cells follow the last name) and 'font_colors'.
+    """
+    if path.splitext(file_path)[1].lower() == ".xls":
+        # Optional; only for '.xls' exports
+        import xlrd
+
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            header = workbook.sheet_by_index(0).row_values(0)
+        finally:
+            workbook.release_resources()
+        font_colors = None
+    else:
+        xlsx = _XlsxFile(file_path)
+        try:
+            header = xlsx.header()
+            font_colors = frozenset(color for color in xlsx.font_colors() if color is not None)
+        finally:
+            xlsx.close()
+
+    columns = tuple(str(value).strip() for value in header if isinstance(value, str))
+    date_columns = sum(1 for value in header if isinstance(value, (int, float)))
+    return ExportFingerprint(columns, date_columns, font_colors)
+
+
+def layout_differences(layout: ExportLayout, export: ExportFingerprint) -> list[str]:
+    """Return what doesn't match between a layout and an export fingerprint (empty if none)."""
+    differences = []
+    missing = [column for column in layout.columns if column not in export.columns]
+    if missing:
+        differences.append(f"missing columns: {missing}")
+    unexpected = [column for column in export.columns if column not in layout.columns]
+    if unexpected and not layout.extra_columns:
+        differences.append(f"unexpected columns: {unexpected}")
+    present = [column for column in export.columns if column in layout.columns]
+    expected_order = [column for column in layout.columns if column in present]
+    if not missing and present != expected_order:
+        differences.append(f"columns order: {present}, expected {expected_order}")
+    if layout.date_columns and export.date_columns == 0:
+        differences.append("no payment date columns on the header")
+    if not layout.date_columns and export.date_columns > 0:
+        differences.append(f"{export.date_columns} numeric header cells")
+    if layout.font_colors is not None and export.font_colors is not None:
+        unknown = sorted(export.font_colors - layout.font_colors)
+        if unknown:
+            differences.append(f"unknown font colors: {unknown}")
+    return differences
+
+
+def detect_layout(file_path: str, kind: str) -> ExportLayout:
+    """
+    Identify the layout of an export, from its `fingerprint`.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the export.
+    kind : str
+        'flows' or 'movements'.
+
+    Returns
+    -------
+    ExportLayout
+        The first of `KNOWN_LAYOUTS` of that kind matching the export.
+
+    Raises
+    ------
+    UnknownLayoutError
+        If none matches; the message lists the differences with the closest layout.
+
+    Examples
+    --------
+    >>> detect_layout("./data_in/Resumen de flujos - 2023-11-06.xlsx", "flows").name
+    'flows-v1'
+    """
+    layouts = [layout for layout in KNOWN_LAYOUTS if layout.kind == kind]
+    if not layouts:
+        raise ValueError(f"Unknown export kind: {kind}, use 'flows' or 'movements'")
+
+    export = fingerprint(file_path)
+    differences = {layout.name: layout_differences(layout, export) for layout in layouts}
+    for layout in layouts:
+        if not differences[layout.name]:
+            return layout
+
+    closest = min(layouts, key=lambda layout: len(differences[layout.name]))
+    details = "\n".join(f"  - {difference}" for difference in differences[closest.name])
+    raise UnknownLayoutError(
+        f"Unknown {kind} layout on '{file_path}' (closest: {closest.name}):\n{details}"
+    )
+
+
+def _to_float(value) -> float:
+    return float(value) if value not in (None, "") else float("nan")
+
+
+def read_flows_v1(flows_file_path: str) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Parse a 'flows-v1' export in a single pass over its sheet XML.
+
+    Parameters
+    ----------
+    flows_file_path : str
+        Path to the flows export ('.xlsx').
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        The flows (columns 'ID', 'Solicitud' and 'Inversión', as `load_flows` for the
+        columns the pipeline uses), and the flow schedule (as
+        `cumplo_core.extract_flow_schedule`).
+
+    Description
+    -----------
+    The layout is known, so the status of every cell style is resolved once from the styles
+    table (font color -> `cumplo_core.FLOW_STATUSES`) and the cells are read as raw XML;
+    no cell objects are built and no styles are looked up per cell. Rows without an ID
+    (the footer labels) are skipped.
+    """
+    xlsx = _XlsxFile(flows_file_path)
+    try:
+        statuses = [cumplo_core.FLOW_STATUSES.get(color) for color in xlsx.font_colors()]
+        strings = xlsx.shared_strings()
+
+        header, flows, records = {}, [], []
+        current_row, remate_id = 0, None
+        for row, column, style, cell_type, value in xlsx.iter_cells():
+            if row != current_row:
+                current_row, remate_id = row, None
+            if cell_type == "s" and value is not None:
+                value = strings[int(value)]
+
+            if row == 1:
+                header[column] = value
+            elif column == 0:
+                if value not in (None, ""):
+                    remate_id = str(int(float(value)))
+                    flows.append([remate_id, None, None])
+            elif remate_id is None:
+                continue
+            elif column == 1:
+                flows[-1][column] = value
+            elif column == 2:
+                # Empty cells can still be styled (so they are on the XML), as NaN
+                flows[-1][column] = _to_float(value)
+            elif style < len(statuses) and statuses[style] is not None:
+                amount = _to_float(value)
+                due_date = xlsx.to_datetime(float(header[column]))
+                records.append((remate_id, due_date, amount, statuses[style]))
+    finally:
+        xlsx.close()
+
+    flows_df = some_utils.to_string_dtype(
+        pd.DataFrame(flows, columns=["ID", "Solicitud", "Inversión"]).astype(
+            {"ID": object, "Solicitud": object}
+        )
+    )
+    flow_schedule = pd.DataFrame(records, columns=["RemateID", "due_date", "amount", "status"])
+    flow_schedule["due_date"] = pd.to_datetime(flow_schedule["due_date"])
+    flow_schedule["amount"] = flow_schedule["amount"].astype(float)
+    return flows_df, flow_schedule
@@ -0,0 +1,265 @@
+import datetime
+import json
+import os
+from os import path
+
+import pandas as pd
+
+from . import some_utils
+
+# Current version of the store (a number), and the log of all the versions
+HEAD_FILE_NAME = "HEAD"
+VERSIONS_FILE_NAME = "versions.json"
+# One immutable snapshot per version; rows of (kind, key, value)
+SNAPSHOT_FILE_FORMAT = "mappings-v{version:06d}.feather"
+
+# normalised 'Solicitud' -> 'RemateID'
+SOLICITUD_KIND = "solicitud"
+# 'RemateID' -> 'Actor'
+ACTOR_KIND = "actor"
+
+
+def normalize_solicitud(solicitud: str) -> str:
+    """
+    Normalize a 'Solicitud' to use it as a key (see `some_utils.clean_spanish_characters`),
+    with repeated whitespace collapsed.
+
+    Examples
+    --------
+    >>> normalize_solicitud("  Crédito  Más Ingeniería ")
+    'credito mas ingenieria'
+    """
+    if pd.isna(solicitud):
+        return solicitud
+    return " ".join(some_utils.clean_spanish_characters(solicitud).split())
+
+
+def _write_atomic(write, file_path: str) -> None:
+    tmp_path = f"{file_path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, file_path)
+
+
+class MappingStore:
+    """
+    Versioned store of the 'Solicitud' -> 'RemateID' and 'RemateID' -> 'Actor' mappings
+    found on previous runs.
+
+    Both mappings never change once established, so the sanitizing stages consult the store
+    first (see `fill_remate_ids` and `known_actors`), only the 'Solicitud's it doesn't know
+    go through the matching against the flows, and what they resolve to is written back
+    (see `learn`).
+
+    Every change writes a new immutable snapshot, and moves 'HEAD' to it. A bad mapping is
+    dropped with `forget` (a new version without it), or undone with `rollback` (back to an
+    older version).
+
+    Parameters
+    ----------
+    store_dir : str
+        Folder of the store (created when needed).
+
+    Examples
+    --------
+    >>> store = MappingStore("./data_out/mappings/")
+    >>> movs_df = sanitize(movs_df, flows_df, mapping_store=store)
+    >>> store.versions()
+    >>> store.rollback(3)
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+
+        head_path = path.join(store_dir, HEAD_FILE_NAME)
+        version = 0
+        if path.exists(head_path):
+            with open(head_path) as head_file:
+                version = int(head_file.read().strip())
+        self._checkout(version)
+
+    def __len__(self) -> int:
+        return len(self.solicitudes) + len(self.actors)
+
+    def _checkout(self, version: int) -> None:
+        self.version = version
+        self.solicitudes, self.actors = {}, {}
+        if version == 0:
+            return
+        snapshot = pd.read_feather(self._snapshot_path(version))
+        for kind, mapping in [(SOLICITUD_KIND, self.solicitudes), (ACTOR_KIND, self.actors)]:
+            rows = snapshot[snapshot["kind"] == kind]
+            mapping.update(zip(rows["key"], rows["value"]))
+
+    def _snapshot_path(self, version: int) -> str:
+        return path.join(self.store_dir, SNAPSHOT_FILE_FORMAT.format(version=version))
+
+    def _read_log(self) -> list[dict]:
+        log_path = path.join(self.store_dir, VERSIONS_FILE_NAME)
+        if not path.exists(log_path):
+            return []
+        with open(log_path) as log_file:
+            return json.load(log_file)
+
+    def _set_head(self, version: int) -> None:
+        def write(tmp_path):
+            with open(tmp_path, "w") as head_file:
+                head_file.write(str(version))
+
+        _write_atomic(write, path.join(self.store_dir, HEAD_FILE_NAME))
+        self._checkout(version)
+
+    def _commit(self, solicitudes: dict, actors: dict, note: str) -> int:
+        log = self._read_log()
+        version = max((entry["version"] for entry in log), default=0) + 1
+        snapshot = pd.DataFrame(
+            [(SOLICITUD_KIND, key, value) for key, value in solicitudes.items()]
+            + [(ACTOR_KIND, key, value) for key, value in actors.items()],
+            columns=["kind", "key", "value"],
+            dtype=str,
+        )
+        _write_atomic(snapshot.to_feather, self._snapshot_path(version))
+
+        log.append(
+            {
+                "version": version,
+                "parent": self.version,
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "note": note,
+                "solicitudes": len(solicitudes),
+                "actors": len(actors),
+            }
+        )
+
+        def write(tmp_path):
+            with open(tmp_path, "w") as log_file:
+                json.dump(log, log_file, indent=1)
+
+        _write_atomic(write, path.join(self.store_dir, VERSIONS_FILE_NAME))
+        self._set_head(version)
+        return version
+
+    def versions(self) -> pd.DataFrame:
+        """
+        Return the log of versions; 'version', 'parent' (the version it was made from),
+        'created', 'note', and the number of 'solicitudes' and 'actors' mappings.
+        """
+        columns = ["version", "parent", "created", "note", "solicitudes", "actors"]
+        return pd.DataFrame(self._read_log(), columns=columns)
+
+    def add(
+        self, solicitudes: dict | None = None, actors: dict | None = None, note: str = ""
+    ) -> int:
+        """
+        Add mappings; keys already on the store keep their value.
+
+        Parameters
+        ----------
+        solicitudes : dict, optional
+            'Solicitud' (normalised here) -> 'RemateID'.
+        actors : dict, optional
+            'RemateID' -> 'Actor'.
+        note : str, optional
+            Stored on the versions log.
+
+        Returns
+        -------
+        int
+            The new version, or the current one when nothing was new.
+        """
+        new_solicitudes = {
+            normalize_solicitud(key): str(value)
+            for key, value in (solicitudes or {}).items()
+            if normalize_solicitud(key) not in self.solicitudes
+        }
+        new_actors = {
+            str(key): str(value)
+            for key, value in (actors or {}).items()
+            if str(key) not in self.actors
+        }
+        if not new_solicitudes and not new_actors:
+            return self.version
+        return self._commit(
+            {**self.solicitudes, **new_solicitudes}, {**self.actors, **new_actors}, note
+        )
+
+    def forget(
+        self, solicitudes: list[str] = (), remate_ids: list[str] = (), note: str = ""
+    ) -> int:
+        """
+        Drop (bad) mappings, on a new version: the given 'Solicitud's, and the 'Actor' of
+        the given 'RemateID's.
+
+        Returns
+        -------
+        int
+            The new version, or the current one when none of them was on the store.
+        """
+        dropped_solicitudes = {normalize_solicitud(solicitud) for solicitud in solicitudes}
+        dropped_ids = {str(remate_id) for remate_id in remate_ids}
+        kept_solicitudes = {
+            key: value for key, value in self.solicitudes.items() if key not in dropped_solicitudes
+        }
+        kept_actors = {key: value for key, value in self.actors.items() if key not in dropped_ids}
+        if len(kept_solicitudes) + len(kept_actors) == len(self):
+            return self.version
+        return self._commit(kept_solicitudes, kept_actors, note)
+
+    def rollback(self, version: int) -> None:
+        """
+        Move 'HEAD' back to an older version (0 is the empty store); later versions are
+        kept on the log, and new ones are made from this one.
+
+        Raises
+        ------
+        ValueError
+            If the version doesn't exist.
+        """
+        if version != 0 and not path.exists(self._snapshot_path(version)):
+            raise ValueError(f"Unknown mapping store version: {version}")
+        self._set_head(version)
+
+    def fill_remate_ids(self, movs_df: pd.DataFrame) -> pd.DataFrame:
+        """Fill the missing 'RemateID's of the movements whose 'Solicitud' is on the store."""
+        if not self.solicitudes:
+            return movs_df
+        missing = movs_df["RemateID"].isna() & movs_df["Solicitud"].notna()
+        known = some_utils.apply_on_uniques(
+            movs_df.loc[missing, "Solicitud"],
+            lambda uniques: uniques.map(normalize_solicitud).map(self.solicitudes),
+        ).dropna()
+        movs_df.loc[known.index, "RemateID"] = known.astype(movs_df["RemateID"].dtype)
+        return movs_df
+
+    def known_actors(self) -> pd.Series:
+        """Return the 'RemateID' -> 'Actor' mappings, as a Series indexed by 'RemateID'."""
+        return pd.Series(self.actors, dtype=object, name="Actor").rename_axis("RemateID")
+
+    def learn(self, movs_df: pd.DataFrame, note: str = "") -> int:
+        """
+        Add the mappings found on sanitized movements (after `extract_actors`).
+
+        Only the 'Solicitud's without the ID as their last word are added (the others don't
+        need to be matched), and the old investments identified by their 'Actor' are left
+        out (their 'RemateID' is their 'Actor').
+
+        Returns
+        -------
+        int
+            The new version, or the current one when nothing was new.
+        """
+        remate_ids = movs_df["RemateID"].astype(object)
+        resolved = movs_df[
+            remate_ids.notna() & (remate_ids != movs_df["Actor"].astype(object).fillna(""))
+        ]
+        with_solicitud = resolved[resolved["Solicitud"].notna()]
+        last_words = some_utils.apply_on_uniques(
+            with_solicitud["Solicitud"], lambda uniques: uniques.str.split().str[-1]
+        )
+        matched = with_solicitud[pd.to_numeric(last_words, errors="coerce").isna()]
+        with_actor = resolved[resolved["Actor"].notna()].drop_duplicates("RemateID", keep="last")
+        return self.add(
+            dict(zip(matched["Solicitud"], matched["RemateID"])),
+            dict(zip(with_actor["RemateID"], with_actor["Actor"])),
+            note,
+        )
@@ -0,0 +1,801 @@
+import datetime
+import inspect
+import sys
+from os import path
+
+import numpy as np
+import pandas as pd
+
+from . import (
+    cumplo_cache,
+    cumplo_changes,
+    cumplo_core,
+    cumplo_cube,
+    cumplo_fuzzy,
+    cumplo_ids,
+    cumplo_ingest,
+    cumplo_layouts,
+    cumplo_mappings,
+    cumplo_storage,
+    some_utils,
+)
+
+# Export file names, as downloaded from cumplo.cl
+MOVS_PREFIX = "Resumen de movimientos - "
+MOVS_EXTENSION = "xls"
+FLOWS_PREFIX = "Resumen de flujos - "
+FLOWS_EXTENSION = "xlsx"
+FIXDATA_FILE_NAME = "fix_data.csv"
+
+# Stages memoized by `run_stages`, in order
+CACHED_STAGES = ["ingest", "solicitud", "remate_ids", "actors", "fixes", "classify"]
+
+# Movements that are not related to any investment
+IGNORED_DESCRIPTIONS = ["Abono a Saldo Cumplo", "Retiro de saldo Cumplo"]
+
+# Patterns to extract `Solicitud` from `Descripción` (first group)
+SOLICITUD_PATTERNS = [
+    # Pago de inversión, solicitud: Crédito Kio Solutions
+    r"solicitud: (\w.+)",
+    # Devolución de Puntos por solicitud "Capital de trabajo Linea Comex".
+    r'solicitud "(\w.+)".',
+    # Reajuste puntos Cumplo por solicitud 73278
+    r"Reajuste puntos Cumplo por solicitud (\w.+)",
+    # regularizacion saldo cumplo operacion 70500
+    r"regularizacion saldo cumplo operacion (\w.+)",
+    # reembolso puntos cumplo operación 73014
+    r"reembolso puntos cumplo operación (\w.+)",
+    # Devolución de fondos por crédito no concretado, solicitud: Capital de trabajo Linea Comex
+    r"Devolución de fondos por crédito no concretado, solicitud: (\w.+)",
+    # regularizacion saldo cumplo (3cuotas) operación 71701
+    r"regularizacion saldo cumplo \(3cuotas\) operación (\w.+)",
+    # regularizacion saldo cumplo, capital faltante operación 71701
+    r"regularizacion saldo cumplo, capital faltante operación (\w.+)",
+]
+
+# Patterns to extract `Actor` from `Solicitud` (first group), in order of preference
+ACTOR_PATTERNS = [
+    # Credito COMERCIAL 2050 SPA 24494 >> 'COMERCIAL 2050 SPA'
+    r"Credito (.+) (\d+)",
+    # Crédito Notebookcenter >> 'Notebookcenter'
+    r"^Crédito (.+)",
+    # Credito Green Logistic >> 'Green Logistic'
+    r"^Credito (.+)",
+    # BAXIS EIRL: Crédito empresa 80% garantizado >> 'BAXIS EIRL'
+    r"(.+): .*",
+    # Financiamento Febrero >> 'Financiamento Febrero', but 73278 >> na
+    r"^(?!\d+$)(.+)",
+]
+
+
+def load_flows(flows_file_path: str) -> pd.DataFrame:
+    """
+    Read a 'Resumen de flujos' export, removing the footer and normalising the 'ID' column.
+
+    Parameters
+    ----------
+    flows_file_path : str
+        Path to the flows export.
+
+    Returns
+    -------
+    pd.DataFrame
+        The flows, with 'ID' as strings without decimals, and text columns as
+        `some_utils.STRING_DTYPE`.
+    """
+    flows_df = pd.read_excel(flows_file_path)
+
+    # Remove last 5 rows, that are Label cells
+    flows_df = flows_df[:-5]
+
+    # Convert Ids to strings w/o decimals
+    flows_df["ID"] = flows_df["ID"].apply(int).apply(str)
+    return some_utils.to_string_dtype(flows_df)
+
+
+def load_movements(movs_file_path: str) -> pd.DataFrame:
+    """
+    Read a 'Resumen de movimientos' export, keeping only the investment related movements.
+
+    Parameters
+    ----------
+    movs_file_path : str
+        Path to the movements export.
+
+    Returns
+    -------
+    pd.DataFrame
+        The movements, without 'Abono a Saldo Cumplo'/'Retiro de saldo Cumplo' rows and
+        without zero amount rows. Text columns are `some_utils.STRING_DTYPE`.
+    """
+    movs_df = some_utils.to_string_dtype(pd.read_excel(movs_file_path))
+    return filter_movements(movs_df)
+
+
+def filter_movements(movs_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drop the movements that are not related to investments.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        Raw movements, with columns 'Descripción', 'Cargo' and 'Abono'.
+
+    Returns
+    -------
+    pd.DataFrame
+        The movements with numeric NAs filled with 0, and without ignored descriptions or
+        zero amount rows.
+    """
+    # Fill NAs (only numeric ones; string columns can't hold a 0)
+    movs_df = movs_df.fillna({column: 0 for column in movs_df.select_dtypes("number").columns})
+
+    # Remove rows that Descripción is 'Abono a Saldo Cumplo' or 'Retiro de Saldo Cumplo'
+    movs_df = movs_df[~movs_df["Descripción"].isin(IGNORED_DESCRIPTIONS)]
+
+    # keep only meaningful movements, Cargo or Abono > 0...
+    movs_df = movs_df[(movs_df["Cargo"] > 0) | (movs_df["Abono"] > 0)]
+    return movs_df
+
+
+# Parser of each of `cumplo_layouts.KNOWN_LAYOUTS`; flows parsers return (flows, flow schedule)
+LAYOUT_PARSERS = {
+    "movements-v1": load_movements,
+    "flows-v1": cumplo_layouts.read_flows_v1,
+}
+
+
+def load_exports(
+    movs_file_path: str | list[str], flows_file_path: str
+) -> (pd.DataFrame, pd.DataFrame, pd.DataFrame):
+    """
+    Identify the layout of both exports, and parse them with the parser for that layout.
+
+    Parameters
+    ----------
+    movs_file_path : str or list[str]
+        Path to the movements export; or paths to several (maybe overlapping) movements
+        exports, merged without the movements repeated across them (see
+        `cumplo_ingest.load_merged_movements`).
+    flows_file_path : str
+        Path to the flows export.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        The movements (see `load_movements`), the flows and the flow schedule (see
+        `cumplo_layouts.read_flows_v1`).
+
+    Raises
+    ------
+    cumplo_layouts.UnknownLayoutError
+        If an export doesn't match a known layout; all are checked before parsing any.
+    ValueError
+        If `movs_file_path` is an empty list.
+
+    Description
+    -----------
+    Only the header row and the styles table of each export are read to identify them (see
+    `cumplo_layouts.detect_layout`), so a changed export fails in milliseconds, with the
+    differences, instead of deep inside the sanitizing stages. Flows exports whose styles
+    can't be read ('.xls') go through `load_flows` and `cumplo_core.extract_flow_schedule`.
+    """
+    movs_file_paths = [movs_file_path] if isinstance(movs_file_path, str) else movs_file_path
+    if not movs_file_paths:
+        raise ValueError("No movements exports to merge")
+    movs_layouts = [
+        cumplo_layouts.detect_layout(file_path, "movements") for file_path in movs_file_paths
+    ]
+    flows_layout = cumplo_layouts.detect_layout(flows_file_path, "flows")
+
+    if isinstance(movs_file_path, str):
+        movs_df = LAYOUT_PARSERS[movs_layouts[0].name](movs_file_path)
+    else:
+        movs_df = cumplo_ingest.load_merged_movements(movs_file_paths)
+    if path.splitext(flows_file_path)[1].lower() == ".xls":
+        flows_df = load_flows(flows_file_path)
+        flow_schedule = cumplo_core.extract_flow_schedule(flows_file_path)
+    else:
+        flows_df, flow_schedule = LAYOUT_PARSERS[flows_layout.name](flows_file_path)
+    return movs_df, flows_df, flow_schedule
+
+
+def extract_solicitud(movs_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extract the 'Solicitud' column from 'Descripción' using `SOLICITUD_PATTERNS`.
+    """
+    for pattern in SOLICITUD_PATTERNS:
+        movs_df = some_utils.match_group_and_assign(movs_df, pattern, "Descripción", "Solicitud")
+    return movs_df
+
+
+def extract_remate_ids(movs_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Set 'RemateID' as the last word of 'Solicitud', when that word is numeric (NA otherwise).
+    """
+    # First a 'quick and dirty' approach that works for all 'modern' nomeclature
+    movs_df["RemateID"] = some_utils.apply_on_uniques(
+        movs_df["Solicitud"], lambda uniques: uniques.str.split().str[-1]
+    ).astype(movs_df["Solicitud"].dtype)
+
+    # Set non-numeric RemateID as NA
+    mask = some_utils.apply_on_uniques(
+        movs_df["RemateID"], lambda uniques: pd.to_numeric(uniques, errors="coerce").isna()
+    )
+    movs_df.loc[mask, "RemateID"] = pd.NA
+    return movs_df
+
+
+def resolve_ids_from_flows(
+    movs_df: pd.DataFrame, flows_df: pd.DataFrame, verbose: bool = True
+) -> pd.DataFrame:
+    """
+    Fill the missing 'RemateID's matching 'Solicitud' between movements and flows.
+
+    Two passes are made; first flows 'Solicitud' as a prefix of movements 'Solicitud',
+    then the opposite, only for the flow ids that are still not assigned.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        Movements, with columns 'Solicitud' and 'RemateID'.
+    flows_df : pd.DataFrame
+        Flows, with columns 'ID' and 'Solicitud'.
+    verbose : bool, optional
+        If True (default), print the 'Solicitud's without any match.
+
+    Returns
+    -------
+    pd.DataFrame
+        The movements with the recovered 'RemateID's.
+    """
+    # First we need to know which ids we already have;
+    known_ids = movs_df.query("RemateID.notna()")["RemateID"].unique()
+
+    # And we use that to only go through the unknown ids...
+    unknown_id_mask = ~flows_df["ID"].isin(known_ids)
+
+    for index, row in flows_df[unknown_id_mask].iterrows():
+        flow_id = row["ID"]
+        flow_solicitud = row["Solicitud"]
+        mask = movs_df["Solicitud"].str.startswith(flow_solicitud, na=False)
+
+        if not mask.any():
+            if verbose:
+                print(
+                    f"We can't find any match for: Index: [{index}] id:[{flow_id}]- [{flow_solicitud}]"
+                )
+            continue
+
+        movs_df.loc[mask, "RemateID"] = str(int(flow_id))
+
+    # Opposite approach; flows 'Solicitud' could have more info than movements 'Solicitud'
+    known_ids = set(movs_df.query("RemateID.notna()")["RemateID"].unique())
+    unassigned_flow_ids = set(flows_df["ID"]) - known_ids
+    unassigned_df = flows_df[flows_df["ID"].isin(unassigned_flow_ids)]
+
+    na_ids_mask = movs_df["RemateID"].isna()
+    na_solicitus_mask = movs_df["Solicitud"].notna()
+
+    for index, row in movs_df[na_ids_mask & na_solicitus_mask].iterrows():
+        current_solicitud = row["Solicitud"]
+
+        mask = unassigned_df["Solicitud"].str.startswith(current_solicitud, na=False)
+        if not mask.any():
+            if verbose:
+                print(f"We can't find any match for: Index: [{index}] - [{current_solicitud}]")
+            continue
+
+        current_id = unassigned_df[mask]["ID"].values[0]
+        movs_df.loc[index, "RemateID"] = str(int(current_id))
+
+    return movs_df
+
+
+def extract_actors(movs_df: pd.DataFrame, known_actors: pd.Series = None) -> pd.DataFrame:
+    """
+    Extract the 'Actor' from 'Solicitud', and use it as 'RemateID' for old investments.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        Movements, with columns 'Solicitud' and 'RemateID'.
+    known_actors : pd.Series, optional
+        'RemateID' -> 'Actor' mappings from previous runs (see
+        `cumplo_mappings.MappingStore.known_actors`), used before the ones found on
+        `movs_df` to fill the missing 'Actor's.
+
+    Returns
+    -------
+    pd.DataFrame
+        The movements with a normalised 'Actor' column, and 'RemateID' filled with the
+        'Actor' when no ID could be found.
+    """
+    for pattern in ACTOR_PATTERNS:
+        movs_df = some_utils.match_group_and_assign(movs_df, pattern, "Solicitud", "Actor")
+
+    # Clean and replace spanish characters...
+    movs_df["Actor"] = some_utils.apply_on_uniques(
+        movs_df["Actor"], some_utils.clean_spanish_characters, elementwise=True
+    ).astype(movs_df["Actor"].dtype)
+
+    # We fill the pending NA Actors using a RemateID -> Actor mapping (the last Actor wins)
+    complete_df = movs_df.query("Actor.notna() & RemateID.notna()")
+    id_acts = complete_df.drop_duplicates("RemateID", keep="last").set_index("RemateID")["Actor"]
+    if known_actors is not None and not known_actors.empty:
+        id_acts = pd.concat([known_actors, id_acts[~id_acts.index.isin(known_actors.index)]])
+    movs_df["Actor"] = movs_df["Actor"].fillna(
+        movs_df["RemateID"].map(id_acts, na_action="ignore").astype(movs_df["Actor"].dtype)
+    )
+
+    # When RemateID is NA and Actor is not na, fill with Actor! (old-old investments)
+    movs_df["RemateID"] = movs_df["RemateID"].fillna(movs_df["Actor"])
+    return movs_df
+
+
+def apply_fixes(movs_df: pd.DataFrame, fixdata_csv_path: str) -> pd.DataFrame:
+    """
+    Append the manual fixes from `fixdata_csv_path` (if it exists) and normalise 'Actor'.
+    """
+    if fixdata_csv_path is not None and path.exists(fixdata_csv_path):
+        movs_df = cumplo_core.insert_fix(movs_df, fixdata_csv_path)
+
+    # Clean and replace spanish characters...
+    movs_df["Actor"] = some_utils.apply_on_uniques(
+        movs_df["Actor"], some_utils.clean_spanish_characters, elementwise=True
+    ).astype(movs_df["Actor"].dtype)
+    return movs_df
+
+
+def classify(
+    movs_df: pd.DataFrame,
+    flow_schedule: pd.DataFrame,
+    grace_period_days: int = 60,
+    considerable_amount: int = 100000,
+    despreciable_amount: int = 200,
+    grace_period_days_since_last_payment: int = 60,
+    uncollectible_amount: int = cumplo_core.UNCOLLECTIBLE_AMOUNT,
+    registry: cumplo_ids.RemateIDRegistry = None,
+) -> pd.DataFrame:
+    """
+    Assign the 'Estado' column: Unexecuted, Completed, Active or Uncollectible.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        Movements, with columns 'RemateID', 'Fecha', 'Abono', 'Cargo' and 'Descripción'.
+    flow_schedule : pd.DataFrame
+        The flow schedule (see `cumplo_core.extract_flow_schedule`), used to find active,
+        late and uncollectible investments.
+    grace_period_days : int, optional
+        Days a pending payment can be late before the investment is uncollectible.
+    considerable_amount : int, optional
+        Negative balance from which an investment not present in flows is 'just payed'.
+    despreciable_amount : int, optional
+        Balance up to which an investment is considered unexecuted.
+    grace_period_days_since_last_payment : int, optional
+        Days since the last movement of a completed investment with a negative balance
+        before it is considered uncollectible.
+    uncollectible_amount : int, optional
+        Negative balance from which a completed investment can be uncollectible.
+    registry : cumplo_ids.RemateIDRegistry, optional
+        Registry to encode the RemateIDs with, kept across calls (the new RemateIDs are
+        added to it); default is a new one.
+
+    Returns
+    -------
+    pd.DataFrame
+        The movements with the 'Estado' column.
+    """
+    # RemateIDs as int32 codes (see `cumplo_ids`), hashed once; every set operation, `isin`
+    # and groupby below works on integer arrays, and the output keeps the original 'RemateID'
+    if registry is None:
+        registry = cumplo_ids.RemateIDRegistry.from_ids([])
+    codes, schedule_codes = registry.encode_adding(movs_df["RemateID"], flow_schedule["RemateID"])
+    coded_df = movs_df[["Fecha", "Descripción", "Cargo", "Abono"]].assign(RemateID=codes)
+    coded_schedule = flow_schedule.assign(RemateID=schedule_codes)
+
+    # Movements without RemateID are never grouped by the extractors, so they are 'Completed'
+    known_df = coded_df[codes != cumplo_ids.MISSING_CODE]
+
+    flow_ids, active_ids, late_ids, uncollectible_ids = (
+        _as_codes(ids)
+        for ids in cumplo_core.ids_from_flow_schedule(coded_schedule, grace_period_days)
+    )
+
+    # Obtain all the ids that are not present in the flow file
+    all_ids = np.unique(codes)
+    not_present_in_flows_ids = np.setdiff1d(all_ids, flow_ids)
+
+    just_payed_ids = _as_codes(
+        cumplo_core.extract_just_payed(known_df, not_present_in_flows_ids, considerable_amount)
+    )
+    unexecuted_ids = _as_codes(cumplo_core.extract_unexecuted(known_df, despreciable_amount))
+
+    # Filter ids removing unexecuted ids
+    active_ids = np.setdiff1d(active_ids, unexecuted_ids)
+    late_ids = np.setdiff1d(late_ids, unexecuted_ids)
+    uncollectible_ids = np.setdiff1d(uncollectible_ids, unexecuted_ids)
+
+    # All ids not active, unexecuted, just payed or late_but_collectibles are completed ids
+    late_but_collectibles = np.setdiff1d(late_ids, uncollectible_ids)
+    completed_ids = np.setdiff1d(
+        all_ids, np.concatenate([active_ids, unexecuted_ids, just_payed_ids, late_but_collectibles])
+    )
+
+    # Completed but not completely payed are uncollectibles
+    completed_df = known_df[np.isin(known_df["RemateID"].to_numpy(), completed_ids)]
+    completed_but_uncollectible_ids = _as_codes(
+        cumplo_core.extract_uncollectibles(
+            completed_df, grace_period_days_since_last_payment, uncollectible_amount
+        )
+    )
+    completed_ids = np.setdiff1d(completed_ids, completed_but_uncollectible_ids)
+    uncollectible_ids = np.union1d(uncollectible_ids, completed_but_uncollectible_ids)
+
+    def has_id_in(ids):
+        return np.isin(codes, ids)
+
+    masks = {
+        "Unexecuted": has_id_in(unexecuted_ids),
+        "Completed": has_id_in(completed_ids),
+        # Active: Active, Just Payed, or Late => Late are late, but Active!
+        "Active": has_id_in(late_ids) | has_id_in(active_ids) | has_id_in(just_payed_ids),
+        "Uncollectible": has_id_in(uncollectible_ids),
+    }
+    movs_df["Estado"] = "NotAssigned"
+    for estado in cumplo_core.ESTADO_PRECEDENCE:
+        movs_df.loc[masks[estado], "Estado"] = estado
+    return movs_df
+
+
+def _as_codes(ids) -> np.ndarray:
+    # The ids returned by the `cumplo_core` extractors, as an array of registry codes
+    return np.asarray(ids, dtype=np.int32)
+
+
+def sanitize(
+    movs_df: pd.DataFrame,
+    flows_df: pd.DataFrame,
+    fixdata_csv_path: str | None = None,
+    verbose: bool = True,
+    fuzzy_threshold: float | None = None,
+    mapping_store: cumplo_mappings.MappingStore = None,
+) -> pd.DataFrame:
+    """
+    Run the sanitizing stages over already filtered movements; from 'Solicitud'
+    extraction to manual fixes.
+
+    When `fuzzy_threshold` is given, the 'RemateID's still missing after
+    `resolve_ids_from_flows` are matched by similarity (see `cumplo_fuzzy.resolve_ids_fuzzy`),
+    as the notebook does.
+
+    When `mapping_store` is given, the 'Solicitud's and 'Actor's it knows are resolved from
+    it first, and the new ones are written back (see `cumplo_mappings.MappingStore`).
+    """
+    movs_df = extract_solicitud(movs_df)
+    movs_df = extract_remate_ids(movs_df)
+    if mapping_store is not None:
+        movs_df = mapping_store.fill_remate_ids(movs_df)
+    movs_df = resolve_ids_from_flows(movs_df, flows_df, verbose)
+    if fuzzy_threshold is not None:
+        movs_df, _ = cumplo_fuzzy.resolve_ids_fuzzy(
+            movs_df, flows_df, fuzzy_threshold, verbose=verbose
+        )
+    movs_df = _extract_and_learn_actors(movs_df, mapping_store)
+    movs_df = apply_fixes(movs_df, fixdata_csv_path)
+    return movs_df
+
+
+def _extract_and_learn_actors(
+    movs_df: pd.DataFrame, mapping_store: cumplo_mappings.MappingStore = None
+) -> pd.DataFrame:
+    if mapping_store is None:
+        return extract_actors(movs_df)
+    movs_df = extract_actors(movs_df, mapping_store.known_actors())
+    mapping_store.learn(movs_df)
+    return movs_df
+
+
+def stage_cache(cache_dir: str | cumplo_cache.StageCache) -> cumplo_cache.StageCache:
+    """
+    Return the `cumplo_cache.StageCache` of a folder (`cache_dir` itself, when it is already
+    a cache), versioned by the source code the stages run (see `code_version`).
+    """
+    if isinstance(cache_dir, cumplo_cache.StageCache):
+        return cache_dir
+    return cumplo_cache.StageCache(cache_dir, code_version())
+
+
+def code_version() -> str:
+    """
+    Return the fingerprint of the code the stages run (see `cumplo_cache.code_fingerprint`):
+    this module and every module it calls into, `cumplo_core`, `cumplo_ingest`,
+    `cumplo_layouts`, `cumplo_ids`, `cumplo_fuzzy`, `cumplo_mappings` and `some_utils`.
+    """
+    return cumplo_cache.code_fingerprint(
+        cumplo_core,
+        cumplo_ingest,
+        cumplo_layouts,
+        cumplo_ids,
+        cumplo_fuzzy,
+        cumplo_mappings,
+        some_utils,
+        sys.modules[__name__],
+    )
+
+
+def run_stages(
+    movs_file_path: str | list[str],
+    flows_file_path: str,
+    cache_dir: str | cumplo_cache.StageCache,
+    fixdata_csv_path: str | None = None,
+    verbose: bool = True,
+    mapping_store: cumplo_mappings.MappingStore = None,
+    registry: cumplo_ids.RemateIDRegistry = None,
+    **classify_kwargs,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Load, sanitize and classify the exports, memoizing every stage output on `cache_dir`.
+
+    Parameters
+    ----------
+    movs_file_path : str or list[str]
+        Path to the movements export, or to several of them (see `load_exports`).
+    flows_file_path : str
+        Path to the flows export.
+    cache_dir : str or cumplo_cache.StageCache
+        Folder for the stage outputs, or the cache itself (see `stage_cache`).
+    fixdata_csv_path : str, optional
+        Path to the manual fixes (see `apply_fixes`).
+    verbose : bool, optional
+        If True (default), print unmatched 'Solicitud's (only when that stage runs).
+    mapping_store : cumplo_mappings.MappingStore, optional
+        Mappings from previous runs, consulted (and updated) as `sanitize` does.
+    registry : cumplo_ids.RemateIDRegistry, optional
+        Registry kept across runs, for `classify` (not part of the keys; codes never leave
+        the stage).
+    **classify_kwargs
+        Thresholds forwarded to `classify`.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        The classified movements, and the flow schedule.
+
+    Description
+    -----------
+    The stages are `CACHED_STAGES`:
+    - ingest: `load_exports`,
+    - solicitud: `extract_solicitud`,
+    - remate_ids: `extract_remate_ids` and `resolve_ids_from_flows`,
+    - actors: `extract_actors`,
+    - fixes: `apply_fixes`,
+    - classify: `classify`.
+
+    The ingest key is made of the fingerprints of the exports, every other key of the
+    upstream key plus the stage parameters (the 'fix_data.csv' fingerprint, the thresholds
+    and today's date, as the grace periods are counted to today); and all of them of the
+    source code the stages run (see `code_version`). So a stage output is reused only when
+    its input frames, parameters and code are the same, and the run starts after the last
+    stored output; ie: a new `despreciable_amount` only runs `classify` again.
+    With a `mapping_store`, its version is part of the 'remate_ids' and 'actors' keys.
+
+    Examples
+    --------
+    >>> movs_df, flow_schedule = run_stages(movs_path, flows_path, "./data_out/cache/")
+    >>> movs_df, flow_schedule = run_stages(
+    ...     movs_path, flows_path, cache_dir="./data_out/cache/", despreciable_amount=1000
+    ... )
+    """
+    # Thresholds with their defaults, so explicit defaults share the key (and typos fail here)
+    thresholds = inspect.signature(classify).bind(None, None, **classify_kwargs)
+    thresholds.apply_defaults()
+    thresholds = dict(list(thresholds.arguments.items())[2:])
+    del thresholds["registry"]
+
+    stage_parameters = {
+        "ingest": {
+            "movs": (
+                cumplo_cache.file_fingerprint(movs_file_path)
+                if isinstance(movs_file_path, str)
+                else [cumplo_cache.file_fingerprint(file_path) for file_path in movs_file_path]
+            ),
+            "flows": cumplo_cache.file_fingerprint(flows_file_path),
+        },
+        "solicitud": {},
+        "remate_ids": {"mappings": mapping_store and mapping_store.version},
+        "actors": {"mappings": mapping_store and mapping_store.version},
+        "fixes": {"fixdata": cumplo_cache.file_fingerprint(fixdata_csv_path)},
+        "classify": {**thresholds, "as_of": datetime.datetime.now().date()},
+    }
+
+    cache = stage_cache(cache_dir)
+    keys, upstream = {}, None
+    for stage in CACHED_STAGES:
+        upstream = keys[stage] = cache.key(stage, upstream, **stage_parameters[stage])
+
+    ingested = cache.load("ingest", keys["ingest"])
+    if ingested is None:
+        ingested = cache.save(
+            "ingest",
+            keys["ingest"],
+            dict(
+                zip(
+                    ["movs_df", "flows_df", "flow_schedule"],
+                    load_exports(movs_file_path, flows_file_path),
+                )
+            ),
+        )
+    flows_df, flow_schedule = ingested["flows_df"], ingested["flow_schedule"]
+
+    def remate_ids_step(df):
+        df = extract_remate_ids(df)
+        if mapping_store is not None:
+            df = mapping_store.fill_remate_ids(df)
+        return resolve_ids_from_flows(df, flows_df, verbose)
+
+    steps = {
+        "solicitud": extract_solicitud,
+        "remate_ids": remate_ids_step,
+        "actors": lambda df: _extract_and_learn_actors(df, mapping_store),
+        "fixes": lambda df: apply_fixes(df, fixdata_csv_path),
+        "classify": lambda df: classify(df, flow_schedule, **thresholds, registry=registry),
+    }
+
+    # Start after the last stored output
+    stages = list(steps)
+    movs_df, start = ingested["movs_df"], 0
+    for position in reversed(range(len(stages))):
+        stored = cache.load(stages[position], keys[stages[position]])
+        if stored is not None:
+            movs_df, start = stored, position + 1
+            break
+
+    for stage in stages[start:]:
+        movs_df = cache.save(stage, keys[stage], steps[stage](movs_df))
+    return movs_df, flow_schedule
+
+
+def _latest_export_path(scanner, prefix: str, extension: str) -> str:
+    latest = scanner.latest(prefix, extension)
+    if latest is None:
+        raise FileNotFoundError(
+            f"No '{prefix}*.{extension}' export found on: [{scanner.data_in_folder}]"
+        )
+    return latest.path
+
+
+def run_pipeline(
+    data_in_folder: str,
+    data_out_folder: str,
+    movs_file_path: str | list[str] | None = None,
+    flows_file_path: str | None = None,
+    partitioned: bool = False,
+    verbose: bool = True,
+    backend: str = "pandas",
+    cache_dir: str | None = None,
+    change_feed: bool = True,
+    reporting_cube: bool = True,
+    mapping_dir: str | None = None,
+    merge_exports: bool = False,
+    **classify_kwargs,
+) -> str:
+    """
+    Run the whole notebook, non-interactively, and save the classified movements
+    (and the flow schedule).
+
+    Parameters
+    ----------
+    data_in_folder : str
+        Folder with the exports and the optional 'fix_data.csv'.
+    data_out_folder : str
+        Folder where the output is written.
+    movs_file_path : str or list[str], optional
+        Movements export to use, or several to merge (see `load_exports`); default is the
+        most recent on `data_in_folder`, by the date on its name (see
+        `cumplo_watch.ExportScanner.latest`), or all of them with `merge_exports`.
+    flows_file_path : str, optional
+        Flows export to use (default is the most recent on `data_in_folder`, as above).
+    partitioned : bool, optional
+        Write a partitioned dataset instead of a single feather file (see
+        `cumplo_storage.save_classified`).
+    verbose : bool, optional
+        If True (default), print unmatched 'Solicitud's as the notebook does.
+    backend : str, optional
+        'pandas' (default) or 'polars'; the latter runs the sanitize and classify stages as
+        a multi-threaded polars lazy query (see `cumplo_polars`, needs the 'polars' extra).
+    cache_dir : str, optional
+        Folder to memoize the stage outputs on (see `run_stages`); only for the 'pandas'
+        backend. When None (default), every stage runs.
+    change_feed : bool, optional
+        If True (default), append the investments whose 'Estado' or balance changed since
+        the previous run to the change feed on `data_out_folder` (see
+        `cumplo_changes.record_changes`).
+    reporting_cube : bool, optional
+        If True (default), also build (or update) the monthly reporting cube on
+        `data_out_folder` (see `cumplo_cube.materialize_cube`).
+    mapping_dir : str, optional
+        Folder of a `cumplo_mappings.MappingStore`, to resolve the 'Solicitud's and 'Actor's
+        seen on previous runs from it (and store the new ones); only for the 'pandas'
+        backend. When None (default), every 'Solicitud' is matched against the flows.
+    merge_exports : bool, optional
+        If True, merge every movements export on `data_in_folder` (ie: downloaded for
+        different date ranges), without the movements repeated across them, instead of
+        using only the most recent one (default is False).
+    **classify_kwargs
+        Thresholds forwarded to `classify`.
+
+    Returns
+    -------
+    str
+        The path to the output.
+
+    Examples
+    --------
+    >>> run_pipeline("./data_in/", "./data_out/")
+    './data_out/sanitized_and_classified.feather'
+    >>> run_pipeline("./data_in/", "./data_out/", backend="polars")
+    './data_out/sanitized_and_classified.feather'
+    >>> run_pipeline("./data_in/", "./data_out/", cache_dir="./data_out/cache/")
+    './data_out/sanitized_and_classified.feather'
+    >>> run_pipeline("./data_in/", "./data_out/", merge_exports=True)
+    './data_out/sanitized_and_classified.feather'
+    """
+    if backend not in ("pandas", "polars"):
+        raise ValueError(f"Unknown backend: {backend}, use 'pandas' or 'polars'")
+    if cache_dir is not None and backend != "pandas":
+        raise ValueError("Stage outputs can only be memoized with the 'pandas' backend")
+    if mapping_dir is not None and backend != "pandas":
+        raise ValueError("The mapping store can only be used with the 'pandas' backend")
+
+    if movs_file_path is None and merge_exports:
+        movs_file_path = some_utils.get_matching_filenames(
+            data_in_folder, MOVS_PREFIX, MOVS_EXTENSION
+        )
+    if movs_file_path is None or flows_file_path is None:
+        # Imported here, as cumplo_watch imports this module
+        from . import cumplo_watch
+
+        # The most recent exports by the date on their names, as `cumplo_watch.watch` picks them
+        scanner = cumplo_watch.ExportScanner(data_in_folder)
+        if movs_file_path is None:
+            movs_file_path = _latest_export_path(scanner, MOVS_PREFIX, MOVS_EXTENSION)
+        if flows_file_path is None:
+            flows_file_path = _latest_export_path(scanner, FLOWS_PREFIX, FLOWS_EXTENSION)
+
+    fixdata_csv_path = path.join(data_in_folder, FIXDATA_FILE_NAME)
+    mapping_store = None if mapping_dir is None else cumplo_mappings.MappingStore(mapping_dir)
+    if cache_dir is not None:
+        movs_df, flow_schedule = run_stages(
+            movs_file_path,
+            flows_file_path,
+            cache_dir,
+            fixdata_csv_path,
+            verbose,
+            mapping_store,
+            **classify_kwargs,
+        )
+    else:
+        movs_df, flows_df, flow_schedule = load_exports(movs_file_path, flows_file_path)
+
+        if backend == "polars":
+            # Optional dependency, only imported when requested
+            from . import cumplo_polars
+
+            movs_df = cumplo_polars.sanitize_and_classify(
+                movs_df, flows_df, flow_schedule, fixdata_csv_path, verbose, **classify_kwargs
+            )
+        else:
+            movs_df = sanitize(
+                movs_df, flows_df, fixdata_csv_path, verbose, mapping_store=mapping_store
+            )
+            movs_df = classify(movs_df, flow_schedule, **classify_kwargs)
+
+    cumplo_storage.save_flow_schedule(flow_schedule, data_out_folder)
+    output_path = cumplo_storage.save_classified(movs_df, data_out_folder, partitioned=partitioned)
+    if change_feed:
+        cumplo_changes.record_changes(movs_df, data_out_folder)
+    if reporting_cube:
+        cumplo_cube.materialize_cube(movs_df, data_out_folder)
+    return output_path
@@ -0,0 +1,378 @@
+import datetime
+from os import path
+
+import pandas as pd
+import polars as pl
+import polars.selectors as cs
+
+from . import cumplo_core
+from .cumplo_pipeline import ACTOR_PATTERNS, IGNORED_DESCRIPTIONS, SOLICITUD_PATTERNS
+
+# Accented characters replaced by `clean_spanish_characters`
+_SPANISH_CHARACTERS = {"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ñ": "n"}
+
+# Lookaheads are not supported by polars regex engine; '^(?!\d+$)(.+)' is split in two
+_NUMERIC_ONLY_PATTERN = r"^\d+$"
+
+FrameLike = pd.DataFrame | pl.DataFrame | pl.LazyFrame
+
+
+def to_lazy(df: FrameLike) -> pl.LazyFrame:
+    """
+    Return `df` (pandas or polars) as a polars LazyFrame.
+    """
+    if isinstance(df, pl.LazyFrame):
+        return df
+    if isinstance(df, pd.DataFrame):
+        df = pl.from_pandas(df)
+    return df.lazy()
+
+
+def clean_spanish_characters(expr: pl.Expr) -> pl.Expr:
+    """
+    Expression version of `some_utils.clean_spanish_characters`; strip, lowercase and
+    replace accented characters.
+    """
+    expr = expr.str.strip_chars().str.to_lowercase()
+    for character, replacement in _SPANISH_CHARACTERS.items():
+        expr = expr.str.replace_all(character, replacement, literal=True)
+    return expr
+
+
+def _first_match(source: pl.Expr, patterns: list[str]) -> pl.Expr:
+    # Same as `some_utils.match_group_and_assign` with preserve; the first pattern that
+    # matches wins
+    source = source.str.strip_chars()
+    return pl.coalesce([source.str.extract(pattern, 1) for pattern in patterns])
+
+
+def filter_movements(movs: FrameLike) -> pl.LazyFrame:
+    """
+    Drop the movements that are not related to investments
+    (see `cumplo_pipeline.filter_movements`).
+    """
+    return (
+        to_lazy(movs)
+        .with_columns(cs.numeric().fill_null(0))
+        .filter(~pl.col("Descripción").is_in(IGNORED_DESCRIPTIONS).fill_null(False))
+        .filter((pl.col("Cargo") > 0) | (pl.col("Abono") > 0))
+    )
+
+
+def extract_solicitud(movs: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Extract the 'Solicitud' column from 'Descripción' using `SOLICITUD_PATTERNS`.
+    """
+    return movs.with_columns(Solicitud=_first_match(pl.col("Descripción"), SOLICITUD_PATTERNS))
+
+
+def extract_remate_ids(movs: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Set 'RemateID' as the last word of 'Solicitud', when that word is numeric (null otherwise).
+    """
+    last_word = pl.col("Solicitud").str.extract(r"(\S+)\s*$", 1)
+    as_number = last_word.cast(pl.Float64, strict=False)
+    is_numeric = as_number.is_not_null() & as_number.is_not_nan()
+    return movs.with_columns(RemateID=pl.when(is_numeric).then(last_word))
+
+
+def resolve_ids_from_flows(
+    movs: pl.LazyFrame, flows_df: FrameLike, verbose: bool = True
+) -> pl.LazyFrame:
+    """
+    Fill the missing 'RemateID's matching 'Solicitud' between movements and flows
+    (see `cumplo_pipeline.resolve_ids_from_flows`).
+
+    Both passes are joins over the distinct 'Solicitud's instead of loops over rows;
+    on the first pass the last matching flow wins, on the second one the first.
+
+    Parameters
+    ----------
+    movs : pl.LazyFrame
+        Movements, with columns 'Solicitud' and 'RemateID'.
+    flows_df : pd.DataFrame or polars frame
+        Flows, with columns 'ID' and 'Solicitud'.
+    verbose : bool, optional
+        If True (default), print the 'Solicitud's without any match.
+
+    Returns
+    -------
+    pl.LazyFrame
+        The movements with the recovered 'RemateID's.
+    """
+    flows = (
+        to_lazy(flows_df)
+        .select(pl.col("ID").cast(pl.String), flow_solicitud=pl.col("Solicitud"))
+        .with_row_index("flow_order")
+    )
+    movs = movs.with_row_index("_row")
+    solicitudes = movs.select("Solicitud").drop_nulls().unique()
+
+    # First pass; flows 'Solicitud' as a prefix of movements 'Solicitud', only unknown ids
+    known_ids = movs.select(pl.col("RemateID").drop_nulls().unique())
+    unknown_flows = flows.join(known_ids, left_on="ID", right_on="RemateID", how="anti")
+    matches = (
+        solicitudes.join(unknown_flows, how="cross")
+        .filter(pl.col("Solicitud").str.starts_with(pl.col("flow_solicitud")))
+        .sort("flow_order")
+    )
+    if verbose:
+        unmatched = unknown_flows.join(matches.select("ID").unique(), on="ID", how="anti")
+        for flow_id, flow_solicitud in (
+            unmatched.sort("flow_order").select("ID", "flow_solicitud").collect().iter_rows()
+        ):
+            print(f"We can't find any match for: id:[{flow_id}]- [{flow_solicitud}]")
+
+    first_pass = matches.group_by("Solicitud").agg(first_pass_id=pl.col("ID").last())
+    movs = (
+        movs.join(first_pass, on="Solicitud", how="left")
+        .with_columns(RemateID=pl.coalesce("first_pass_id", "RemateID"))
+        .drop("first_pass_id")
+    )
+
+    # Opposite approach; flows 'Solicitud' could have more info than movements 'Solicitud'
+    known_ids = movs.select(pl.col("RemateID").drop_nulls().unique())
+    unassigned_flows = flows.join(known_ids, left_on="ID", right_on="RemateID", how="anti")
+    pending = movs.filter(pl.col("RemateID").is_null()).select("Solicitud").drop_nulls().unique()
+    matches = (
+        pending.join(unassigned_flows, how="cross")
+        .filter(pl.col("flow_solicitud").str.starts_with(pl.col("Solicitud")))
+        .sort("flow_order")
+    )
+    if verbose:
+        unmatched = pending.join(matches.select("Solicitud").unique(), on="Solicitud", how="anti")
+        for (solicitud,) in unmatched.sort("Solicitud").collect().iter_rows():
+            print(f"We can't find any match for: [{solicitud}]")
+
+    second_pass = matches.group_by("Solicitud").agg(second_pass_id=pl.col("ID").first())
+    return (
+        movs.join(second_pass, on="Solicitud", how="left")
+        .with_columns(RemateID=pl.coalesce("RemateID", "second_pass_id"))
+        .drop("second_pass_id")
+        .sort("_row")
+        .drop("_row")
+    )
+
+
+def extract_actors(movs: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Extract the 'Actor' from 'Solicitud', and use it as 'RemateID' for old investments
+    (see `cumplo_pipeline.extract_actors`).
+    """
+    solicitud = pl.col("Solicitud").str.strip_chars()
+    # The last pattern, '^(?!\d+$)(.+)', is the whole 'Solicitud' when it is not just a number
+    not_numeric = pl.when(~solicitud.str.contains(_NUMERIC_ONLY_PATTERN)).then(
+        solicitud.str.extract(r"^(.+)", 1)
+    )
+    actor = pl.coalesce([_first_match(pl.col("Solicitud"), ACTOR_PATTERNS[:-1]), not_numeric])
+    movs = movs.with_columns(Actor=clean_spanish_characters(actor))
+
+    # We fill the pending null Actors with the (last) Actor known for the same RemateID
+    known_actor = pl.col("Actor").drop_nulls().last().over("RemateID")
+    movs = movs.with_columns(
+        Actor=pl.when(pl.col("RemateID").is_not_null())
+        .then(pl.col("Actor").fill_null(known_actor))
+        .otherwise(pl.col("Actor"))
+    )
+
+    # When RemateID is null and Actor is not null, fill with Actor! (old-old investments)
+    return movs.with_columns(RemateID=pl.col("RemateID").fill_null(pl.col("Actor")))
+
+
+def apply_fixes(movs: pl.LazyFrame, fixdata_csv_path: str) -> pl.LazyFrame:
+    """
+    Append the manual fixes from `fixdata_csv_path` (if it exists) and normalise 'Actor'.
+    """
+    if fixdata_csv_path is not None and path.exists(fixdata_csv_path):
+        rows = [
+            cumplo_core._create_return_row(*data[:5])
+            for data in cumplo_core._get_fix_data(fixdata_csv_path)
+        ]
+        if rows:
+            fixes = pl.from_pandas(pd.DataFrame(rows)).lazy()
+            movs = pl.concat([movs, fixes], how="diagonal_relaxed")
+
+    return movs.with_columns(Actor=clean_spanish_characters(pl.col("Actor")))
+
+
+def sanitize(
+    movs: FrameLike,
+    flows_df: FrameLike,
+    fixdata_csv_path: str | None = None,
+    verbose: bool = True,
+) -> pl.LazyFrame:
+    """
+    Run the sanitizing stages over already filtered movements; from 'Solicitud'
+    extraction to manual fixes (see `cumplo_pipeline.sanitize`).
+    """
+    movs = extract_solicitud(to_lazy(movs))
+    movs = extract_remate_ids(movs)
+    movs = resolve_ids_from_flows(movs, flows_df, verbose)
+    movs = extract_actors(movs)
+    return apply_fixes(movs, fixdata_csv_path)
+
+
+def _is_past_grace_period(date: pl.Expr, grace_period_days: int) -> pl.Expr:
+    # Expression version of `some_utils.is_date_past_grace_period`
+    if not isinstance(grace_period_days, int) or grace_period_days < 0:
+        raise ValueError("grace_period_days should be a non-negative integer")
+    today = datetime.datetime.now().date()
+    return (pl.lit(today) - date.dt.date()).dt.total_days() > grace_period_days
+
+
+def investment_summary(movs: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Aggregate the movements by 'RemateID'.
+
+    Returns
+    -------
+    pl.LazyFrame
+        One row per 'RemateID', with columns 'net' (Abonos minus Cargos), 'last_date'
+        (most recent 'Fecha') and 'has_refund' (any 'Devolución de fondos...' movement).
+    """
+    return movs.group_by("RemateID").agg(
+        net=pl.col("Abono").sum() - pl.col("Cargo").sum(),
+        last_date=pl.col("Fecha").max(),
+        has_refund=pl.col("Descripción").str.starts_with(cumplo_core.REFUND_PREFIX).any(),
+    )
+
+
+def flow_summary(flow_schedule: FrameLike, grace_period_days: int) -> pl.LazyFrame:
+    """
+    Aggregate the flow schedule by 'RemateID' (see `cumplo_core.ids_from_flow_schedule`).
+
+    Returns
+    -------
+    pl.LazyFrame
+        One row per 'RemateID' in the schedule, with boolean columns 'is_active' (future
+        flows), 'is_late' (pending flows) and 'is_uncollectible' (pending flows older than
+        `grace_period_days`).
+    """
+    with_amount = pl.col("amount").is_not_null() & pl.col("amount").is_not_nan()
+    pending = with_amount & (pl.col("status") == "pending")
+    return (
+        to_lazy(flow_schedule)
+        .group_by("RemateID")
+        .agg(
+            is_active=(with_amount & (pl.col("status") == "future")).any(),
+            is_late=pending.any(),
+            is_uncollectible=(
+                pending & _is_past_grace_period(pl.col("due_date"), grace_period_days)
+            ).any(),
+        )
+        .with_columns(in_flows=pl.lit(True))
+    )
+
+
+def classify(
+    movs: FrameLike,
+    flow_schedule: FrameLike,
+    grace_period_days: int = 60,
+    considerable_amount: int = 100000,
+    despreciable_amount: int = 200,
+    grace_period_days_since_last_payment: int = 60,
+    uncollectible_amount: int = cumplo_core.UNCOLLECTIBLE_AMOUNT,
+) -> pl.LazyFrame:
+    """
+    Assign the 'Estado' column: Unexecuted, Completed, Active or Uncollectible.
+
+    Same rules as `cumplo_pipeline.classify` (see it for the parameters), written as
+    boolean columns over the investment and flow summaries.
+
+    Returns
+    -------
+    pl.LazyFrame
+        The movements with the 'Estado' column.
+    """
+    summary = investment_summary(to_lazy(movs)).join(
+        flow_summary(flow_schedule, grace_period_days), on="RemateID", how="left"
+    )
+    flags = ["is_active", "is_late", "is_uncollectible", "in_flows"]
+    summary = summary.with_columns(pl.col(flags).fill_null(False))
+
+    net = pl.col("net")
+    unexecuted = (net.abs() <= abs(despreciable_amount)) | pl.col("has_refund")
+    just_payed = ~pl.col("in_flows") & (net <= -1 * abs(considerable_amount))
+
+    # Filter ids removing unexecuted ids
+    active = pl.col("is_active") & ~unexecuted
+    late = pl.col("is_late") & ~unexecuted
+    uncollectible = pl.col("is_uncollectible") & ~unexecuted
+
+    # All ids not active, unexecuted, just payed or late_but_collectibles are completed ids
+    completed = ~active & ~unexecuted & ~just_payed & ~(late & ~uncollectible)
+
+    # Completed but not completely payed are uncollectibles
+    completed_but_uncollectible = (
+        completed
+        & (net <= -1 * abs(uncollectible_amount))
+        & _is_past_grace_period(pl.col("last_date"), grace_period_days_since_last_payment)
+    )
+
+    conditions = {
+        "Unexecuted": unexecuted,
+        "Completed": completed,
+        "Active": late | active | just_payed,
+        "Uncollectible": uncollectible | completed_but_uncollectible,
+    }
+    # The last assigned `cumplo_core.ESTADO_PRECEDENCE` wins, so it is the first `when`
+    precedence = cumplo_core.ESTADO_PRECEDENCE[::-1]
+    estado = pl.when(conditions[precedence[0]]).then(pl.lit(precedence[0]))
+    for name in precedence[1:]:
+        estado = estado.when(conditions[name]).then(pl.lit(name))
+    estado = estado.otherwise(pl.lit("NotAssigned"))
+    estados = summary.select("RemateID", Estado=estado)
+
+    # Movements without RemateID are never grouped, so they end up as 'Completed'
+    # (as with the pandas backend)
+    return (
+        to_lazy(movs)
+        .with_row_index("_row")
+        .join(estados, on="RemateID", how="left")
+        .with_columns(Estado=pl.col("Estado").fill_null("Completed"))
+        .sort("_row")
+        .drop("_row")
+    )
+
+
+def sanitize_and_classify(
+    movs_df: FrameLike,
+    flows_df: FrameLike,
+    flow_schedule: FrameLike,
+    fixdata_csv_path: str | None = None,
+    verbose: bool = True,
+    **classify_kwargs,
+) -> pd.DataFrame:
+    """
+    Run `sanitize` and `classify` as a single lazy query, and collect it as pandas.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame or polars frame
+        Filtered movements (see `cumplo_pipeline.load_movements`).
+    flows_df : pd.DataFrame or polars frame
+        Flows (see `cumplo_pipeline.load_flows`).
+    flow_schedule : pd.DataFrame or polars frame
+        The flow schedule (see `cumplo_core.extract_flow_schedule`).
+    fixdata_csv_path : str, optional
+        Path to 'fix_data.csv'.
+    verbose : bool, optional
+        If True (default), print unmatched 'Solicitud's.
+    **classify_kwargs
+        Thresholds forwarded to `classify`.
+
+    Returns
+    -------
+    pd.DataFrame
+        The sanitized and classified movements, as `cumplo_pipeline.classify` returns them.
+
+    Notes
+    -----
+    - The query runs on the polars thread pool (set `POLARS_MAX_THREADS` to limit it).
+
+    Examples
+    --------
+    >>> movs_df = sanitize_and_classify(movs_df, flows_df, flow_schedule, verbose=False)
+    """
+    movs = sanitize(movs_df, flows_df, fixdata_csv_path, verbose)
+    return classify(movs, flow_schedule, **classify_kwargs).collect().to_pandas()
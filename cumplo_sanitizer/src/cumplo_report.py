@@ -0,0 +1,242 @@
+import os
+from os import path
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from . import cumplo_core, cumplo_storage
+
+try:
+    # Optional ('xlsx' extra); openpyxl write-only workbooks are used when it is not installed
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Rows read (and converted) at a time; an investment is never split between chunks
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Sheet names (and CSV file suffixes); per-'Estado' sheets are named after the 'Estado'
+SUMMARY_SHEET = "Summary"
+MOVEMENTS_SHEET = "Movements"
+NO_ESTADO_SHEET = "No Estado"
+
+# Rows per worksheet on '.xlsx' files (header included); longer sheets go on 'Movements_2'...
+MAX_SHEET_ROWS = 1_048_576
+
+# One row per investment (see `investment_summary`)
+SUMMARY_SCHEMA = pa.schema(
+    [
+        ("RemateID", pa.string()),
+        ("Actor", pa.string()),
+        ("Estado", pa.string()),
+        ("first_movement", pa.timestamp("ns")),
+        ("last_movement", pa.timestamp("ns")),
+        ("invested", pa.float64()),
+        ("returned", pa.float64()),
+        ("net", pa.float64()),
+        ("days", pa.int64()),
+        ("rate", pa.float64()),
+        ("rate_yr", pa.float64()),
+        ("xirr", pa.float64()),
+    ]
+)
+
+REPORT_FORMATS = [".xlsx", ".csv"]
+
+
+def investment_summary(movs_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarize the classified movements, one row per investment, with its rates.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        The classified movements of whole investments, with columns 'RemateID', 'Actor',
+        'Estado', 'Fecha', 'Cargo' and 'Abono'.
+
+    Returns
+    -------
+    pd.DataFrame
+        The columns of `SUMMARY_SCHEMA`: the first and last 'Fecha', the sums of 'Cargo'
+        ('invested') and 'Abono' ('returned'), 'net', and the rates of
+        `cumplo_core._get_rates` (days between the first and last movement, return, yearly
+        return and XIRR). Rates are missing values when nothing was invested.
+    """
+    groups = movs_df.groupby("RemateID", sort=True)
+    summary = groups.agg(
+        first_movement=("Fecha", "min"),
+        last_movement=("Fecha", "max"),
+        invested=("Cargo", "sum"),
+        returned=("Abono", "sum"),
+    ).astype({"invested": float, "returned": float})
+    # 'Actor' and 'Estado' of the first row of each investment, missing values included
+    first_rows = movs_df.drop_duplicates("RemateID").set_index("RemateID")
+    summary["Actor"] = first_rows["Actor"]
+    summary["Estado"] = first_rows["Estado"]
+    summary["net"] = summary["returned"] - summary["invested"]
+    summary["days"] = (summary["last_movement"] - summary["first_movement"]).dt.days
+
+    # As `cumplo_core._get_rates`: rates only when something was invested, and the yearly
+    # return and XIRR only when the return is not 0
+    invested = summary["invested"] > 0
+    summary["rate"] = (summary["returned"] / summary["invested"] - 1).where(invested)
+    has_return = invested & (summary["rate"] != 0)
+    yearly = summary["rate"] * 360 / (summary["days"] - 1).clip(lower=1)
+    summary["rate_yr"] = yearly.clip(lower=-1.0).where(has_return)
+    # XIRR is a root search per investment, the only column computed one group at a time
+    with_return = movs_df[movs_df["RemateID"].isin(summary.index[has_return])]
+    xirrs = {
+        remate_id: cumplo_core._get_rates(flows)[3]
+        for remate_id, flows in with_return.groupby("RemateID", sort=False)
+    }
+    summary["xirr"] = summary.index.map(xirrs).astype(float)
+    return summary.reset_index()[SUMMARY_SCHEMA.names]
+
+
+def _rows(table: pa.Table):
+    # Python rows of an arrow table, without going through pandas
+    return zip(*[column.to_pylist() for column in table.columns])
+
+
+class _ExcelReport:
+    def __init__(self, report_path: str):
+        self.report_path = report_path
+        # Worksheets by name, the next row on each, and the worksheets of each sheet
+        self.sheets, self.next_rows, self.parts = {}, {}, {}
+        if xlsxwriter is not None:
+            # Each row is flushed to a temporary file as soon as the next one is written
+            self.workbook = xlsxwriter.Workbook(
+                report_path, {"constant_memory": True, "default_date_format": "yyyy-mm-dd"}
+            )
+        else:
+            # Write-only workbooks stream every sheet to a temporary file as rows are appended
+            self.workbook = openpyxl.Workbook(write_only=True)
+
+    def _append(self, name: str, row) -> None:
+        if xlsxwriter is not None:
+            self.sheets[name].write_row(self.next_rows[name], 0, row)
+        else:
+            self.sheets[name].append(row)
+        self.next_rows[name] += 1
+
+    def _add_sheet(self, name: str, columns: list[str]) -> None:
+        if xlsxwriter is not None:
+            self.sheets[name] = self.workbook.add_worksheet(name)
+        else:
+            self.sheets[name] = self.workbook.create_sheet(name)
+        self.next_rows[name] = 0
+        self._append(name, columns)
+
+    def write(self, name: str, table: pa.Table) -> None:
+        if name not in self.parts:
+            self.parts[name] = [name]
+            self._add_sheet(name, table.column_names)
+        for row in _rows(table):
+            if self.next_rows[self.parts[name][-1]] >= MAX_SHEET_ROWS:
+                self.parts[name].append(f"{name}_{len(self.parts[name]) + 1}")
+                self._add_sheet(self.parts[name][-1], table.column_names)
+            self._append(self.parts[name][-1], row)
+
+    def close(self) -> list[str]:
+        if xlsxwriter is not None:
+            self.workbook.close()
+        else:
+            self.workbook.save(self.report_path)
+        return [self.report_path]
+
+
+class _CsvReport:
+    def __init__(self, report_path: str):
+        self.stem = path.splitext(report_path)[0]
+        self.writers = {}
+
+    def write(self, name: str, table: pa.Table) -> None:
+        if name not in self.writers:
+            self.writers[name] = pa_csv.CSVWriter(f"{self.stem}_{name}.csv", table.schema)
+        self.writers[name].write_table(table)
+
+    def close(self) -> list[str]:
+        for writer in self.writers.values():
+            writer.close()
+        return [f"{self.stem}_{name}.csv" for name in self.writers]
+
+
+def write_report(
+    output_path: str,
+    report_path: str,
+    per_estado: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[str]:
+    """
+    Write the classified output as a report for spreadsheets: the movements, and a summary
+    sheet with one row per investment (see `investment_summary`).
+
+    Parameters
+    ----------
+    output_path : str
+        Path to the classified output ('sanitized_and_classified.feather', or the
+        partitioned dataset folder).
+    report_path : str
+        Path of the report; '.xlsx' for a workbook with 'Summary' and 'Movements' sheets,
+        or '.csv' for one file per sheet ('<name>_Summary.csv', '<name>_Movements.csv').
+    per_estado : bool, optional
+        If True, also write the movements of each 'Estado' on their own sheet (default is
+        False).
+    chunk_size : int, optional
+        Rows read at a time (default is 50,000).
+
+    Returns
+    -------
+    list[str]
+        The written files.
+
+    Raises
+    ------
+    ValueError
+        If `report_path` is not an '.xlsx' or '.csv' file.
+
+    Description
+    -----------
+    The movements are streamed from the output in chunks of whole investments (see
+    `cumplo_storage.iter_investments`); each chunk is appended to the sheets and
+    summarized, and then dropped. Sheets are streamed to disk as they are written, so the
+    memory used depends on `chunk_size` and not on the length of the history: with
+    xlsxwriter in 'constant_memory' mode when installed (`poetry install -E xlsx`,
+    faster), with openpyxl write-only workbooks otherwise, and with pyarrow CSV writers.
+
+    A worksheet holds up to `MAX_SHEET_ROWS` rows; the rows after that go on a new one
+    ('Movements_2', 'Movements_3'...). Movements without 'Estado' go on the 'No Estado'
+    sheet.
+
+    Examples
+    --------
+    >>> write_report("./data_out/sanitized_and_classified.feather", "./data_out/report.xlsx")
+    ['./data_out/report.xlsx']
+    >>> write_report(output_path, "./data_out/report.csv", per_estado=True)
+    """
+    extension = path.splitext(report_path)[1].lower()
+    if extension not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format: {extension}, use one of {REPORT_FORMATS}")
+
+    # The index is built (or reused) before creating the report
+    chunks = cumplo_storage.iter_investments(output_path, chunk_size)
+    os.makedirs(path.dirname(report_path) or ".", exist_ok=True)
+    report = _ExcelReport(report_path) if extension == ".xlsx" else _CsvReport(report_path)
+
+    # The summary sheet goes first on the workbook
+    report.write(SUMMARY_SHEET, SUMMARY_SCHEMA.empty_table())
+    for chunk in chunks:
+        summary = investment_summary(chunk.to_pandas())
+        report.write(SUMMARY_SHEET, pa.Table.from_pandas(summary, SUMMARY_SCHEMA, False))
+        report.write(MOVEMENTS_SHEET, chunk)
+        if per_estado:
+            estados = chunk.column("Estado")
+            for estado in estados.unique().to_pylist():
+                if estado is None:
+                    report.write(NO_ESTADO_SHEET, chunk.filter(pc.is_null(estados)))
+                else:
+                    report.write(estado, chunk.filter(pc.equal(estados, estado)))
+    return report.close()
@@ -0,0 +1,447 @@
+import json
+import os
+import shutil
+from collections.abc import Iterator
+from os import path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from . import some_utils
+
+# Default name of the single file output
+OUTPUT_FILE_NAME = "sanitized_and_classified.feather"
+# Default name of the partitioned output folder
+OUTPUT_DATASET_NAME = "sanitized_and_classified"
+# Name of the flow schedule output (see `cumplo_core.extract_flow_schedule`)
+FLOW_SCHEDULE_FILE_NAME = "flow_schedule.feather"
+# Columns used to split the partitioned output (hive style, ie: 'Estado=Active/Year=2023/')
+PARTITION_COLS = ["Estado", "Year"]
+
+
+def save_classified(
+    df: pd.DataFrame,
+    data_out_folder: str,
+    partitioned: bool = False,
+    row_group_size: int = 10_000,
+) -> str:
+    """
+    Save the sanitized and classified movements on `data_out_folder`.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The classified movements. It should have at least the columns 'RemateID',
+        'Fecha' and 'Estado'.
+    data_out_folder : str
+        The folder where the output will be written.
+    partitioned : bool, optional
+        If False (default), the whole frame is written to a single
+        'sanitized_and_classified.feather' file.
+        If True, a parquet dataset partitioned by 'Estado' and year of 'Fecha' is written
+        to a 'sanitized_and_classified' folder instead.
+    row_group_size : int, optional
+        Maximum number of rows per row group on the partitioned output (default is 10,000).
+
+    Returns
+    -------
+    str
+        The path to the written file (or folder, when partitioned).
+
+    Examples
+    --------
+    >>> save_classified(movs_df, "./data_out/")
+    './data_out/sanitized_and_classified.feather'
+    >>> save_classified(movs_df, "./data_out/", partitioned=True)
+    './data_out/sanitized_and_classified'
+    """
+    if not partitioned:
+        output_path = path.join(data_out_folder, OUTPUT_FILE_NAME)
+        df.reset_index(drop=True).to_feather(output_path)
+        return output_path
+
+    output_path = path.join(data_out_folder, OUTPUT_DATASET_NAME)
+    write_partitioned_dataset(df, output_path, row_group_size)
+    return output_path
+
+
+def write_partitioned_dataset(
+    df: pd.DataFrame, output_dir: str, row_group_size: int = 10_000
+) -> None:
+    """
+    Write the classified movements as a parquet dataset partitioned by 'Estado' and 'Year'.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The classified movements, with columns 'RemateID', 'Fecha' and 'Estado'.
+    output_dir : str
+        The dataset root folder. A previous dataset there is replaced whole.
+    row_group_size : int, optional
+        Maximum number of rows per row group (default is 10,000).
+
+    Description
+    -----------
+    A 'Year' column is derived from 'Fecha'. Within each file, rows are sorted by 'RemateID'
+    (and then 'Fecha') and parquet statistics are written for every row group,
+    so readers filtering by partition keys skip whole folders, and readers filtering by
+    'RemateID' skip row groups whose min/max don't match.
+
+    The dataset is written to a temporary folder next to `output_dir` and then swapped in
+    with a rename, so partitions of a previous save are never left behind (ie: the old
+    'Estado=Active/' files of an investment that is now 'Uncollectible') and readers never
+    see a half-written dataset.
+
+    Examples
+    --------
+    >>> write_partitioned_dataset(movs_df, "./data_out/sanitized_and_classified")
+    # ./data_out/sanitized_and_classified/Estado=Active/Year=2023/part-0.parquet ...
+    """
+    out_df = df.assign(Year=df["Fecha"].dt.year.astype("int32"))
+    out_df["RemateID"] = out_df["RemateID"].astype(str)
+    out_df = out_df.sort_values(by=PARTITION_COLS + ["RemateID", "Fecha"], kind="stable")
+
+    table = pa.Table.from_pandas(out_df, preserve_index=False)
+    partitioning = ds.partitioning(
+        pa.schema([("Estado", pa.string()), ("Year", pa.int32())]), flavor="hive"
+    )
+    file_options = ds.ParquetFileFormat().make_write_options(write_statistics=True)
+
+    output_dir = path.normpath(output_dir)
+    tmp_dir, old_dir = f"{output_dir}.tmp", f"{output_dir}.old"
+    for leftover_dir in (tmp_dir, old_dir):
+        shutil.rmtree(leftover_dir, ignore_errors=True)
+
+    ds.write_dataset(
+        table,
+        tmp_dir,
+        format="parquet",
+        partitioning=partitioning,
+        file_options=file_options,
+        max_rows_per_group=row_group_size,
+        min_rows_per_group=min(row_group_size, 1_000),
+    )
+    if path.exists(output_dir):
+        os.replace(output_dir, old_dir)
+    os.replace(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def load_classified(
+    output_path: str,
+    estados: list[str] | None = None,
+    years: list[int] | None = None,
+    remate_ids: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Load the classified movements, optionally filtered by 'Estado', year and 'RemateID'.
+
+    Parameters
+    ----------
+    output_path : str
+        Path to a 'sanitized_and_classified.feather' file, or to a partitioned dataset folder.
+    estados : list[str], optional
+        Only load these 'Estado' values.
+    years : list[int], optional
+        Only load movements whose 'Fecha' falls on these years.
+    remate_ids : list[str], optional
+        Only load movements of these 'RemateID'.
+
+    Returns
+    -------
+    pd.DataFrame
+        The (filtered) movements.
+
+    Description
+    -----------
+    On a partitioned dataset, the filters are pushed down to pyarrow, so partitions and
+    row groups that can't match are never read.
+    On the single file output, the file is read whole and then filtered.
+
+    Examples
+    --------
+    >>> load_classified("./data_out/sanitized_and_classified", estados=["Uncollectible"])
+    """
+    fmt = "parquet" if path.isdir(output_path) else "feather"
+    dataset = _open_dataset(output_path)
+
+    filter_expr = None
+    conditions = [
+        ("Estado", estados),
+        ("Year", years),
+        ("RemateID", None if remate_ids is None else [str(r_id) for r_id in remate_ids]),
+    ]
+    for col, values in conditions:
+        if values is None:
+            continue
+        if col == "Year" and fmt == "feather":
+            # No 'Year' column on the single file output, derive it from 'Fecha'
+            condition = pc.year(ds.field("Fecha")).isin(list(values))
+        else:
+            condition = ds.field(col).isin(list(values))
+        filter_expr = condition if filter_expr is None else filter_expr & condition
+
+    df = dataset.to_table(filter=filter_expr).to_pandas()
+    if fmt == "parquet":
+        df = df.drop(columns=["Year"])
+        df["Estado"] = df["Estado"].astype(str)
+    return df
+
+
+def iter_investments(output_path: str, chunk_size: int = 50_000) -> Iterator[pa.Table]:
+    """
+    Yield the classified movements in tables of about `chunk_size` rows, sorted by
+    'RemateID' and 'Fecha'; an investment is never split between two tables.
+
+    Parameters
+    ----------
+    output_path : str
+        Path to a 'sanitized_and_classified.feather' file, or to a partitioned dataset folder.
+    chunk_size : int, optional
+        Rows per table (default is 50,000); more when an investment doesn't fit in one.
+
+    Returns
+    -------
+    Iterator[pa.Table]
+        Zero-copy slices of the memory-mapped data of `ClassifiedReader`.
+
+    Description
+    -----------
+    The movements are grouped through the persisted 'RemateID' index of `ClassifiedReader`
+    (built on the first open, and reused while the output doesn't change), so only the
+    rows of the yielded tables are read from disk.
+    """
+    return ClassifiedReader(output_path).iter_chunks(chunk_size)
+
+
+def save_flow_schedule(flow_schedule: pd.DataFrame, data_out_folder: str) -> str:
+    """
+    Save the flow schedule (see `cumplo_core.extract_flow_schedule`) as an arrow file.
+
+    Parameters
+    ----------
+    flow_schedule : pd.DataFrame
+        The long flow schedule table.
+    data_out_folder : str
+        The folder where 'flow_schedule.feather' is written.
+
+    Returns
+    -------
+    str
+        The path to the written file.
+    """
+    output_path = path.join(data_out_folder, FLOW_SCHEDULE_FILE_NAME)
+    flow_schedule.reset_index(drop=True).to_feather(output_path)
+    return output_path
+
+
+def load_flow_schedule(data_out_folder: str) -> pd.DataFrame:
+    """Load the flow schedule saved by `save_flow_schedule`."""
+    return pd.read_feather(path.join(data_out_folder, FLOW_SCHEDULE_FILE_NAME))
+
+
+class ClassifiedReader:
+    """
+    Indexed, memory-mapped access to the sanitized and classified output.
+
+    On the first open, the output is rewritten sorted by 'RemateID' and 'Fecha' as an
+    uncompressed arrow file, and a small index is built on top of it:
+    'RemateID' -> row range, 'Actor' -> 'RemateID's, 'Estado' -> 'RemateID's and
+    a 'Fecha' ordered permutation of the rows.
+    Both are persisted in a '<output_path>.idx' folder and reused while the output
+    doesn't change, so later opens only memory-map them.
+
+    Queries slice the memory-mapped table and only convert the selected rows to pandas.
+
+    Parameters
+    ----------
+    output_path : str
+        Path to a 'sanitized_and_classified.feather' file, or to a partitioned dataset folder.
+    index_dir : str, optional
+        Where to persist the sorted data and index (default is '<output_path>.idx').
+
+    Examples
+    --------
+    >>> reader = ClassifiedReader("./data_out/sanitized_and_classified.feather")
+    >>> reader.by_id("20932")
+    >>> reader.by_actor("comercial 2050")
+    >>> reader.by_estado("Uncollectible")
+    >>> reader.by_date_range("2023-01-01", "2023-12-31")
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, output_path: str, index_dir: str | None = None):
+        self.output_path = output_path
+        self.index_dir = index_dir if index_dir is not None else f"{output_path.rstrip('/')}.idx"
+
+        if not self._is_index_fresh():
+            self._build_index()
+
+        self._table = _read_ipc_mapped(path.join(self.index_dir, "data.arrow"))
+        ids_table = _read_ipc_mapped(path.join(self.index_dir, "ids.arrow"))
+        dates_table = _read_ipc_mapped(path.join(self.index_dir, "dates.arrow"))
+
+        # RemateID -> (start, stop) row range on the sorted table
+        r_ids = ids_table.column("RemateID").to_pylist()
+        starts = ids_table.column("start").to_pylist()
+        stops = ids_table.column("stop").to_pylist()
+        self._ranges = {r_id: (start, stop) for r_id, start, stop in zip(r_ids, starts, stops)}
+
+        # Actor -> RemateIDs, Estado -> RemateIDs
+        self._ids_by_actor = {}
+        self._ids_by_estado = {}
+        actors = ids_table.column("Actor").to_pylist()
+        estados = ids_table.column("Estado").to_pylist()
+        for r_id, actor, estado in zip(r_ids, actors, estados):
+            self._ids_by_actor.setdefault(actor, []).append(r_id)
+            self._ids_by_estado.setdefault(estado, []).append(r_id)
+
+        # Rows ordered by 'Fecha', to answer date ranges with a binary search
+        self._sorted_fechas = dates_table.column("Fecha").to_numpy()
+        self._date_order = dates_table.column("row")
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    def ids(self) -> list[str]:
+        """Return all the 'RemateID's on the output."""
+        return list(self._ranges.keys())
+
+    def ids_by_actor(self, actor: str) -> list[str]:
+        """Return the 'RemateID's of an 'Actor' (the name is normalised before the lookup)."""
+        return list(self._ids_by_actor.get(some_utils.clean_spanish_characters(actor), []))
+
+    def ids_by_estado(self, estado: str) -> list[str]:
+        """Return the 'RemateID's classified as `estado`."""
+        return list(self._ids_by_estado.get(estado, []))
+
+    def by_id(self, remate_id: str) -> pd.DataFrame:
+        """Return the movements of one 'RemateID', sorted by 'Fecha'."""
+        start, stop = self._ranges.get(str(remate_id), (0, 0))
+        return self._table.slice(start, stop - start).to_pandas()
+
+    def by_ids(self, remate_ids: list[str]) -> pd.DataFrame:
+        """Return the movements of several 'RemateID's."""
+        ranges = [self._ranges[str(r_id)] for r_id in remate_ids if str(r_id) in self._ranges]
+        if len(ranges) == 0:
+            return self._table.slice(0, 0).to_pandas()
+        slices = [self._table.slice(start, stop - start) for start, stop in sorted(ranges)]
+        return pa.concat_tables(slices).to_pandas()
+
+    def by_actor(self, actor: str) -> pd.DataFrame:
+        """Return the movements of all the investments of an 'Actor'."""
+        return self.by_ids(self.ids_by_actor(actor))
+
+    def by_estado(self, estado: str) -> pd.DataFrame:
+        """Return the movements of all the investments classified as `estado`."""
+        return self.by_ids(self.ids_by_estado(estado))
+
+    def by_date_range(self, start, end) -> pd.DataFrame:
+        """Return the movements with `start` <= 'Fecha' <= `end`, sorted by 'Fecha'."""
+        start = pd.Timestamp(start).to_datetime64().astype(self._sorted_fechas.dtype)
+        end = pd.Timestamp(end).to_datetime64().astype(self._sorted_fechas.dtype)
+        first = self._sorted_fechas.searchsorted(start, side="left")
+        last = self._sorted_fechas.searchsorted(end, side="right")
+        rows = self._date_order.slice(first, last - first)
+        return self._table.take(rows).to_pandas()
+
+    def iter_chunks(self, chunk_size: int = 50_000) -> Iterator[pa.Table]:
+        """
+        Yield all the movements in slices of about `chunk_size` rows, sorted by 'RemateID'
+        and 'Fecha'; an investment is never split between two slices.
+
+        The slices are zero-copy views of the memory-mapped table.
+        """
+        first, rows = None, 0
+        for start, stop in self._ranges.values():
+            first = start if first is None else first
+            rows = stop - first
+            if rows >= chunk_size:
+                yield self._table.slice(first, rows)
+                first, rows = None, 0
+        if first is not None:
+            yield self._table.slice(first, rows)
+
+    def _source_signature(self) -> dict:
+        # Cheap fingerprint of the output, the index is rebuilt when it changes
+        if path.isdir(self.output_path):
+            files = [
+                path.join(root, name)
+                for root, _, names in os.walk(self.output_path)
+                for name in names
+            ]
+        else:
+            files = [self.output_path]
+        stats = [os.stat(file_path) for file_path in sorted(files)]
+        return {
+            "version": self.INDEX_VERSION,
+            "files": len(stats),
+            "size": sum(stat.st_size for stat in stats),
+            "mtime_ns": max((stat.st_mtime_ns for stat in stats), default=0),
+        }
+
+    def _is_index_fresh(self) -> bool:
+        meta_path = path.join(self.index_dir, "meta.json")
+        if not path.exists(meta_path):
+            return False
+        with open(meta_path) as meta_file:
+            return json.load(meta_file) == self._source_signature()
+
+    def _build_index(self) -> None:
+        table = _open_dataset(self.output_path).to_table()
+        if path.isdir(self.output_path):
+            table = table.drop(["Year"])
+        r_id_index = table.schema.get_field_index("RemateID")
+        table = table.set_column(r_id_index, "RemateID", pc.cast(table["RemateID"], pa.string()))
+        table = table.sort_by([("RemateID", "ascending"), ("Fecha", "ascending")])
+        table = table.combine_chunks()
+
+        # One row per RemateID; its rows are contiguous on the sorted table
+        r_ids = table.column("RemateID").to_numpy(zero_copy_only=False)
+        is_first = np.ones(len(r_ids), dtype=bool)
+        is_first[1:] = r_ids[1:] != r_ids[:-1]
+        starts = np.flatnonzero(is_first)
+        stops = np.append(starts[1:], len(r_ids))[: len(starts)]
+        ids_table = pa.table(
+            {
+                "RemateID": table.column("RemateID").take(starts),
+                "start": pa.array(starts, pa.int64()),
+                "stop": pa.array(stops, pa.int64()),
+                "Actor": table.column("Actor").take(starts),
+                "Estado": table.column("Estado").take(starts),
+            }
+        )
+
+        date_order = pc.sort_indices(table, sort_keys=[("Fecha", "ascending")])
+        dates_table = pa.table({"Fecha": table.column("Fecha").take(date_order), "row": date_order})
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        _write_ipc_atomic(table, path.join(self.index_dir, "data.arrow"))
+        _write_ipc_atomic(ids_table, path.join(self.index_dir, "ids.arrow"))
+        _write_ipc_atomic(dates_table, path.join(self.index_dir, "dates.arrow"))
+        with open(path.join(self.index_dir, "meta.json"), "w") as meta_file:
+            json.dump(self._source_signature(), meta_file)
+
+
+def _open_dataset(output_path: str) -> ds.Dataset:
+    # The single file output is feather, the partitioned one is a hive parquet dataset
+    if path.isdir(output_path):
+        return ds.dataset(output_path, format="parquet", partitioning="hive")
+    return ds.dataset(output_path, format="feather")
+
+
+def _read_ipc_mapped(file_path: str) -> pa.Table:
+    # Uncompressed arrow files are memory-mapped, no data is copied until it is used
+    source = pa.memory_map(file_path, "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def _write_ipc_atomic(table: pa.Table, file_path: str) -> None:
+    tmp_path = f"{file_path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, file_path)
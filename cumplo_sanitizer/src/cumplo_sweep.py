@@ -0,0 +1,239 @@
+import datetime
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from . import cumplo_core
+
+# Estados, in the order used for the codes returned by `estado_codes`
+ESTADOS = ["NotAssigned", "Unexecuted", "Completed", "Active", "Uncollectible"]
+
+# Classification parameters, and the values used by the notebook
+DEFAULT_PARAMETERS = {
+    "grace_period_days": 60,
+    "considerable_amount": 100000,
+    "despreciable_amount": 200,
+    "grace_period_days_since_last_payment": 60,
+    "uncollectible_amount": cumplo_core.UNCOLLECTIBLE_AMOUNT,
+}
+
+
+def investment_summary(
+    movs_df: pd.DataFrame, flow_schedule: pd.DataFrame, as_of: datetime.date | None = None
+) -> pd.DataFrame:
+    """
+    Aggregate everything the classification needs, per investment, once.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        The sanitized movements, with columns 'RemateID', 'Fecha', 'Abono', 'Cargo' and
+        'Descripción'.
+    flow_schedule : pd.DataFrame
+        The flow schedule (see `cumplo_core.extract_flow_schedule`).
+    as_of : datetime.date, optional
+        The date the days are counted to (default is today, as
+        `some_utils.is_date_past_grace_period` does).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per 'RemateID' (NA included), with columns:
+        'earnings' and 'cost' (sum of 'Abono' and 'Cargo'), 'net' (earnings minus cost),
+        'has_refund' (any 'Devolución de fondos...' movement), 'in_flows', 'is_active'
+        (future flows), 'is_late' (pending flows), 'days_since_last_payment' (days since the
+        most recent 'Fecha') and 'days_since_oldest_pending' (days since the due date of the
+        oldest pending flow, NaN when there are none).
+
+    Notes
+    -----
+    - Flows without amount (empty cells) are not taken into account, as in
+      `cumplo_core.ids_from_flow_schedule`.
+    """
+    as_of = pd.Timestamp(as_of if as_of is not None else datetime.datetime.now().date())
+
+    is_refund = movs_df["Descripción"].str.startswith(cumplo_core.REFUND_PREFIX, na=False)
+    summary = (
+        movs_df.assign(is_refund=is_refund.astype(bool))
+        .groupby("RemateID", dropna=False, sort=False)
+        .agg(
+            earnings=("Abono", "sum"),
+            cost=("Cargo", "sum"),
+            has_refund=("is_refund", "any"),
+            last_date=("Fecha", "max"),
+        )
+    )
+    summary["net"] = summary["earnings"] - summary["cost"]
+    summary["days_since_last_payment"] = (as_of - summary["last_date"].dt.normalize()).dt.days
+
+    flows = flow_schedule[flow_schedule["amount"].notna()]
+    future_ids = flows.loc[flows["status"] == "future", "RemateID"].unique()
+    oldest_pending = flows[flows["status"] == "pending"].groupby("RemateID")["due_date"].min()
+
+    summary["in_flows"] = summary.index.isin(flow_schedule["RemateID"].unique())
+    summary["is_active"] = summary.index.isin(future_ids)
+    summary["is_late"] = summary.index.isin(oldest_pending.index)
+    summary["days_since_oldest_pending"] = (
+        as_of - summary.index.map(oldest_pending).astype("datetime64[ns]").normalize()
+    ).days
+
+    columns = [
+        "earnings",
+        "cost",
+        "net",
+        "has_refund",
+        "in_flows",
+        "is_active",
+        "is_late",
+        "days_since_last_payment",
+        "days_since_oldest_pending",
+    ]
+    return summary[columns]
+
+
+def estado_codes(
+    summary: pd.DataFrame,
+    grace_period_days: int = DEFAULT_PARAMETERS["grace_period_days"],
+    considerable_amount: int = DEFAULT_PARAMETERS["considerable_amount"],
+    despreciable_amount: int = DEFAULT_PARAMETERS["despreciable_amount"],
+    grace_period_days_since_last_payment: int = DEFAULT_PARAMETERS[
+        "grace_period_days_since_last_payment"
+    ],
+    uncollectible_amount: int = DEFAULT_PARAMETERS["uncollectible_amount"],
+) -> np.ndarray:
+    """
+    Classify the investments of a summary; the rules of `cumplo_pipeline.classify` as
+    boolean arrays.
+
+    Parameters
+    ----------
+    summary : pd.DataFrame
+        The result of `investment_summary`.
+    grace_period_days, considerable_amount, despreciable_amount,
+    grace_period_days_since_last_payment, uncollectible_amount : int, optional
+        The thresholds (see `cumplo_pipeline.classify`).
+
+    Returns
+    -------
+    np.ndarray
+        The position of each investment Estado on `ESTADOS`.
+    """
+    net = summary["net"].to_numpy()
+
+    unexecuted = (np.abs(net) <= abs(despreciable_amount)) | summary["has_refund"].to_numpy()
+    just_payed = ~summary["in_flows"].to_numpy() & (net <= -1 * abs(considerable_amount))
+
+    # Filter ids removing unexecuted ids
+    active = summary["is_active"].to_numpy() & ~unexecuted
+    late = summary["is_late"].to_numpy() & ~unexecuted
+    uncollectible = late & (summary["days_since_oldest_pending"].to_numpy() > grace_period_days)
+
+    # All ids not active, unexecuted, just payed or late_but_collectibles are completed ids
+    completed = ~active & ~unexecuted & ~just_payed & ~(late & ~uncollectible)
+
+    # Completed but not completely payed are uncollectibles
+    completed_but_uncollectible = (
+        completed
+        & (net <= -1 * abs(uncollectible_amount))
+        & (summary["days_since_last_payment"].to_numpy() > grace_period_days_since_last_payment)
+    )
+
+    # Movements without RemateID are never grouped by the extractors, so they are 'Completed'
+    missing_id = summary.index.isna()
+
+    conditions = {
+        "Unexecuted": unexecuted,
+        "Completed": completed,
+        "Active": late | active | just_payed,
+        "Uncollectible": uncollectible | completed_but_uncollectible,
+    }
+    # The last assigned `cumplo_core.ESTADO_PRECEDENCE` wins, so it goes first on `np.select`
+    precedence = cumplo_core.ESTADO_PRECEDENCE[::-1]
+    return np.select(
+        [missing_id] + [conditions[estado] for estado in precedence],
+        [ESTADOS.index(estado) for estado in ["Completed", *precedence]],
+        default=ESTADOS.index("NotAssigned"),
+    )
+
+
+def classify_summary(summary: pd.DataFrame, **parameters) -> pd.Series:
+    """
+    Return the 'Estado' of each investment of a summary (see `estado_codes`).
+
+    Examples
+    --------
+    >>> summary = investment_summary(movs_df, flow_schedule)
+    >>> classify_summary(summary, grace_period_days=90).value_counts()
+    """
+    codes = estado_codes(summary, **parameters)
+    return pd.Series(np.array(ESTADOS, dtype=object)[codes], index=summary.index, name="Estado")
+
+
+def sweep(
+    movs_df: pd.DataFrame, flow_schedule: pd.DataFrame, as_of: datetime.date | None = None, **grids
+) -> pd.DataFrame:
+    """
+    Classify the investments for every combination of the given parameter values.
+
+    Parameters
+    ----------
+    movs_df : pd.DataFrame
+        The sanitized movements (see `investment_summary`).
+    flow_schedule : pd.DataFrame
+        The flow schedule (see `cumplo_core.extract_flow_schedule`).
+    as_of : datetime.date, optional
+        The date the days are counted to (default is today).
+    **grids
+        Values to try for any of the `DEFAULT_PARAMETERS` (a single value or a list);
+        parameters not given keep their default value.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per combination and Estado, with a column per parameter, 'Estado',
+        'investments' (count), 'cost', 'earnings' and 'net' (amount sums).
+
+    Raises
+    ------
+    ValueError
+        If a grid is given for an unknown parameter.
+
+    Description
+    -----------
+    The per-investment summary (balances, last payment date, oldest pending due date) does
+    not depend on the parameters, so it is computed once; each combination is then just a
+    few vectorized comparisons and a `np.bincount` per amount.
+
+    Examples
+    --------
+    >>> sweep(movs_df, flow_schedule, grace_period_days=[30, 60, 90], despreciable_amount=[200, 1000])
+    """
+    unknown = set(grids) - set(DEFAULT_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {sorted(unknown)}")
+
+    values = {
+        name: np.atleast_1d(grids.get(name, default)).tolist()
+        for name, default in DEFAULT_PARAMETERS.items()
+    }
+    summary = investment_summary(movs_df, flow_schedule, as_of)
+    amounts = {
+        column: summary[column].to_numpy(dtype=float) for column in ["cost", "earnings", "net"]
+    }
+
+    results = []
+    for combination in itertools.product(*values.values()):
+        parameters = dict(zip(values, combination))
+        codes = estado_codes(summary, **parameters)
+
+        result = pd.DataFrame(
+            {"investments": np.bincount(codes, minlength=len(ESTADOS))}, index=ESTADOS
+        )
+        for column, amount in amounts.items():
+            result[column] = np.bincount(codes, weights=amount, minlength=len(ESTADOS))
+        result = result[result["investments"] > 0]
+        results.append(result.rename_axis("Estado").reset_index().assign(**parameters))
+
+    columns = list(DEFAULT_PARAMETERS) + ["Estado", "investments", "cost", "earnings", "net"]
+    return pd.concat(results, ignore_index=True)[columns]
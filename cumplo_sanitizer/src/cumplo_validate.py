@@ -0,0 +1,741 @@
+import argparse
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from functools import cached_property
+from os import path
+from typing import NamedTuple
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from . import (
+    cumplo_core,
+    cumplo_fuzzy,
+    cumplo_ids,
+    cumplo_layouts,
+    cumplo_mappings,
+    cumplo_pipeline,
+    cumplo_report,
+    cumplo_sweep,
+    some_utils,
+)
+
+try:
+    # Optional ('polars' extra); its checks are skipped when it is not installed
+    from . import cumplo_polars
+except ImportError:
+    cumplo_polars = None
+
+# Relative (and absolute) tolerance for numeric columns
+DEFAULT_TOLERANCE = 1e-9
+
+
+class ValidationInputs:
+    """
+    The exports being validated, and the inputs shared by the checks; each one is computed
+    (with the reference implementations) the first time a check needs it, and not timed.
+    """
+
+    def __init__(
+        self, movs_file_path: str, flows_file_path: str, fixdata_csv_path: str | None = None
+    ):
+        self.movs_file_path = movs_file_path
+        self.flows_file_path = flows_file_path
+        self.fixdata_csv_path = fixdata_csv_path
+
+    @cached_property
+    def movs_df(self) -> pd.DataFrame:
+        return cumplo_pipeline.load_movements(self.movs_file_path)
+
+    @cached_property
+    def flows_df(self) -> pd.DataFrame:
+        return cumplo_pipeline.load_flows(self.flows_file_path)
+
+    @cached_property
+    def flow_schedule(self) -> pd.DataFrame:
+        return cumplo_core.extract_flow_schedule(self.flows_file_path)
+
+    @cached_property
+    def sanitized(self) -> pd.DataFrame:
+        return cumplo_pipeline.sanitize(
+            self.movs_df.copy(), self.flows_df, self.fixdata_csv_path, verbose=False
+        )
+
+    @cached_property
+    def mapping_store(self) -> cumplo_mappings.MappingStore:
+        # A store that learned the mappings of a previous run on the same exports
+        self._store_dir = tempfile.TemporaryDirectory()
+        store = cumplo_mappings.MappingStore(self._store_dir.name)
+        cumplo_pipeline.sanitize(
+            self.movs_df.copy(),
+            self.flows_df,
+            self.fixdata_csv_path,
+            verbose=False,
+            mapping_store=store,
+        )
+        return store
+
+
+class Check(NamedTuple):
+    """
+    A reference implementation and a faster one, as functions of the `ValidationInputs`
+    returning frames comparable on `keys` (see `compare_frames`).
+    """
+
+    name: str
+    keys: list
+    reference: Callable[[ValidationInputs], pd.DataFrame]
+    candidate: Callable[[ValidationInputs], pd.DataFrame]
+
+
+def _text(series: pd.Series) -> pd.Series:
+    # Same representation for text keys from any backend (object, arrow or polars strings)
+    return series.astype("string").fillna("").astype(object)
+
+
+# Loop implementations replaced by the vectorized ones on `cumplo_core` and
+# `cumplo_fuzzy`, kept here as the references of their checks
+
+
+def _active_and_late_ids_loop(flows_file_path: str, grace_period_days: int) -> tuple:
+    # `cumplo_core.extract_active_and_late_ids`, before it read the flow schedule
+    workbook = openpyxl.load_workbook(flows_file_path, data_only=True)
+    sheet = workbook.active
+    all_ids, active_ids, late_ids, uncollectible_ids = set(), set(), set(), set()
+    for column in range(1, sheet.max_column + 1):
+        for row in range(
+            1 + cumplo_core.FLOWS_HEADER_LINES, sheet.max_row + 1 - cumplo_core.FLOWS_FOOTER_LINES
+        ):
+            cell = sheet.cell(row=row, column=column)
+            if cell.value is None or cell.value == "":
+                continue
+            font_color = cell.font.color
+            if font_color is None:
+                continue
+
+            remate_id = str(int(sheet.cell(row=row, column=1).value))
+            all_ids.add(remate_id)
+            if font_color.rgb == cumplo_core.C_GRAY:
+                active_ids.add(remate_id)
+            elif font_color.rgb == cumplo_core.C_RED:
+                late_ids.add(remate_id)
+                date = sheet.cell(row=1, column=column).value
+                if some_utils.is_date_past_grace_period(grace_period_days, date):
+                    uncollectible_ids.add(remate_id)
+    workbook.close()
+    return list(all_ids), list(active_ids), list(late_ids), list(uncollectible_ids)
+
+
+def _unexecuted_loop(df: pd.DataFrame, despreciable_amount: int) -> list:
+    unexecuted_ids = set()
+    for group_key, df_group in df.groupby("RemateID"):
+        investment_diff = df_group["Abono"].sum() - df_group["Cargo"].sum()
+        is_refunded = df_group["Descripción"].str.startswith(cumplo_core.REFUND_PREFIX).any()
+        if abs(investment_diff) <= abs(despreciable_amount) or is_refunded:
+            unexecuted_ids.add(group_key)
+    return list(unexecuted_ids)
+
+
+def _just_payed_loop(df: pd.DataFrame, not_present_in_flows_ids, considerable_amount: int):
+    just_payed = set()
+    for group_key, df_group in df[df["RemateID"].isin(not_present_in_flows_ids)].groupby(
+        "RemateID"
+    ):
+        investment_diff = df_group["Abono"].sum() - df_group["Cargo"].sum()
+        if investment_diff <= -1 * abs(considerable_amount):
+            just_payed.add(group_key)
+    return list(just_payed)
+
+
+def _uncollectibles_loop(
+    df: pd.DataFrame, grace_period_days: int, uncollectible_amount: int
+) -> list:
+    uncollectible_ids = set()
+    for group_key, df_group in df.groupby("RemateID"):
+        investment_diff = df_group["Abono"].sum() - df_group["Cargo"].sum()
+        date = df_group["Fecha"].max()
+        if investment_diff <= -1 * abs(uncollectible_amount) and (
+            some_utils.is_date_past_grace_period(grace_period_days, date)
+        ):
+            uncollectible_ids.add(group_key)
+    return list(uncollectible_ids)
+
+
+def _get_rates_loop(movs_df: pd.DataFrame) -> pd.DataFrame:
+    # One `_get_rates` call per investment, as `cumplo_core.explore_by_id` does
+    rows = []
+    for remate_id, flows in movs_df.groupby("RemateID"):
+        if flows["Cargo"].sum() > 0:
+            rows.append((str(remate_id), *cumplo_core._get_rates(flows)))
+    rates = pd.DataFrame(rows, columns=["RemateID"] + RATE_COLUMNS)
+    return rates.astype({column: float for column in RATE_COLUMNS[1:]})
+
+
+def _match_solicitudes_loop(solicitudes, flows_df: pd.DataFrame) -> pd.DataFrame:
+    # `cumplo_fuzzy.match_solicitudes` without blocking; every flow is a candidate
+    flows = flows_df[["ID", "Solicitud"]].dropna().drop_duplicates()
+    flow_tokens = [
+        (str(flow_id), cumplo_fuzzy.tokenize(str(solicitud)))
+        for flow_id, solicitud in zip(flows["ID"], flows["Solicitud"])
+    ]
+    rows = []
+    for solicitud in pd.Series(solicitudes, dtype=object).dropna().unique():
+        tokens = cumplo_fuzzy.tokenize(solicitud)
+        scored = sorted(
+            ((flow_id, cumplo_fuzzy.similarity(tokens, other)) for flow_id, other in flow_tokens),
+            key=lambda candidate: (-candidate[1], candidate[0]),
+        )
+        best_id, best_score = scored[0] if scored else (None, 0.0)
+        runner_up = next((score for flow_id, score in scored if flow_id != best_id), 0.0)
+        assigned = (
+            best_score >= cumplo_fuzzy.DEFAULT_THRESHOLD
+            and best_score - runner_up >= cumplo_fuzzy.DEFAULT_MARGIN
+        )
+        rows.append((solicitud, best_id if assigned else pd.NA, best_score))
+    return pd.DataFrame(rows, columns=["Solicitud", "RemateID", "score"])
+
+
+def _flow_schedule_reference(inputs: ValidationInputs) -> pd.DataFrame:
+    return cumplo_core.extract_flow_schedule(inputs.flows_file_path)
+
+
+def _flow_schedule_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    return cumplo_layouts.read_flows_v1(inputs.flows_file_path)[1]
+
+
+def _flows_reference(inputs: ValidationInputs) -> pd.DataFrame:
+    return cumplo_pipeline.load_flows(inputs.flows_file_path)[["ID", "Solicitud"]]
+
+
+def _flows_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    return cumplo_layouts.read_flows_v1(inputs.flows_file_path)[0][["ID", "Solicitud"]]
+
+
+def _flow_ids(all_ids, active_ids, late_ids, uncollectible_ids) -> pd.DataFrame:
+    # One row per ID found on the flows, and its categories
+    ids = pd.DataFrame({"RemateID": sorted({str(r_id) for r_id in all_ids})})
+    for column, category in [
+        ("active", active_ids),
+        ("late", late_ids),
+        ("uncollectible", uncollectible_ids),
+    ]:
+        ids[column] = ids["RemateID"].isin({str(r_id) for r_id in category})
+    return ids
+
+
+def _flow_ids_reference(inputs: ValidationInputs) -> pd.DataFrame:
+    return _flow_ids(*_active_and_late_ids_loop(inputs.flows_file_path, GRACE_PERIOD_DAYS))
+
+
+def _flow_ids_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    flow_schedule = cumplo_layouts.read_flows_v1(inputs.flows_file_path)[1]
+    return _flow_ids(*cumplo_core.ids_from_flow_schedule(flow_schedule, GRACE_PERIOD_DAYS))
+
+
+def _estados(remate_ids: pd.Series, estados: pd.Series) -> pd.DataFrame:
+    # One row per 'RemateID' ('' for the movements without one), and its 'Estado'
+    estados = pd.DataFrame(
+        {"RemateID": _text(remate_ids).to_numpy(), "Estado": _text(estados).to_numpy()}
+    )
+    return estados.groupby("RemateID", sort=True)["Estado"].first().reset_index()
+
+
+def _estado_reference(inputs: ValidationInputs) -> pd.DataFrame:
+    classified = cumplo_pipeline.classify(inputs.sanitized.copy(), inputs.flow_schedule)
+    return _estados(classified["RemateID"], classified["Estado"])
+
+
+def _estado_sweep_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    summary = cumplo_sweep.investment_summary(inputs.sanitized, inputs.flow_schedule)
+    estados = cumplo_sweep.classify_summary(summary)
+    return _estados(estados.index.to_series(), estados)
+
+
+def _extractors(known_df: pd.DataFrame, flow_schedule: pd.DataFrame, extractors) -> pd.DataFrame:
+    # One row per 'RemateID', and whether each extractor picks it; as `classify` calls them
+    unexecuted, just_payed, uncollectibles = extractors
+    not_present_in_flows_ids = list(
+        set(known_df["RemateID"].unique()) - set(flow_schedule["RemateID"].unique())
+    )
+    ids = pd.DataFrame({"RemateID": sorted(known_df["RemateID"].astype(str).unique())})
+    for column, category in [
+        ("unexecuted", unexecuted(known_df, PARAMETERS["despreciable_amount"])),
+        (
+            "just_payed",
+            just_payed(known_df, not_present_in_flows_ids, PARAMETERS["considerable_amount"]),
+        ),
+        (
+            "uncollectible",
+            uncollectibles(
+                known_df,
+                PARAMETERS["grace_period_days_since_last_payment"],
+                PARAMETERS["uncollectible_amount"],
+            ),
+        ),
+    ]:
+        ids[column] = ids["RemateID"].isin({str(r_id) for r_id in category})
+    return ids
+
+
+def _extractors_reference(inputs: ValidationInputs) -> pd.DataFrame:
+    known_df = inputs.sanitized.dropna(subset=["RemateID"])
+    loops = (_unexecuted_loop, _just_payed_loop, _uncollectibles_loop)
+    return _extractors(known_df, inputs.flow_schedule, loops)
+
+
+def _extractors_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    known_df = inputs.sanitized.dropna(subset=["RemateID"])
+    vectorized = (
+        cumplo_core.extract_unexecuted,
+        cumplo_core.extract_just_payed,
+        cumplo_core.extract_uncollectibles,
+    )
+    return _extractors(known_df, inputs.flow_schedule, vectorized)
+
+
+def _rates_reference(inputs: ValidationInputs) -> pd.DataFrame:
+    return _get_rates_loop(inputs.sanitized.dropna(subset=["RemateID"]))
+
+
+def _rates_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    movs_df = inputs.sanitized.dropna(subset=["RemateID"])
+    summary = cumplo_report.investment_summary(movs_df.assign(Estado=None))
+    summary = summary[summary["invested"] > 0]
+    return summary[["RemateID"] + RATE_COLUMNS].astype({"RemateID": str, "days": float})
+
+
+def _fuzzy(matches: pd.DataFrame) -> pd.DataFrame:
+    # Scores under the threshold assign nothing, and blocking may skip those candidates
+    scores = matches["score"].where(matches["score"] >= cumplo_fuzzy.DEFAULT_THRESHOLD)
+    return pd.DataFrame(
+        {
+            "Solicitud": matches["Solicitud"].astype(object),
+            "RemateID": _text(matches["RemateID"]).to_numpy(),
+            "score": scores.astype(float),
+        }
+    )
+
+
+def _fuzzy_reference(inputs: ValidationInputs) -> pd.DataFrame:
+    return _fuzzy(_match_solicitudes_loop(inputs.sanitized["Solicitud"], inputs.flows_df))
+
+
+def _fuzzy_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    matches = cumplo_fuzzy.match_solicitudes(inputs.sanitized["Solicitud"], inputs.flows_df)
+    return _fuzzy(matches)
+
+
+def _id_assignment(movs_df: pd.DataFrame) -> pd.DataFrame:
+    # Movements per ('Descripción', 'RemateID', 'Actor'); independent of the row order
+    keys = pd.DataFrame({column: _text(movs_df[column]) for column in ID_ASSIGNMENT_KEYS})
+    return keys.groupby(ID_ASSIGNMENT_KEYS).size().rename("movements").reset_index()
+
+
+def _id_assignment_reference_startswith(inputs: ValidationInputs) -> pd.DataFrame:
+    # Every 'Solicitud' matched against the flows, with `str.startswith`
+    sanitized = cumplo_pipeline.sanitize(
+        inputs.movs_df.copy(), inputs.flows_df, inputs.fixdata_csv_path, verbose=False
+    )
+    return _id_assignment(sanitized)
+
+
+def _id_assignment_store_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    # The known 'Solicitud's and 'Actor's resolved from the store, and the RemateIDs
+    # classified on as registry codes, as the worker does
+    sanitized = cumplo_pipeline.sanitize(
+        inputs.movs_df.copy(),
+        inputs.flows_df,
+        inputs.fixdata_csv_path,
+        verbose=False,
+        mapping_store=inputs.mapping_store,
+    )
+    registry = cumplo_ids.RemateIDRegistry.from_ids(sanitized["RemateID"])
+    sanitized["RemateID"] = registry.decode(registry.encode(sanitized["RemateID"]))
+    return _id_assignment(sanitized)
+
+
+def _polars_classified(inputs: ValidationInputs) -> pd.DataFrame:
+    return cumplo_polars.sanitize_and_classify(
+        inputs.movs_df, inputs.flows_df, inputs.flow_schedule, inputs.fixdata_csv_path, False
+    )
+
+
+def _pandas_classified(inputs: ValidationInputs) -> pd.DataFrame:
+    # Both stages, as the polars backend does them at once
+    sanitized = cumplo_pipeline.sanitize(
+        inputs.movs_df.copy(), inputs.flows_df, inputs.fixdata_csv_path, verbose=False
+    )
+    return cumplo_pipeline.classify(sanitized, inputs.flow_schedule)
+
+
+def _id_assignment_reference(inputs: ValidationInputs) -> pd.DataFrame:
+    return _id_assignment(_pandas_classified(inputs))
+
+
+def _id_assignment_polars_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    return _id_assignment(_polars_classified(inputs))
+
+
+def _estado_polars_reference(inputs: ValidationInputs) -> pd.DataFrame:
+    classified = _pandas_classified(inputs)
+    return _estados(classified["RemateID"], classified["Estado"])
+
+
+def _estado_polars_candidate(inputs: ValidationInputs) -> pd.DataFrame:
+    classified = _polars_classified(inputs)
+    return _estados(classified["RemateID"], classified["Estado"])
+
+
+# Parameters of the reference implementations, as the notebook uses them
+PARAMETERS = cumplo_sweep.DEFAULT_PARAMETERS
+GRACE_PERIOD_DAYS = PARAMETERS["grace_period_days"]
+ID_ASSIGNMENT_KEYS = ["Descripción", "RemateID", "Actor"]
+RATE_COLUMNS = ["days", "rate", "rate_yr", "xirr"]
+
+# Every reference/candidate pair; the polars ones only when polars is installed
+CHECKS = [
+    Check(
+        "flow_schedule",
+        ["RemateID", "due_date"],
+        _flow_schedule_reference,
+        _flow_schedule_candidate,
+    ),
+    Check("flows", ["ID"], _flows_reference, _flows_candidate),
+    Check("flow_ids", ["RemateID"], _flow_ids_reference, _flow_ids_candidate),
+    Check("extractors", ["RemateID"], _extractors_reference, _extractors_candidate),
+    Check("estado_sweep", ["RemateID"], _estado_reference, _estado_sweep_candidate),
+    Check("rates", ["RemateID"], _rates_reference, _rates_candidate),
+    Check(
+        "id_assignment",
+        ID_ASSIGNMENT_KEYS,
+        _id_assignment_reference_startswith,
+        _id_assignment_store_candidate,
+    ),
+    Check("fuzzy", ["Solicitud"], _fuzzy_reference, _fuzzy_candidate),
+]
+if cumplo_polars is not None:
+    CHECKS += [
+        Check(
+            "id_assignment_polars",
+            ID_ASSIGNMENT_KEYS,
+            _id_assignment_reference,
+            _id_assignment_polars_candidate,
+        ),
+        Check("estado_polars", ["RemateID"], _estado_polars_reference, _estado_polars_candidate),
+    ]
+
+
+def compare_frames(
+    reference: pd.DataFrame,
+    candidate: pd.DataFrame,
+    keys: list[str],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> pd.DataFrame:
+    """
+    Compare two frames row by row, matching rows on `keys`.
+
+    Parameters
+    ----------
+    reference, candidate : pd.DataFrame
+        Frames with the same columns, unique on `keys`.
+    keys : list[str]
+        Columns identifying a row.
+    tolerance : float, optional
+        Relative and absolute tolerance for numeric columns (default is 1e-9).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per difference; the `keys`, 'column' (or '<row>' for rows found on one
+        side only), 'reference' and 'candidate' values. Missing values are equal to each
+        other.
+
+    Raises
+    ------
+    ValueError
+        If `keys` are repeated on either frame; rows would be paired many to many.
+    """
+    for side, frame in [("reference", reference), ("candidate", candidate)]:
+        repeated = frame.loc[frame.duplicated(subset=keys, keep=False), keys]
+        if not repeated.empty:
+            raise ValueError(f"The {side} has repeated {keys}: {repeated.head().values.tolist()}")
+
+    merged = pd.merge(
+        reference, candidate, on=keys, how="outer", suffixes=("_ref", "_new"), indicator=True
+    )
+    differences = []
+
+    one_side = merged[merged["_merge"] != "both"]
+    if not one_side.empty:
+        differences.append(
+            one_side[keys].assign(
+                column="<row>",
+                reference=np.where(one_side["_merge"] == "left_only", "present", "missing"),
+                candidate=np.where(one_side["_merge"] == "right_only", "present", "missing"),
+            )
+        )
+
+    both = merged[merged["_merge"] == "both"]
+    for column in [column for column in reference.columns if column not in keys]:
+        ref, new = both[f"{column}_ref"], both[f"{column}_new"]
+        missing = ref.isna() & new.isna()
+        if pd.api.types.is_numeric_dtype(ref) and pd.api.types.is_numeric_dtype(new):
+            ref_values, new_values = ref.to_numpy(float), new.to_numpy(float)
+            equal = np.isclose(ref_values, new_values, rtol=tolerance, atol=tolerance)
+            equal |= ref_values == new_values
+        else:
+            equal = (ref.astype(object) == new.astype(object)).fillna(False).to_numpy(bool)
+        different = ~(equal | missing.to_numpy())
+        if different.any():
+            differences.append(
+                both.loc[different, keys].assign(
+                    column=column,
+                    reference=ref[different].astype(object),
+                    candidate=new[different].astype(object),
+                )
+            )
+
+    columns = keys + ["column", "reference", "candidate"]
+    if not differences:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(differences, ignore_index=True)[columns]
+
+
+def validate(
+    movs_file_path: str,
+    flows_file_path: str,
+    checks: list[str] | None = None,
+    tolerance: float = DEFAULT_TOLERANCE,
+    fixdata_csv_path: str | None = None,
+) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Run the reference and the fast implementations on the same exports, time both, and
+    compare their outputs.
+
+    Parameters
+    ----------
+    movs_file_path : str
+        Path to the movements export.
+    flows_file_path : str
+        Path to the flows export.
+    checks : list[str], optional
+        Names of the `CHECKS` to run (default is None, all of them).
+    tolerance : float, optional
+        Tolerance for numeric values, like amounts and rates (see `compare_frames`).
+    fixdata_csv_path : str, optional
+        Path to the manual fixes (see `cumplo_pipeline.apply_fixes`).
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        The summary, one row per check: 'check', 'reference_seconds', 'candidate_seconds',
+        'speedup', 'rows' (on the reference output) and 'differences'; and the differences
+        (see `compare_frames`), with a 'check' column.
+
+    Raises
+    ------
+    ValueError
+        If `checks` has unknown names.
+
+    Description
+    -----------
+    - flow_schedule, flows: `cumplo_core.extract_flow_schedule` and
+      `cumplo_pipeline.load_flows` against `cumplo_layouts.read_flows_v1`.
+    - flow_ids: the loop over the flows workbook `cumplo_core.extract_active_and_late_ids`
+      replaced, against `cumplo_core.ids_from_flow_schedule` on the fast flow schedule.
+    - extractors: the per-investment loops `cumplo_core.extract_unexecuted`,
+      `extract_just_payed` and `extract_uncollectibles` replaced, against them.
+    - estado_sweep: the 'Estado' of each investment, from `cumplo_pipeline.classify` and
+      from `cumplo_sweep.classify_summary`.
+    - rates: `cumplo_core._get_rates` per investment against the groupby of
+      `cumplo_report.investment_summary`.
+    - id_assignment: the 'RemateID' and 'Actor' of the movements, from
+      `cumplo_pipeline.sanitize` matching every 'Solicitud' with `str.startswith`, and from
+      the path of the worker; a `cumplo_mappings.MappingStore` that learned a previous
+      run, and the RemateIDs through a `cumplo_ids.RemateIDRegistry`.
+    - fuzzy: the 'RemateID' (and score, over the threshold) of every 'Solicitud', by
+      similarity against every flow, and from `cumplo_fuzzy.match_solicitudes` (blocked).
+    - id_assignment_polars, estado_polars: the 'RemateID' and 'Actor' of the movements,
+      and the 'Estado's, from the pandas stages and from the polars backend.
+
+    The inputs shared by several checks (ie: the sanitized movements, or the learned
+    mapping store) are computed once with the reference implementations, and are not part
+    of the timings; the polars checks
+    run both stages on each side, as `run_pipeline` would.
+
+    Examples
+    --------
+    >>> summary, differences = validate(movs_path, flows_path)
+    >>> summary, differences = validate(*generate_exports("/tmp/validation/", 500))
+    """
+    names = [check.name for check in CHECKS]
+    unknown = sorted(set(checks or []) - set(names))
+    if unknown:
+        raise ValueError(f"Unknown checks: {unknown}, use some of {names}")
+
+    inputs = ValidationInputs(movs_file_path, flows_file_path, fixdata_csv_path)
+    rows, all_differences = [], []
+    for check in CHECKS:
+        if checks is not None and check.name not in checks:
+            continue
+        start = time.perf_counter()
+        reference = check.reference(inputs)
+        reference_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        candidate = check.candidate(inputs)
+        candidate_seconds = time.perf_counter() - start
+
+        differences = compare_frames(reference, candidate, check.keys, tolerance)
+        all_differences.append(differences.assign(check=check.name))
+        rows.append(
+            {
+                "check": check.name,
+                "reference_seconds": reference_seconds,
+                "candidate_seconds": candidate_seconds,
+                "speedup": reference_seconds / max(candidate_seconds, 1e-9),
+                "rows": len(reference),
+                "differences": len(differences),
+            }
+        )
+
+    differences = pd.concat(all_differences, ignore_index=True) if all_differences else None
+    if differences is None or differences.empty:
+        differences = pd.DataFrame(columns=["check", "column", "reference", "candidate"])
+    columns = ["check"] + [column for column in differences.columns if column != "check"]
+    return pd.DataFrame(rows), differences[columns]
+
+
+def generate_exports(
+    folder: str, investments: int = 200, seed: int = 0, today: pd.Timestamp = None
+) -> (str, str):
+    """
+    Write a synthetic pair of exports, with the layouts of cumplo.cl ones, to validate with.
+
+    Parameters
+    ----------
+    folder : str
+        Folder where 'Resumen de movimientos - synthetic.xlsx' and
+        'Resumen de flujos - synthetic.xlsx' are written.
+    investments : int, optional
+        Number of investments (default is 200); up to 12 movements each.
+    seed : int, optional
+        Random seed (default is 0).
+    today : pd.Timestamp, optional
+        Flows before this date are paid, pending or late, the rest are future (default is
+        today).
+
+    Returns
+    -------
+    tuple[str, str]
+        The paths to the movements and flows exports.
+
+    Description
+    -----------
+    Every investment has monthly flows; on-time (green), late-paid (orange), pending (red,
+    some of them beyond the grace period) and future (gray). The movements are the
+    investment and the paid flows, with a 'Solicitud' that sometimes has the ID as its
+    last word and sometimes has to be matched against the flows.
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(today if today is not None else pd.Timestamp.now().normalize())
+    # Flows are due on the 5th of each month, two years back and one year ahead
+    first_month = today - pd.DateOffset(months=24)
+    months = pd.date_range(first_month, periods=36, freq="MS") + pd.Timedelta(days=4)
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["ID", "Solicitud", "Inversión"] + [date.to_pydatetime() for date in months])
+    fonts = {
+        status: openpyxl.styles.Font(color=color)
+        for color, status in cumplo_core.FLOW_STATUSES.items()
+    }
+
+    movements = []
+    for number in range(investments):
+        remate_id = 20000 + number
+        name = f"Empresa {number:04d} SpA"
+        with_id = rng.random() < 0.5
+        solicitud = f"Crédito {name}" + (f" {remate_id}" if with_id else "")
+        start = int(rng.integers(0, len(months) - 6))
+        length = int(rng.integers(3, 12))
+        invested = int(rng.integers(10, 200)) * 10_000
+        installment = float(round(invested * 1.1 / length))
+        late_from = start + int(rng.integers(1, length)) if rng.random() < 0.2 else None
+
+        row = [remate_id, f"Crédito {name} {remate_id}", invested]
+        statuses = {}
+        for column in range(start, min(start + length, len(months))):
+            if months[column] >= today:
+                statuses[column] = "future"
+            elif late_from is not None and column >= late_from:
+                statuses[column] = "pending"
+            else:
+                statuses[column] = "late-paid" if rng.random() < 0.15 else "on-time"
+        sheet.append(row + [statuses.get(column) and installment for column in range(len(months))])
+        for column, status in statuses.items():
+            sheet.cell(sheet.max_row, 4 + column).font = fonts[status]
+
+        movements.append(
+            (months[start] - pd.Timedelta(days=20), "Inversión", solicitud, invested, 0)
+        )
+        for column, status in statuses.items():
+            if status in ("on-time", "late-paid"):
+                date = months[column] + pd.Timedelta(days=int(rng.integers(0, 20)))
+                movements.append((date, "Pago de inversión", solicitud, 0, installment))
+
+    # Footer, as on the exports; an empty line and the color labels
+    sheet.append([])
+    for label in ["PAGADA", "MOROSA", "FUTURA", "EJECUTADA O PAGADA ATRASADA"]:
+        sheet.append([None, label])
+    flows_file_path = path.join(folder, f"{cumplo_pipeline.FLOWS_PREFIX}synthetic.xlsx")
+    workbook.save(flows_file_path)
+
+    movs_df = pd.DataFrame(
+        [
+            {
+                "Fecha": fecha,
+                "Descripción": f"{kind}, solicitud: {solicitud}",
+                "Cargo": cargo,
+                "Abono": abono,
+            }
+            for fecha, kind, solicitud, cargo, abono in movements
+        ]
+    ).sort_values("Fecha", kind="stable")
+    movs_file_path = path.join(folder, f"{cumplo_pipeline.MOVS_PREFIX}synthetic.xlsx")
+    movs_df.to_excel(movs_file_path, index=False)
+    return movs_file_path, flows_file_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the fast implementations against the reference ones"
+    )
+    parser.add_argument("movs_file_path", nargs="?", help="Movements export")
+    parser.add_argument("flows_file_path", nargs="?", help="Flows export")
+    parser.add_argument(
+        "--generate", type=int, metavar="INVESTMENTS", help="Validate on synthetic exports"
+    )
+    parser.add_argument("--check", action="append", dest="checks", help="Only these checks")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.generate is not None:
+            file_paths = generate_exports(tmp_dir, args.generate)
+        elif args.movs_file_path and args.flows_file_path:
+            file_paths = (args.movs_file_path, args.flows_file_path)
+        else:
+            parser.error("give both exports, or --generate")
+        summary, differences = validate(*file_paths, args.checks, args.tolerance)
+
+    print(summary.round(4).to_string(index=False))
+    if not differences.empty:
+        print(differences.to_string(index=False))
+    sys.exit(1 if len(differences) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+import argparse
+import ctypes
+import ctypes.util
+import datetime
+import hashlib
+import json
+import os
+import re
+import select
+import time
+import traceback
+from collections.abc import Callable
+from os import path
+from typing import NamedTuple
+
+from . import cumplo_pipeline
+
+# Dates found on export names; 'Resumen de movimientos - 2023-11-06.xls', '...06-11-2023...'
+_DATE_PATTERNS = [
+    (re.compile(r"(\d{4})[-_.](\d{1,2})[-_.](\d{1,2})"), ("year", "month", "day")),
+    (re.compile(r"(\d{1,2})[-_.](\d{1,2})[-_.](\d{4})"), ("day", "month", "year")),
+    (re.compile(r"(?<!\d)(\d{4})(\d{2})(\d{2})(?!\d)"), ("year", "month", "day")),
+]
+# Optional time after the date; '... 2023-11-06 14_35_10.xls'
+_TIME_PATTERN = re.compile(r"^[ _T-]*(\d{1,2})[-_.:h](\d{2})(?:[-_.:m](\d{2}))?")
+
+# inotify flags (see `man inotify`)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = 0o4000
+
+# Where the processed exports are remembered, on `data_out_folder`
+WATCH_STATE_FILE_NAME = ".watch_state.json"
+
+
+class ExportFile(NamedTuple):
+    """An export on `data_in_folder`, as indexed by `ExportScanner`."""
+
+    path: str
+    name: str
+    export_date: datetime.datetime | None
+    mtime_ns: int
+    size: int
+    content_hash: str
+
+
+def parse_export_date(file_name: str) -> datetime.datetime | None:
+    """
+    Parse the export date from a cumplo export file name.
+
+    Parameters
+    ----------
+    file_name : str
+        The file name, ie: 'Resumen de flujos - 2023-11-06.xlsx'.
+
+    Returns
+    -------
+    datetime.datetime
+        The date (and time, when present) of the export, or None if no date is found.
+
+    Examples
+    --------
+    >>> parse_export_date("Resumen de flujos - 2023-11-06.xlsx")
+    datetime.datetime(2023, 11, 6, 0, 0)
+    >>> parse_export_date("Resumen de movimientos - 06-11-2023 14_35.xls")
+    datetime.datetime(2023, 11, 6, 14, 35)
+    >>> parse_export_date("Resumen de flujos.xlsx") is None
+    True
+    """
+    for pattern, order in _DATE_PATTERNS:
+        match = pattern.search(file_name)
+        if match is None:
+            continue
+
+        parts = dict(zip(order, (int(group) for group in match.groups())))
+        time_match = _TIME_PATTERN.match(file_name[match.end() :])
+        if time_match is not None:
+            parts["hour"] = int(time_match.group(1))
+            parts["minute"] = int(time_match.group(2))
+            parts["second"] = int(time_match.group(3) or 0)
+        try:
+            return datetime.datetime(**parts)
+        except ValueError:
+            continue
+
+    return None
+
+
+def _hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExportScanner:
+    """
+    Index of the export files on `data_in_folder`.
+
+    Files are indexed once with their name, parsed export date, mtime, size and content
+    hash. Later `refresh` calls only stat the folder, and hash just the new or changed files.
+
+    Parameters
+    ----------
+    data_in_folder : str
+        The folder where the exports are downloaded.
+
+    Examples
+    --------
+    >>> scanner = ExportScanner("./data_in/")
+    >>> scanner.latest("Resumen de flujos - ", "xlsx").path
+    './data_in/Resumen de flujos - 2023-11-06.xlsx'
+    """
+
+    def __init__(self, data_in_folder: str):
+        self.data_in_folder = data_in_folder
+        self._files: dict[str, ExportFile] = {}
+        self.refresh()
+
+    def refresh(self) -> list[ExportFile]:
+        """
+        Update the index with the current content of the folder.
+
+        Returns
+        -------
+        list[ExportFile]
+            The files that are new or changed since the last refresh.
+        """
+        if not path.isdir(self.data_in_folder):
+            self._files = {}
+            return []
+
+        changed = []
+        current = {}
+        with os.scandir(self.data_in_folder) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                known = self._files.get(entry.path)
+                if known is not None and (known.mtime_ns, known.size) == (
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                ):
+                    current[entry.path] = known
+                    continue
+
+                export_file = ExportFile(
+                    path=entry.path,
+                    name=entry.name,
+                    export_date=parse_export_date(entry.name),
+                    mtime_ns=stat.st_mtime_ns,
+                    size=stat.st_size,
+                    content_hash=_hash_file(entry.path),
+                )
+                current[entry.path] = export_file
+                changed.append(export_file)
+
+        self._files = current
+        return changed
+
+    def files(self, prefix: str, extension: str) -> list[ExportFile]:
+        """Return the indexed files with `prefix` and `extension`, most recent first."""
+        matching = [
+            export_file
+            for export_file in self._files.values()
+            if export_file.name.startswith(prefix) and export_file.name.endswith(extension)
+        ]
+        return sorted(matching, key=_recency_key, reverse=True)
+
+    def latest(self, prefix: str, extension: str) -> ExportFile | None:
+        """Return the most recent export (by parsed date) with `prefix` and `extension`."""
+        matching = self.files(prefix, extension)
+        return matching[0] if len(matching) > 0 else None
+
+
+def _recency_key(export_file: ExportFile) -> tuple:
+    # Parsed export date first; mtime for files without a date on their name
+    export_date = export_file.export_date
+    if export_date is None:
+        export_date = datetime.datetime.fromtimestamp(export_file.mtime_ns / 1e9)
+    return (export_date, export_file.mtime_ns, export_file.name)
+
+
+def _inotify_waiter(folder: str) -> Callable[[float], bool] | None:
+    # Returns a `wait(timeout) -> bool` function, or None when inotify is not available
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return None
+    try:
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        inotify_init1 = libc.inotify_init1
+        inotify_add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    fd = inotify_init1(_IN_NONBLOCK)
+    if fd < 0:
+        return None
+    if inotify_add_watch(fd, os.fsencode(folder), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+
+    def wait(timeout: float) -> bool:
+        ready, _, _ = select.select([fd], [], [], timeout)
+        if len(ready) == 0:
+            return False
+        # Drain the pending events, we only care about 'something happened'
+        try:
+            while os.read(fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    return wait
+
+
+def _load_state(state_path: str) -> tuple[set, set]:
+    # (processed, failed) pairs of (movements hash, flows hash)
+    if not path.exists(state_path):
+        return set(), set()
+    with open(state_path) as state_file:
+        state = json.load(state_file)
+    return (
+        {tuple(pair) for pair in state["processed"]},
+        {tuple(pair) for pair in state.get("failed", [])},
+    )
+
+
+def _save_state(state_path: str, processed: set, failed: set) -> None:
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as state_file:
+        json.dump(
+            {
+                "processed": sorted(list(pair) for pair in processed),
+                "failed": sorted(list(pair) for pair in failed),
+            },
+            state_file,
+        )
+    os.replace(tmp_path, state_path)
+
+
+def pending_export(scanner: ExportScanner, processed: set) -> tuple | None:
+    """
+    Return the latest (movements, flows) `ExportFile` pair, if its contents weren't processed.
+
+    Parameters
+    ----------
+    scanner : ExportScanner
+        The (refreshed) index of `data_in_folder`.
+    processed : set
+        (movements hash, flows hash) pairs already processed.
+
+    Returns
+    -------
+    tuple
+        The (movements, flows) exports to process, or None when there is nothing new.
+    """
+    movs_file = scanner.latest(cumplo_pipeline.MOVS_PREFIX, cumplo_pipeline.MOVS_EXTENSION)
+    flows_file = scanner.latest(cumplo_pipeline.FLOWS_PREFIX, cumplo_pipeline.FLOWS_EXTENSION)
+    if movs_file is None or flows_file is None:
+        return None
+    if (movs_file.content_hash, flows_file.content_hash) in processed:
+        return None
+    return (movs_file, flows_file)
+
+
+def watch(
+    data_in_folder: str,
+    data_out_folder: str,
+    on_new_export: Callable[[str, str], object] | None = None,
+    poll_interval: float = 5.0,
+    settle_seconds: float = 1.0,
+    use_inotify: bool = True,
+    max_runs: int | None = None,
+) -> None:
+    """
+    Wait for new exports on `data_in_folder` and run the pipeline when one lands.
+
+    A run is triggered only when the latest movements and flows exports (by parsed date)
+    are a pair of contents that wasn't processed before, so touching, renaming or
+    re-downloading the same export doesn't trigger anything. Processed pairs are
+    remembered on `data_out_folder`, so restarts don't re-run either.
+
+    When `on_new_export` raises (ie: a malformed export, or a
+    `cumplo_layouts.UnknownLayoutError`), the error is printed and the pair is remembered
+    as failed instead; it is skipped until one of its files changes, and the watch goes on.
+
+    Parameters
+    ----------
+    data_in_folder : str
+        The folder where the exports are downloaded.
+    data_out_folder : str
+        The folder where the output (and the watch state) is written.
+    on_new_export : Callable[[str, str], object], optional
+        Called with the movements and flows paths. Default runs
+        `cumplo_pipeline.run_pipeline`.
+    poll_interval : float, optional
+        Seconds between folder scans (default is 5); with inotify, the folder is also
+        rescanned as soon as something is written on it.
+    settle_seconds : float, optional
+        Seconds to wait after a change, so downloads can finish (default is 1).
+    use_inotify : bool, optional
+        If True (default), use inotify when available; polling otherwise.
+    max_runs : int, optional
+        Stop after this many runs, failed ones included (default is None, run forever).
+
+    Examples
+    --------
+    >>> watch("./data_in/", "./data_out/")
+    """
+    if on_new_export is None:
+
+        def on_new_export(movs_file_path, flows_file_path):
+            return cumplo_pipeline.run_pipeline(
+                data_in_folder, data_out_folder, movs_file_path, flows_file_path
+            )
+
+    state_path = path.join(data_out_folder, WATCH_STATE_FILE_NAME)
+    processed, failed = _load_state(state_path)
+    scanner = ExportScanner(data_in_folder)
+    wait = _inotify_waiter(data_in_folder) if use_inotify else None
+
+    runs = 0
+    while max_runs is None or runs < max_runs:
+        new_export = pending_export(scanner, processed | failed)
+        if new_export is not None:
+            movs_file, flows_file = new_export
+            pair = (movs_file.content_hash, flows_file.content_hash)
+            print(f"New export found: [{movs_file.name}] [{flows_file.name}]")
+            try:
+                on_new_export(movs_file.path, flows_file.path)
+                processed.add(pair)
+            except Exception:  # noqa: BLE001 - any failure of a run must not stop the watch
+                traceback.print_exc()
+                print(
+                    f"Export failed: [{movs_file.name}] [{flows_file.name}]; "
+                    "skipped until one of them changes"
+                )
+                failed.add(pair)
+            _save_state(state_path, processed, failed)
+            runs += 1
+            continue
+
+        # Wait for the next change; on inotify until something is written on the folder, or
+        # `poll_interval` passes (events can be missed, ie: on network mounts). Rescan anyway
+        if wait is None:
+            time.sleep(poll_interval)
+            time.sleep(settle_seconds)
+        elif wait(poll_interval):
+            time.sleep(settle_seconds)
+        scanner.refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the cumplo sanitizer each time a new export lands on data_in"
+    )
+    parser.add_argument("data_in_folder", nargs="?", default="./data_in/")
+    parser.add_argument("data_out_folder", nargs="?", default="./data_out/")
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--no-inotify", action="store_true", help="Always poll the folder")
+    args = parser.parse_args()
+
+    watch(
+        args.data_in_folder,
+        args.data_out_folder,
+        poll_interval=args.poll_interval,
+        use_inotify=not args.no_inotify,
+    )
+
+
+if __name__ == "__main__":
+    main()
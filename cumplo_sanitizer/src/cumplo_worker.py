@@ -0,0 +1,394 @@
+import argparse
+import json
+import os
+import socket
+import time
+import traceback
+import uuid
+from os import path
+
+import pandas as pd
+
+from . import cumplo_cache, cumplo_ids, cumplo_ingest, cumplo_pipeline, cumplo_watch, some_utils
+
+# Files of a job on the spool folder; '<job_id><suffix>'
+JOB_SUFFIX = ".job.json"
+RUNNING_SUFFIX = ".job.running"
+DONE_SUFFIX = ".job.done"
+RESULT_SUFFIX = ".feather"
+STATUS_SUFFIX = ".status.json"
+
+# Seconds after which a running job whose worker can't be checked (on another host) is stale
+STALE_SECONDS = 6 * 60 * 60
+# Runs of a job whose worker died before it is marked as failed (ie: it kills the worker)
+MAX_ATTEMPTS = 3
+
+
+def _write_json_atomic(file_path: str, content: dict) -> None:
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(content, file, default=str)
+    os.replace(tmp_path, file_path)
+
+
+def submit_job(
+    spool_dir: str,
+    movs_file_path: str,
+    flows_file_path: str,
+    fixdata_csv_path: str | None = None,
+    **classify_kwargs,
+) -> str:
+    """
+    Queue a pipeline run for a `Worker` serving `spool_dir`.
+
+    Parameters
+    ----------
+    spool_dir : str
+        The spool folder (created when needed).
+    movs_file_path, flows_file_path : str
+        Paths to the exports.
+    fixdata_csv_path : str, optional
+        Path to the manual fixes (see `cumplo_pipeline.apply_fixes`).
+    **classify_kwargs
+        Thresholds forwarded to `cumplo_pipeline.classify`.
+
+    Returns
+    -------
+    str
+        The job id; jobs are run in submission order.
+
+    Examples
+    --------
+    >>> job_id = submit_job("./spool/", movs_path, flows_path, despreciable_amount=1000)
+    >>> wait_for_job("./spool/", job_id)["output"]
+    './spool/1699300000000000000-3f2a9c1e.feather'
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    job_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    _write_json_atomic(
+        path.join(spool_dir, job_id + JOB_SUFFIX),
+        {
+            "movs_file_path": path.abspath(movs_file_path),
+            "flows_file_path": path.abspath(flows_file_path),
+            "fixdata_csv_path": fixdata_csv_path and path.abspath(fixdata_csv_path),
+            "classify": classify_kwargs,
+        },
+    )
+    return job_id
+
+
+def read_status(spool_dir: str, job_id: str) -> dict | None:
+    """Return the status of a finished job, or None while it is queued or running."""
+    status_path = path.join(spool_dir, job_id + STATUS_SUFFIX)
+    if not path.exists(status_path):
+        return None
+    with open(status_path) as status_file:
+        return json.load(status_file)
+
+
+def read_result(status: dict) -> pd.DataFrame:
+    """Read the classified movements of a 'done' job (text as `some_utils.STRING_DTYPE`)."""
+    return cumplo_ingest.load_streamed(status["output"])
+
+
+def wait_for_job(
+    spool_dir: str, job_id: str, timeout: float = 60.0, poll_interval: float = 0.005
+) -> dict:
+    """
+    Wait until a job is finished, and return its status (see `Worker.run_job`).
+
+    Raises
+    ------
+    TimeoutError
+        If the job is not finished after `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        status = read_status(spool_dir, job_id)
+        if status is not None:
+            return status
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Job [{job_id}] not finished after {timeout} seconds")
+        time.sleep(poll_interval)
+
+
+class Worker:
+    """
+    A long running process that runs the pipeline for the jobs queued on a spool folder.
+
+    Starting a run from scratch pays for the imports, the first use of the extraction
+    patterns (compiled and cached by `re`/Arrow on first use) and the parsing of the
+    exports. A worker pays for them once: `warm_up` runs every stage over a tiny frame, and
+    the stage outputs (parsed exports included) are kept on a `cumplo_cache.MemoryStageCache`,
+    so a job on an export already seen only runs the stages after the first change. The
+    `cumplo_ids.RemateIDRegistry` is kept too, so `classify` only adds the new RemateIDs.
+
+    Jobs are '<job_id>.job.json' files (see `submit_job`). Each one is claimed by renaming it
+    to '.job.running' (so several workers can share a spool), and its results are written
+    next to it, each to a temporary file first and then renamed:
+    - '<job_id>.feather', the classified movements,
+    - '<job_id>.status.json', written last; 'status' ('done' or 'failed'), 'output',
+      'rows', 'estados' (rows per Estado), 'seconds', or 'error' and 'traceback'.
+    The job file is then renamed to '.job.done'.
+
+    The running job file also records the worker (pid and host), so the jobs left running
+    by a worker that died are re-queued when a worker starts serving (see
+    `recover_stale_jobs`).
+
+    Parameters
+    ----------
+    spool_dir : str
+        The spool folder (created when needed).
+    max_cached_stages : int, optional
+        Stage outputs kept in memory (default is 64).
+    verbose : bool, optional
+        If True, print the unmatched 'Solicitud's and a line per job (default is False).
+
+    Examples
+    --------
+    >>> worker = Worker("./spool/")
+    >>> worker.warm_up()
+    >>> worker.serve()
+    """
+
+    def __init__(self, spool_dir: str, max_cached_stages: int = 64, verbose: bool = False):
+        self.spool_dir = spool_dir
+        self.verbose = verbose
+        self.cache = cumplo_cache.MemoryStageCache(
+            cumplo_pipeline.code_version(), max_entries=max_cached_stages
+        )
+        self.registry = cumplo_ids.RemateIDRegistry.from_ids([])
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def warm_up(self) -> None:
+        """Run every stage once over a tiny synthetic export."""
+        movs_df = some_utils.to_string_dtype(
+            pd.DataFrame(
+                {
+                    "Fecha": pd.to_datetime(["2023-04-02", "2023-05-02"]),
+                    "Descripción": [
+                        "Inversión, solicitud: Crédito Warm Up 1",
+                        "Pago de inversión, solicitud: Credito Warm Up",
+                    ],
+                    "Cargo": [1000.0, 0.0],
+                    "Abono": [0.0, 1100.0],
+                }
+            )
+        )
+        flows_df = some_utils.to_string_dtype(
+            pd.DataFrame({"ID": ["1"], "Solicitud": ["Crédito Warm Up 1"]})
+        )
+        flow_schedule = pd.DataFrame(
+            {
+                "RemateID": pd.array(["1"], dtype=some_utils.STRING_DTYPE),
+                "due_date": pd.to_datetime(["2023-05-01"]),
+                "amount": [1100.0],
+                "status": ["on-time"],
+            }
+        )
+        movs_df = cumplo_pipeline.sanitize(
+            cumplo_pipeline.filter_movements(movs_df), flows_df, verbose=False
+        )
+        cumplo_pipeline.classify(movs_df, flow_schedule, registry=self.registry)
+
+    def pending_jobs(self) -> list[str]:
+        """Return the ids of the queued jobs, in submission order."""
+        return sorted(
+            name[: -len(JOB_SUFFIX)]
+            for name in os.listdir(self.spool_dir)
+            if name.endswith(JOB_SUFFIX)
+        )
+
+    def run_job(self, job_id: str) -> dict | None:
+        """
+        Claim and run a queued job.
+
+        Returns
+        -------
+        dict
+            The job status (also written to '<job_id>.status.json'), or None when the job
+            was claimed by another worker.
+        """
+        job_path = path.join(self.spool_dir, job_id)
+        try:
+            os.rename(job_path + JOB_SUFFIX, job_path + RUNNING_SUFFIX)
+        except FileNotFoundError:
+            return None
+
+        start = time.perf_counter()
+        try:
+            with open(job_path + RUNNING_SUFFIX) as job_file:
+                job = json.load(job_file)
+            _write_json_atomic(
+                job_path + RUNNING_SUFFIX,
+                {**job, "worker": {"pid": os.getpid(), "host": socket.gethostname()}},
+            )
+            movs_df, _ = cumplo_pipeline.run_stages(
+                job["movs_file_path"],
+                job["flows_file_path"],
+                self.cache,
+                job.get("fixdata_csv_path"),
+                self.verbose,
+                registry=self.registry,
+                **job.get("classify", {}),
+            )
+
+            output_path = job_path + RESULT_SUFFIX
+            movs_df.reset_index(drop=True).to_feather(output_path + ".tmp")
+            os.replace(output_path + ".tmp", output_path)
+            status = {
+                "status": "done",
+                "output": output_path,
+                "rows": len(movs_df),
+                "estados": movs_df["Estado"].value_counts().to_dict(),
+            }
+        except Exception as error:  # noqa: BLE001 - reported on the job status instead
+            status = {
+                "status": "failed",
+                "error": repr(error),
+                "traceback": traceback.format_exc(),
+            }
+
+        status = {"job_id": job_id, **status, "seconds": time.perf_counter() - start}
+        _write_json_atomic(job_path + STATUS_SUFFIX, status)
+        os.replace(job_path + RUNNING_SUFFIX, job_path + DONE_SUFFIX)
+        if self.verbose:
+            print(f"Job [{job_id}] {status['status']} in {status['seconds']:.3f} seconds")
+        return status
+
+    def recover_stale_jobs(self, stale_seconds: float = STALE_SECONDS) -> list[str]:
+        """
+        Re-queue the jobs left running by a worker that died.
+
+        Parameters
+        ----------
+        stale_seconds : float, optional
+            Seconds after which a running job is stale when its worker can't be checked; ie:
+            it runs on another host (default is `STALE_SECONDS`).
+
+        Returns
+        -------
+        list[str]
+            The ids of the recovered jobs.
+
+        Description
+        -----------
+        A running job is stale when its worker runs on this host and its pid is gone, or
+        when it was claimed more than `stale_seconds` ago otherwise. Stale jobs are queued
+        again, with their 'attempts' counted; after `MAX_ATTEMPTS` the job is finished as
+        'failed' instead, so a job that kills its worker doesn't kill every worker after it.
+        """
+        recovered = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(RUNNING_SUFFIX):
+                continue
+            job_id = name[: -len(RUNNING_SUFFIX)]
+            job_path = path.join(self.spool_dir, job_id)
+            try:
+                claimed_at = os.stat(job_path + RUNNING_SUFFIX).st_mtime
+                with open(job_path + RUNNING_SUFFIX) as job_file:
+                    job = json.load(job_file)
+            except FileNotFoundError:
+                continue
+            except ValueError:
+                # Not a valid job; queued again, it fails as any other
+                job = {}
+
+            alive = _worker_alive(job.get("worker"))
+            if alive or (alive is None and time.time() - claimed_at < stale_seconds):
+                continue
+
+            # Claimed by renaming, as jobs are; another worker may be recovering it too
+            recovering_path = f"{job_path}{RUNNING_SUFFIX}.{os.getpid()}"
+            try:
+                os.rename(job_path + RUNNING_SUFFIX, recovering_path)
+            except FileNotFoundError:
+                continue
+
+            job.pop("worker", None)
+            job["attempts"] = job.get("attempts", 0) + 1
+            _write_json_atomic(recovering_path, job)
+            if job["attempts"] < MAX_ATTEMPTS:
+                os.replace(recovering_path, job_path + JOB_SUFFIX)
+            else:
+                _write_json_atomic(
+                    job_path + STATUS_SUFFIX,
+                    {
+                        "job_id": job_id,
+                        "status": "failed",
+                        "error": f"The worker died while running it ({job['attempts']} attempts)",
+                    },
+                )
+                os.replace(recovering_path, job_path + DONE_SUFFIX)
+            if self.verbose:
+                print(f"Job [{job_id}] recovered from a dead worker")
+            recovered.append(job_id)
+        return recovered
+
+    def serve(
+        self, poll_interval: float = 1.0, use_inotify: bool = True, max_jobs: int | None = None
+    ) -> None:
+        """
+        Run the queued jobs (after `recover_stale_jobs`), and wait for new ones.
+
+        Parameters
+        ----------
+        poll_interval : float, optional
+            Seconds between spool scans when inotify is not available (default is 1).
+        use_inotify : bool, optional
+            If True (default), wake up as soon as a job is written (when available).
+        max_jobs : int, optional
+            Stop after this many jobs (default is None, run forever).
+        """
+        self.recover_stale_jobs()
+        wait = cumplo_watch._inotify_waiter(self.spool_dir) if use_inotify else None
+
+        jobs = 0
+        while max_jobs is None or jobs < max_jobs:
+            pending = self.pending_jobs()
+            for job_id in pending:
+                if max_jobs is not None and jobs >= max_jobs:
+                    return
+                if self.run_job(job_id) is not None:
+                    jobs += 1
+            if pending:
+                continue
+
+            if wait is not None:
+                wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+
+
+def _worker_alive(worker: dict | None) -> bool | None:
+    # None when it can't be checked: no worker recorded yet, or it runs on another host
+    if worker is None or worker.get("host") != socket.gethostname():
+        return None
+    try:
+        os.kill(worker["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Alive, owned by another user
+        return True
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keep the cumplo sanitizer warm, running the jobs queued on a spool folder"
+    )
+    parser.add_argument("spool_dir", nargs="?", default="./spool/")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--no-inotify", action="store_true", help="Always poll the folder")
+    parser.add_argument("--max-cached-stages", type=int, default=64)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    worker = Worker(args.spool_dir, args.max_cached_stages, args.verbose)
+    worker.warm_up()
+    worker.serve(args.poll_interval, use_inotify=not args.no_inotify)
+
+
+if __name__ == "__main__":
+    main()
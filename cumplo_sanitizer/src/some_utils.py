@@ -1,8 +1,12 @@
 import datetime
 import os
+from collections.abc import Callable
 
 import pandas as pd
 
+# Dtype for text columns; values live on Arrow buffers and `.str` methods run on Arrow kernels
+STRING_DTYPE = "string[pyarrow]"
+
 
 def get_most_recent_filename(dir: str, prefix: str, extension: str) -> str:
     """
@@ -46,7 +50,43 @@ def get_most_recent_filename(dir: str, prefix: str, extension: str) -> str:
         print(f"Directory not found: [{dir}]")
         return None
 
-    file_names = []
+    file_paths = get_matching_filenames(dir, prefix, extension)
+
+    # Check if no files were found
+    if len(file_paths) == 0:
+        print(f"No files found in: [{dir}] with prefix [{prefix}] and extension [{extension}]")
+        return None
+
+    # Sorted by name, so the most recent file is the last one
+    return file_paths[-1]
+
+
+def get_matching_filenames(dir: str, prefix: str, extension: str) -> list[str]:
+    """
+    Get every filename in a directory (and its subdirectories) matching a prefix and
+    extension, oldest first.
+
+    Parameters
+    ----------
+    dir : str
+        The directory in which to search for files.
+    prefix : str
+        The desired prefix of the file name.
+    extension : str
+        The desired file extension (e.g., '.txt').
+
+    Returns
+    -------
+    list[str]
+        The full paths to the matching files, sorted by file name (as exports have their
+        date on the name, oldest first); empty if there are none or `dir` does not exist.
+
+    Examples
+    --------
+    >>> get_matching_filenames("/path/to/directory", "data_", ".csv")
+    ['/path/to/directory/data_20231001.csv', '/path/to/directory/data_20231030.csv']
+    """
+    file_paths = []
 
     for root, _, files in os.walk(dir):
         for file in files:
@@ -55,19 +95,106 @@ def get_most_recent_filename(dir: str, prefix: str, extension: str) -> str:
                 continue
             if not file.endswith(extension):
                 continue
-            file_names.append(file)
+            # Keep the folder where each file was found
+            file_paths.append((file, os.path.join(root, file)))
 
-    # Check if no core_names were added, which means no matching files were found
-    if len(file_names) == 0:
-        print(f"No files found in: [{dir}] with prefix [{prefix}] and extension [{extension}]")
-        return None
+    file_paths.sort()
+    return [file_path for _, file_path in file_paths]
 
-    # Sort the core_names list in reverse order to get the most recent file first
-    file_names.sort(reverse=True)
-    most_recent = file_names[0]
 
-    # Build the full path to the most recent file
-    return os.path.join(root, f"{most_recent}")
+def apply_on_uniques(
+    series: pd.Series, transform: Callable, elementwise: bool = False
+) -> pd.Series | pd.DataFrame:
+    """
+    Apply a transform to the distinct values of a Series, and broadcast the results back.
+
+    Parameters
+    ----------
+    series : pd.Series
+        The (repetitive) values to transform. NA values are transformed as any other value.
+    transform : Callable
+        If `elementwise` is False (default), a vectorized function that takes a Series of
+        distinct values and returns a Series or DataFrame of the same length
+        (ie: `lambda uniques: uniques.str.split().str[-1]`).
+        If `elementwise` is True, a function applied to each distinct value.
+    elementwise : bool, optional
+        Whether `transform` works on single values instead of on a Series (default is False).
+
+    Returns
+    -------
+    pd.Series or pd.DataFrame
+        The transformed values, aligned with the index of `series`.
+
+    Description
+    -----------
+    The Series is factorized into integer codes and its distinct values; the transform only
+    runs over the distinct values, and the results are then taken back by code.
+    On columns like 'Descripción', where thousands of rows share a few hundred values,
+    this turns a row by row transform into a distinct value by distinct value one.
+
+    Examples
+    --------
+    >>> s = pd.Series(['Crédito A 123', 'Crédito A 123', 'Crédito B 456'])
+    >>> apply_on_uniques(s, lambda uniques: uniques.str.split().str[-1])
+    0    123
+    1    123
+    2    456
+    dtype: object
+    >>> apply_on_uniques(s, clean_spanish_characters, elementwise=True)
+    0    credito a 123
+    1    credito a 123
+    2    credito b 456
+    dtype: object
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    uniques = pd.Series(uniques)
+
+    if elementwise:
+        result = uniques.map(transform)
+    else:
+        result = transform(uniques)
+
+    # Broadcast back; every row takes the result of its distinct value
+    result = result.take(codes)
+    result.index = series.index
+    return result
+
+
+def to_string_dtype(df: pd.DataFrame, dtype: str = STRING_DTYPE) -> pd.DataFrame:
+    """
+    Convert the text columns of a DataFrame to a string dtype.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The DataFrame, as read from the exports (text columns are 'object').
+    dtype : str, optional
+        The string dtype to use (default is `STRING_DTYPE`, 'string[pyarrow]').
+
+    Returns
+    -------
+    pd.DataFrame
+        The same DataFrame, where every 'object' column holding only strings (and NAs)
+        uses `dtype`. Other columns are left as they are.
+
+    Description
+    -----------
+    With 'string[pyarrow]' each value takes less memory than a Python object, and methods
+    like `.str.startswith` or `.str.split` run on Arrow compute kernels instead of a Python
+    loop. Missing values become `pd.NA`.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'Descripción': ['Crédito A 123', None], 'Cargo': [1, 2]})
+    >>> to_string_dtype(df).dtypes
+    Descripción    string[pyarrow]
+    Cargo                    int64
+    dtype: object
+    """
+    for column in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[column], skipna=True) in ("string", "empty"):
+            df[column] = df[column].astype(dtype)
+    return df
 
 
 def match_group_and_assign(
@@ -118,7 +245,10 @@ def match_group_and_assign(
     2     LMN 789           LMN
     """
 
-    match_groups = df[source_col].str.strip().str.extract(group_pattern)
+    # Descriptions are very repetitive, so we only run the regex over the distinct values
+    match_groups = apply_on_uniques(
+        df[source_col], lambda uniques: uniques.str.strip().str.extract(group_pattern)
+    )
 
     # We select the first group!
     mask = match_groups[0].notna()
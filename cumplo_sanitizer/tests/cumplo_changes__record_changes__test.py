@@ -0,0 +1,92 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_changes import (
+    CHANGES_DIR_NAME,
+    estado_summary,
+    load_changes,
+    record_changes,
+)
+
+FIRST_RUN = datetime.datetime(2023, 10, 1, 8, 0)
+SECOND_RUN = datetime.datetime(2023, 11, 1, 8, 0)
+
+
+class TestRecordChanges(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.movs_df = pd.DataFrame(
+            {
+                "Fecha": pd.to_datetime(["2023-01-01", "2023-02-01", "2023-03-01", "2023-04-01"]),
+                "Cargo": [1000.0, 0.0, 500.0, 200.0],
+                "Abono": [0.0, 1100.0, 0.0, 0.0],
+                "RemateID": ["20932", "20932", "15572", "21033"],
+                "Estado": ["Completed", "Completed", "Active", "Active"],
+            }
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_summary(self):
+        """Test one row per investment, with its balance and date range"""
+        summary = estado_summary(self.movs_df).set_index("RemateID")
+        self.assertEqual(summary.loc["20932", "net"], 100.0)
+        self.assertEqual(summary.loc["20932", "first_seen"], pd.Timestamp("2023-01-01"))
+        self.assertEqual(summary.loc["20932", "last_seen"], pd.Timestamp("2023-02-01"))
+        self.assertEqual(summary.index.tolist(), ["15572", "20932", "21033"])
+
+    def test_consecutive_runs(self):
+        """Test that only the investments that changed are appended to the feed"""
+        # The first run only seeds the summary
+        self.assertTrue(record_changes(self.movs_df, self.tmp_dir.name, run_at=FIRST_RUN).empty)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, CHANGES_DIR_NAME)))
+
+        # Unchanged output (up to the rounding of the sums), nothing to append
+        movs_df = self.movs_df.assign(Abono=self.movs_df["Abono"] + 1e-9)
+        self.assertTrue(record_changes(movs_df, self.tmp_dir.name).empty)
+
+        movs_df = pd.concat(
+            [
+                self.movs_df,
+                pd.DataFrame(
+                    {
+                        "Fecha": pd.to_datetime(["2023-10-15", "2023-10-20"]),
+                        "Cargo": [0.0, 300.0],
+                        "Abono": [100.0, 0.0],
+                        "RemateID": ["15572", "30000"],
+                        "Estado": ["Active", "Active"],
+                    }
+                ),
+            ],
+            ignore_index=True,
+        )
+        movs_df.loc[movs_df["RemateID"] == "21033", "Estado"] = "Uncollectible"
+        movs_df = movs_df[movs_df["RemateID"] != "20932"]
+        second = record_changes(movs_df, self.tmp_dir.name, run_at=SECOND_RUN).set_index("RemateID")
+
+        self.assertEqual(second.index.tolist(), ["15572", "20932", "21033", "30000"])
+        self.assertAlmostEqual(second.loc["15572", "net_delta"], 100.0)
+        self.assertEqual(second.loc["15572", "last_seen"], pd.Timestamp("2023-10-15"))
+        self.assertEqual(second.loc["15572", "new_estado"], "Active")
+        self.assertTrue(pd.isna(second.loc["20932", "new_estado"]))
+        self.assertAlmostEqual(second.loc["20932", "net_delta"], -100.0)
+        self.assertEqual(
+            second.loc["21033", ["old_estado", "new_estado"]].tolist(), ["Active", "Uncollectible"]
+        )
+        self.assertTrue(pd.isna(second.loc["30000", "old_estado"]))
+
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp_dir.name, CHANGES_DIR_NAME))), 1)
+        feed = load_changes(self.tmp_dir.name)
+        self.assertEqual(len(feed), 4)
+        self.assertEqual(feed["run_at"].iloc[-1], pd.Timestamp(SECOND_RUN))
+
+        uncollectible = load_changes(
+            self.tmp_dir.name, since=SECOND_RUN, new_estados=["Uncollectible"]
+        )
+        self.assertEqual(uncollectible["RemateID"].tolist(), ["21033"])
+        self.assertTrue(load_changes(self.tmp_dir.name, since=datetime.datetime(2024, 1, 1)).empty)
@@ -0,0 +1,85 @@
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_core import (
+    detect_missing_movements,
+    extract_flow_schedule,
+    fix_candidates,
+)
+
+PATH = "./cumplo_sanitizer/tests/flujo_files/"
+
+
+def _movs(rows: list[tuple]) -> pd.DataFrame:
+    movs = pd.DataFrame(rows, columns=["RemateID", "Fecha", "Cargo", "Abono"])
+    movs["Fecha"] = pd.to_datetime(movs["Fecha"])
+    movs["Actor"] = "corto plazo ii"
+    return movs
+
+
+class TestDetectMissingMovements(unittest.TestCase):
+    def setUp(self):
+        # 20932: 25000 late paid on 2023-07-01 and 2023-08-01, 50000 paid on time on 2023-09-01
+        path_to_file = PATH + "Resumen de flujos_id_[20932]_late_and_ok.xlsx"
+        self.flow_schedule = extract_flow_schedule(path_to_file)
+
+    def test_all_payments_registered(self):
+        """Test that nothing is reported when every paid flow has its movement"""
+        movs = _movs(
+            [
+                ("20932", "2023-06-01", 100000, 0),
+                ("20932", "2023-07-10", 0, 25000),
+                ("20932", "2023-08-12", 0, 25000),
+                ("20932", "2023-09-01", 0, 50000),
+            ]
+        )
+        issues = detect_missing_movements(movs, self.flow_schedule)
+        self.assertEqual(len(issues), 0)
+
+    def test_collapsed_payment(self):
+        """Test a late payment registered together with the next one"""
+        movs = _movs(
+            [
+                ("20932", "2023-06-01", 100000, 0),
+                ("20932", "2023-07-10", 0, 25000),
+                ("20932", "2023-09-01", 0, 50000),
+            ]
+        )
+        issues = detect_missing_movements(movs, self.flow_schedule)
+        self.assertEqual(len(issues), 1)
+        issue = issues.iloc[0]
+        self.assertEqual(issue["Fecha"], pd.Timestamp("2023-09-01"))
+        self.assertEqual(issue["expected_amount"], 75000)
+        self.assertEqual(issue["paid_amount"], 50000)
+        self.assertEqual(issue["missing_amount"], 25000)
+        self.assertTrue(issue["amount_mismatch"])
+        self.assertTrue(issue["count_mismatch"])
+
+        candidates = fix_candidates(issues)
+        self.assertEqual(
+            candidates.values.tolist(), [["20932", "corto plazo ii", "2023-09-01", 25000, 0]]
+        )
+
+    def test_missing_payment(self):
+        """Test paid flows without any movement, reported on their due date"""
+        movs = _movs([("20932", "2023-06-01", 100000, 0)])
+        issues = detect_missing_movements(movs, self.flow_schedule, max_delay_days=15)
+        self.assertEqual(
+            issues["Fecha"].tolist(),
+            [pd.Timestamp("2023-07-01"), pd.Timestamp("2023-08-01"), pd.Timestamp("2023-09-01")],
+        )
+        self.assertEqual(fix_candidates(issues)["Abono"].tolist(), [25000, 25000, 50000])
+
+    def test_late_paid_without_amount(self):
+        """Test that late paid cells without amount are only checked by count"""
+        # 21022: 100000 paid on time on 2023-07-01, and a late paid cell without amount
+        movs = _movs(
+            [
+                ("21022", "2023-07-01", 0, 100000),
+                ("21022", "2023-08-03", 0, 2000),
+            ]
+        )
+        flow_schedule = extract_flow_schedule(PATH + "Resumen de flujos_6completed.xlsx")
+        issues = detect_missing_movements(movs, flow_schedule)
+        self.assertNotIn("21022", issues["RemateID"].tolist())
@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_core import extract_flow_schedule, ids_from_flow_schedule
+from cumplo_sanitizer.src.cumplo_storage import load_flow_schedule, save_flow_schedule
+
+PATH = "./cumplo_sanitizer/tests/flujo_files/"
+
+
+class TestExtractFlowSchedule(unittest.TestCase):
+    def test_extract_id_15572(self):
+        """Test one row per flow, with its due date, amount and status"""
+        flow_schedule = extract_flow_schedule(
+            PATH + "Resumen de flujos_id_15572_ok_but_then_not_paid.xlsx"
+        )
+        expected = pd.DataFrame(
+            {
+                "RemateID": ["15572"] * 4,
+                "due_date": pd.to_datetime(
+                    ["2023-05-01", "2023-06-01", "2023-07-01", "2023-08-01"]
+                ),
+                "amount": [25000.0] * 4,
+                "status": ["on-time", "pending", "pending", "pending"],
+            }
+        )
+        pd.testing.assert_frame_equal(flow_schedule, expected)
+
+    def test_extract_all_statuses(self):
+        """Test the statuses of a sheet with several investments"""
+        flow_schedule = extract_flow_schedule(PATH + "Resumen de flujos_4completed_2active.xlsx")
+        self.assertEqual(
+            flow_schedule.groupby("status").size().to_dict(),
+            {"future": 2, "late-paid": 1, "on-time": 4},
+        )
+        # The late paid cell has no amount
+        late_paid = flow_schedule[flow_schedule["status"] == "late-paid"]
+        self.assertEqual(late_paid["RemateID"].tolist(), ["21022"])
+        self.assertTrue(late_paid["amount"].isna().all())
+
+    @patch("cumplo_sanitizer.src.cumplo_core.some_utils.is_date_past_grace_period")
+    def test_ids_from_flow_schedule(self, mock_is_date_past_grace_period):
+        """Test that the grace period is checked once per distinct pending due date"""
+        mock_is_date_past_grace_period.side_effect = lambda _, date: date.month == 6
+        flow_schedule = extract_flow_schedule(
+            PATH + "Resumen de flujos_6_not_paid_but_collectible.xlsx"
+        )
+        all_ids, active_ids, late_ids, uncollectible_ids = ids_from_flow_schedule(flow_schedule, 60)
+        self.assertEqual(mock_is_date_past_grace_period.call_count, 3)
+        self.assertCountEqual(all_ids, ["15572", "15731", "20932", "20970", "21022", "21033"])
+        self.assertCountEqual(active_ids, [])
+        self.assertCountEqual(late_ids, ["15572", "15731", "20932", "20970", "21022", "21033"])
+        self.assertCountEqual(uncollectible_ids, ["15572", "20970"])
+
+    def test_save_and_load_flow_schedule(self):
+        """Test that the schedule is stored as arrow and read back unchanged"""
+        flow_schedule = extract_flow_schedule(PATH + "Resumen de flujos_6active.xlsx")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_flow_schedule(flow_schedule, tmp_dir)
+            pd.testing.assert_frame_equal(load_flow_schedule(tmp_dir), flow_schedule)
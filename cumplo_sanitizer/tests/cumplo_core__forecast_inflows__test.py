@@ -0,0 +1,71 @@
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_core import (
+    expected_inflows,
+    extract_flow_schedule,
+    forecast_inflows,
+)
+
+FLOWS_FILE_PATH = "./cumplo_sanitizer/tests/flujo_files/Resumen de flujos_6active.xlsx"
+
+
+def schedule(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["RemateID", "due_date", "amount", "status"]).assign(
+        due_date=lambda df: pd.to_datetime(df["due_date"])
+    )
+
+
+FLOW_SCHEDULE = schedule(
+    [
+        ("20932", "2023-10-05", 100.0, "on-time"),
+        ("20932", "2023-11-05", 100.0, "future"),
+        ("20932", "2023-12-05", 100.0, "future"),
+        # Late; a pending flow, and future ones
+        ("15572", "2023-09-20", 50.0, "pending"),
+        ("15572", "2023-11-20", 50.0, "future"),
+        ("15572", "2023-12-20", float("nan"), "future"),
+        ("21033", "2023-11-06", 200.0, "future"),
+    ]
+)
+
+
+class TestForecastInflows(unittest.TestCase):
+    def test_expected_inflows(self):
+        """Test one row per future flow with amount, with the haircut on late investments"""
+        inflows = expected_inflows(FLOW_SCHEDULE, late_haircut=0.4)
+        self.assertEqual(inflows["RemateID"].tolist(), ["20932", "21033", "15572", "20932"])
+        self.assertEqual(inflows["late"].tolist(), [False, False, True, False])
+        self.assertEqual(inflows["expected"].tolist(), [100.0, 200.0, 30.0, 100.0])
+
+        with self.assertRaises(ValueError):
+            expected_inflows(FLOW_SCHEDULE, late_haircut=1.5)
+
+    def test_by_month_and_actor(self):
+        """Test the monthly forecast, split by Actor"""
+        actors = pd.Series({"20932": "acme", "15572": "beta", "21033": "acme"})
+        forecast = forecast_inflows(FLOW_SCHEDULE, actors=actors, late_haircut=1.0)
+        forecast = forecast.set_index(["period", "Actor"])
+
+        november = forecast.loc[(pd.Timestamp("2023-11-01"), "acme")]
+        self.assertEqual(november["investments"], 2)
+        self.assertEqual(november["amount"], 300.0)
+        beta = forecast.loc[(pd.Timestamp("2023-11-01"), "beta")]
+        self.assertEqual(beta[["amount", "late_amount", "expected"]].tolist(), [50.0, 50.0, 0.0])
+        self.assertEqual(len(forecast), 3)
+
+    def test_by_week(self):
+        """Test weekly periods, starting on Monday"""
+        forecast = forecast_inflows(FLOW_SCHEDULE, "week")
+        self.assertTrue((forecast["period"].dt.dayofweek == 0).all())
+        self.assertEqual(forecast["expected"].sum(), 450.0)
+
+        with self.assertRaises(ValueError):
+            forecast_inflows(FLOW_SCHEDULE, "day")
+
+    def test_from_export(self):
+        """Test that the forecast adds up the gray cells of a flows export"""
+        flow_schedule = extract_flow_schedule(FLOWS_FILE_PATH)
+        future = flow_schedule[flow_schedule["status"] == "future"]
+        self.assertEqual(forecast_inflows(flow_schedule)["amount"].sum(), future["amount"].sum())
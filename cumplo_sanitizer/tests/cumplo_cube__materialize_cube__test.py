@@ -0,0 +1,144 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_cube
+from cumplo_sanitizer.src.cumplo_cube import build_cube, load_cube, materialize_cube, rollup
+
+
+def movements(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(
+        rows, columns=["Fecha", "RemateID", "Actor", "Tipo", "Estado", "Cargo", "Abono"]
+    ).assign(Fecha=lambda df: pd.to_datetime(df["Fecha"]))
+
+
+FIRST_RUN = movements(
+    [
+        ("2022-11-03", "100", "acme", "Inversión", "Active", 1000.0, 0.0),
+        ("2022-12-03", "100", "acme", "Pago", "Active", 0.0, 400.0),
+        ("2023-01-03", "100", "acme", "Pago", "Active", 0.0, 400.0),
+        ("2023-01-10", "200", "beta", "Inversión", "Completed", 500.0, 0.0),
+        ("2023-01-25", "200", "beta", "Pago", "Completed", 0.0, 550.0),
+        ("2013-05-05", None, "old one", "Inversión", "Completed", 50.0, 0.0),
+    ]
+)
+
+
+class TestMaterializeCube(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_build(self):
+        """Test the cells, vintages and measures of the cube"""
+        cube = build_cube(FIRST_RUN)
+        self.assertEqual(len(cube), 6)
+        self.assertEqual(cube["movements"].sum(), len(FIRST_RUN))
+
+        acme = cube[cube["Actor"] == "acme"]
+        self.assertEqual(acme["vintage"].unique().tolist(), [2022])
+        self.assertEqual(acme["net"].sum(), -200.0)
+        self.assertEqual(cube.loc[cube["Actor"] == "old one", "vintage"].tolist(), [2013])
+
+    def test_incremental_update(self):
+        """Test that updating with new months and reclassified investments gives a full build"""
+        materialize_cube(FIRST_RUN, self.tmp_dir.name)
+
+        second_run = pd.concat(
+            [
+                FIRST_RUN,
+                movements(
+                    [
+                        ("2023-02-03", "100", "acme", "Pago", "Active", 0.0, 100.0),
+                        ("2023-02-05", "300", "gamma", "Inversión", "Active", 700.0, 0.0),
+                        # A late fix on a closed month
+                        ("2022-12-20", "200", "beta", "Fix", "Completed", 0.0, 10.0),
+                    ]
+                ),
+            ],
+            ignore_index=True,
+        )
+        second_run.loc[second_run["RemateID"] == "100", "Estado"] = "Uncollectible"
+        cube = materialize_cube(second_run, self.tmp_dir.name)
+
+        pd.testing.assert_frame_equal(cube, build_cube(second_run))
+        pd.testing.assert_frame_equal(load_cube(self.tmp_dir.name), cube)
+        self.assertEqual(
+            cube.loc[cube["Actor"] == "acme", "Estado"].unique().tolist(), ["Uncollectible"]
+        )
+
+    def test_update_other_dimensions(self):
+        """Test updates when an Actor is renamed, or a movement goes to another investment"""
+        first_run = pd.concat(
+            [
+                FIRST_RUN,
+                movements([("2023-01-15", "300", "gamma", None, "Active", 100.0, 0.0)]),
+            ],
+            ignore_index=True,
+        )
+        materialize_cube(first_run, self.tmp_dir.name)
+
+        # Same month totals, but other cells
+        second_run = first_run.copy()
+        second_run["Actor"] = second_run["Actor"].replace({"acme": "acme spa"})
+        second_run.loc[3, ["RemateID", "Actor", "Estado"]] = ["100", "acme spa", "Active"]
+        cube = materialize_cube(second_run, self.tmp_dir.name)
+
+        self.assertTrue(cube.equals(build_cube(second_run)))
+        self.assertNotIn("acme", cube["Actor"].tolist())
+        january = cube[(cube["month"] == "2023-01-01") & (cube["Tipo"] == "Inversión")]
+        self.assertEqual(january[["Actor", "invested"]].values.tolist(), [["acme spa", 500.0]])
+
+        # And back, with nothing changed on the third run
+        cube = materialize_cube(first_run, self.tmp_dir.name)
+        self.assertTrue(cube.equals(build_cube(first_run)))
+        cube = materialize_cube(first_run, self.tmp_dir.name)
+        self.assertTrue(cube.equals(build_cube(first_run)))
+
+    def test_only_changed_months(self):
+        """Test that only the movements of changed months are aggregated again"""
+        materialize_cube(FIRST_RUN, self.tmp_dir.name)
+
+        second_run = pd.concat(
+            [
+                FIRST_RUN,
+                movements([("2023-02-03", "100", "acme", "Pago", "Active", 0.0, 100.0)]),
+            ],
+            ignore_index=True,
+        )
+        # Sums in another order, under the tolerance
+        second_run.loc[0, "Cargo"] += 1e-9
+        with mock.patch.object(cumplo_cube, "_prepare", wraps=cumplo_cube._prepare) as prepare:
+            cube = materialize_cube(second_run, self.tmp_dir.name)
+        (rows, months, _), _ = prepare.call_args
+        self.assertEqual(months.unique().tolist(), [pd.Timestamp("2023-02-01")])
+        self.assertEqual(len(rows), 1)
+        pd.testing.assert_frame_equal(cube, build_cube(second_run))
+
+        # Nothing to aggregate when nothing changed
+        with mock.patch.object(cumplo_cube, "_prepare", wraps=cumplo_cube._prepare) as prepare:
+            materialize_cube(second_run.sample(frac=1, random_state=0), self.tmp_dir.name)
+        (rows, _, _), _ = prepare.call_args
+        self.assertEqual(len(rows), 0)
+
+    def test_rollup(self):
+        """Test roll-ups to coarser periods and dimensions"""
+        cube = build_cube(FIRST_RUN)
+        by_year = rollup(cube, ["Estado"], period="year").set_index(["period", "Estado"])
+        self.assertEqual(by_year.loc[(pd.Timestamp("2023-01-01"), "Completed"), "net"], 50.0)
+        self.assertEqual(by_year.loc[(pd.Timestamp("2023-01-01"), "Active"), "returned"], 400.0)
+
+        by_vintage = rollup(cube, ["vintage"], period=None).set_index("vintage")
+        self.assertEqual(by_vintage.loc[2022, "movements"], 3)
+
+        total = rollup(cube, period=None)
+        self.assertEqual(total["invested"].iloc[0], 1550.0)
+
+        with self.assertRaises(ValueError):
+            rollup(cube, ["RemateID"])
+        with self.assertRaises(ValueError):
+            rollup(cube, period="week")
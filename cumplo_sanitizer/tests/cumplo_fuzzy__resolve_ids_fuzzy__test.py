@@ -0,0 +1,116 @@
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_fuzzy import (
+    match_solicitudes,
+    resolve_ids_fuzzy,
+    similarity,
+    tokenize,
+)
+from cumplo_sanitizer.src.cumplo_pipeline import filter_movements, load_flows, sanitize
+from cumplo_sanitizer.src.some_utils import STRING_DTYPE
+
+FLOWS_FILE_PATH = "./cumplo_sanitizer/tests/flujo_files/Resumen de flujos_4completed_2active.xlsx"
+
+
+class TestResolveIdsFuzzy(unittest.TestCase):
+    def setUp(self):
+        self.flows_df = pd.DataFrame(
+            {
+                "ID": ["23028", "15572", "15573", "20000"],
+                "Solicitud": [
+                    "Crédito Más Ingenieria 23028",
+                    "Crédito Pyme Sur 15572",
+                    "Crédito Pyme Norte 15573",
+                    "Capital de trabajo Linea Comex",
+                ],
+            },
+            dtype=STRING_DTYPE,
+        )
+        self.movs_df = pd.DataFrame(
+            {
+                "Solicitud": [
+                    "Credito Mas Ingeneria",
+                    "Credito Mas Ingeneria",
+                    "Crédito Pyme",
+                    "Capital de trabajo Linea Comex.",
+                    "Financiamiento febrero",
+                    None,
+                    "Crédito Kio Solutions 99999",
+                ],
+                "RemateID": [None, None, None, None, None, None, "99999"],
+            },
+            dtype=STRING_DTYPE,
+        )
+
+    def test_similarity(self):
+        """Test normalisation, contained 'Solicitud's and typos"""
+        self.assertEqual(
+            tokenize("Crédito Más Ingeniería, 23028"), ["credito", "mas", "ingenieria", "23028"]
+        )
+        self.assertEqual(
+            similarity(
+                tokenize("Credito MAS ingenieria"), tokenize("Crédito Más Ingenieria 23028")
+            ),
+            1.0,
+        )
+        self.assertGreater(
+            similarity(tokenize("Credito Mas Ingeneria"), tokenize("Credito Mas Ingenieria 23028")),
+            0.85,
+        )
+        self.assertLess(
+            similarity(tokenize("Credito Mas Ingeneria"), tokenize("Credito Pyme Sur 15572")), 0.85
+        )
+
+    def test_generic_solicitud(self):
+        """Test that a generic one-word 'Solicitud' is not matched to the flows containing it"""
+        for solicitud in ["Crédito", "Capital", "Kio"]:
+            with self.subTest(solicitud=solicitud):
+                self.assertLess(
+                    similarity(tokenize(solicitud), tokenize("Crédito Kio Capital 99999")), 0.85
+                )
+        report = match_solicitudes(["Crédito", "Capital"], self.flows_df)
+        self.assertTrue(report["RemateID"].isna().all())
+
+    def test_resolve(self):
+        """Test that confident matches are assigned, and the rest reported"""
+        movs_df, report = resolve_ids_fuzzy(self.movs_df.copy(), self.flows_df, verbose=False)
+        self.assertEqual(
+            movs_df["RemateID"].tolist(),
+            ["23028", "23028", pd.NA, "20000", pd.NA, pd.NA, "99999"],
+        )
+
+        report = report.set_index("Solicitud")
+        self.assertEqual(report.loc["Credito Mas Ingeneria", "rows"], 2)
+        # Ambiguous; both 'Pyme' flows contain it
+        self.assertTrue(pd.isna(report.loc["Crédito Pyme", "RemateID"]))
+        self.assertEqual(
+            [candidate[0] for candidate in report.loc["Crédito Pyme", "candidates"][:2]],
+            ["15572", "15573"],
+        )
+        self.assertEqual(report.loc["Financiamiento febrero", "candidates"], [])
+
+    def test_blocking(self):
+        """Test that flows without a shared word (or word prefix) are never compared"""
+        report = match_solicitudes(["Capital de trabajo"], self.flows_df)
+        self.assertEqual([candidate[0] for candidate in report.loc[0, "candidates"]], ["20000"])
+
+    def test_sanitize(self):
+        """Test that sanitize only runs the fallback when a threshold is given"""
+        flows_df = load_flows(FLOWS_FILE_PATH)
+        solicitud = flows_df["Solicitud"].iloc[0]
+        movs_df = pd.DataFrame(
+            {
+                "Fecha": pd.to_datetime(["2023-04-02"]),
+                "Descripción": [f"Inversión, solicitud: {solicitud.upper()}."],
+                "Cargo": [100000],
+                "Abono": [0],
+            }
+        )
+        exact = sanitize(filter_movements(movs_df.copy()), flows_df, verbose=False)
+        fuzzy = sanitize(
+            filter_movements(movs_df.copy()), flows_df, verbose=False, fuzzy_threshold=0.85
+        )
+        self.assertNotEqual(exact["RemateID"].iloc[0], flows_df["ID"].iloc[0])
+        self.assertEqual(fuzzy["RemateID"].iloc[0], flows_df["ID"].iloc[0])
@@ -0,0 +1,84 @@
+import datetime
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_core import extract_flow_schedule
+from cumplo_sanitizer.src.cumplo_history import classify_as_of, flow_payment_days
+from cumplo_sanitizer.src.cumplo_sweep import classify_summary, investment_summary
+
+PATH = "./cumplo_sanitizer/tests/flujo_files/"
+
+
+def _movs(rows: list[tuple]) -> pd.DataFrame:
+    movs = pd.DataFrame(rows, columns=["RemateID", "Fecha", "Cargo", "Abono"])
+    movs["Fecha"] = pd.to_datetime(movs["Fecha"])
+    movs["Descripción"] = "Pago de inversión, solicitud: Crédito " + movs["RemateID"]
+    return movs
+
+
+class TestClassifyAsOf(unittest.TestCase):
+    def setUp(self):
+        # 15572: 25000 paid on time on 2023-05-01, then 3 pending flows from 2023-06-01
+        self.not_paid_schedule = extract_flow_schedule(
+            PATH + "Resumen de flujos_id_15572_ok_but_then_not_paid.xlsx"
+        )
+        self.not_paid_movs = _movs(
+            [
+                ("15572", "2023-04-01", 100000, 0),
+                ("15572", "2023-05-02", 0, 25000),
+            ]
+        )
+        # 20932: 25000 late paid on 2023-07-01 and 2023-08-01, 50000 paid on time on 2023-09-01
+        self.late_schedule = extract_flow_schedule(
+            PATH + "Resumen de flujos_id_[20932]_late_and_ok.xlsx"
+        )
+        self.late_movs = _movs(
+            [
+                ("20932", "2023-06-01", 100000, 0),
+                ("20932", "2023-07-10", 0, 25000),
+                ("20932", "2023-08-12", 0, 25000),
+                ("20932", "2023-09-01", 0, 55000),
+            ]
+        )
+
+    def _estados(self, history: pd.DataFrame, remate_id: str) -> dict:
+        history = history[history["RemateID"] == remate_id]
+        return dict(zip(history["as_of"].dt.strftime("%Y-%m-%d"), history["Estado"]))
+
+    def test_history(self):
+        """Test the Estado of an investment that stopped paying, month by month"""
+        dates = ["2023-03-31", "2023-04-15", "2023-06-15", "2023-09-15"]
+        history = classify_as_of(self.not_paid_movs, self.not_paid_schedule, dates)
+        self.assertEqual(
+            self._estados(history, "15572"),
+            {"2023-04-15": "Active", "2023-06-15": "Active", "2023-09-15": "Uncollectible"},
+        )
+        amounts = history.set_index("as_of").loc["2023-06-15"]
+        self.assertEqual((amounts["cost"], amounts["earnings"]), (100000, 25000))
+
+    def test_late_paid_flows(self):
+        """Test that late paid flows are pending until their payment"""
+        dates = ["2023-07-05", "2023-07-15", "2023-09-30"]
+        history = classify_as_of(self.late_movs, self.late_schedule, dates, grace_period_days=2)
+        self.assertEqual(
+            self._estados(history, "20932"),
+            {"2023-07-05": "Uncollectible", "2023-07-15": "Active", "2023-09-30": "Completed"},
+        )
+
+    def test_flow_payment_days(self):
+        """Test the estimated payment dates"""
+        paid = flow_payment_days(self.late_movs, self.late_schedule)
+        self.assertEqual(
+            paid.dt.strftime("%Y-%m-%d").tolist(), ["2023-07-10", "2023-08-12", "2023-09-01"]
+        )
+
+    def test_today_matches_summary(self):
+        """Test that a snapshot as of today matches the current classification"""
+        movs = pd.concat([self.not_paid_movs, self.late_movs], ignore_index=True)
+        schedule = pd.concat([self.not_paid_schedule, self.late_schedule], ignore_index=True)
+        today = datetime.datetime.now().date()
+
+        history = classify_as_of(movs, schedule, [today])
+        expected = classify_summary(investment_summary(movs, schedule, as_of=today))
+        self.assertEqual(dict(zip(history["RemateID"], history["Estado"])), expected.to_dict())
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_ids import MISSING_CODE, RemateIDRegistry
+from cumplo_sanitizer.src.some_utils import STRING_DTYPE
+
+
+class TestRemateIDRegistry(unittest.TestCase):
+    def setUp(self):
+        self.movs_ids = pd.Series(
+            ["21033", "15572", None, "green logistic", "21033", "007"], dtype=STRING_DTYPE
+        )
+        self.flow_ids = ["15572", "99999"]
+        self.registry = RemateIDRegistry.from_ids(self.movs_ids, self.flow_ids)
+
+    def test_codes(self):
+        """Test dense codes; numeric ids first, sorted by value, then the legacy ones"""
+        self.assertEqual(len(self.registry), 5)
+        self.assertEqual(self.registry.numeric_ids.tolist(), [15572, 21033, 99999])
+        codes = self.registry.encode(self.movs_ids)
+        self.assertEqual(codes.dtype, np.int32)
+        self.assertEqual(codes.tolist(), [1, 0, MISSING_CODE, 4, 1, 3])
+
+    def test_legacy_side_table(self):
+        """Test that non-numeric (and not canonical numeric) ids are on the side table"""
+        legacy = self.registry.legacy
+        self.assertEqual(legacy["RemateID"].tolist(), ["007", "green logistic"])
+        self.assertEqual(legacy["code"].tolist(), [3, 4])
+
+    def test_round_trip(self):
+        """Test that decoding gives back the original ids"""
+        decoded = self.registry.decode(self.registry.encode(self.movs_ids))
+        self.assertEqual(decoded.dtype, STRING_DTYPE)
+        pd.testing.assert_series_equal(pd.Series(decoded), self.movs_ids)
+
+    def test_unknown_ids(self):
+        """Test that ids not in the registry (and sets of ids) are encoded"""
+        codes = self.registry.encode({"99999", "12345"})
+        self.assertEqual(sorted(codes.tolist()), [MISSING_CODE, 2])
+
+    def test_encode_adding(self):
+        """Test that only new ids extend the registry, and the codes agree with a fresh one"""
+        lookup = self.registry._lookup
+        codes, flow_codes = self.registry.encode_adding(self.movs_ids, self.flow_ids)
+        self.assertIs(self.registry._lookup, lookup)
+        self.assertEqual(codes.dtype, np.int32)
+        self.assertEqual(codes.tolist(), [1, 0, MISSING_CODE, 4, 1, 3])
+        self.assertEqual(flow_codes.tolist(), [0, 2])
+
+        new_ids = ["15572", "20000", None, "kio solutions"]
+        codes, _ = self.registry.encode_adding(new_ids, self.flow_ids)
+        expected = RemateIDRegistry.from_ids(self.movs_ids, self.flow_ids, new_ids)
+        self.assertEqual(codes.tolist(), expected.encode(new_ids).tolist())
+        self.assertEqual(self.registry.decode(codes).tolist(), [*new_ids[:2], pd.NA, new_ids[3]])
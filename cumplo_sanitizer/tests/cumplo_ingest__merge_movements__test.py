@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_pipeline, some_utils
+from cumplo_sanitizer.src.cumplo_ingest import (
+    iter_merged_chunks,
+    load_merged_movements,
+    load_streamed,
+    merge_movements,
+    stream_movements,
+)
+
+
+def _movement(fecha: str, descripcion: str, cargo, abono) -> dict:
+    return {
+        "Fecha": pd.Timestamp(fecha),
+        "Descripción": descripcion,
+        "Cargo": cargo,
+        "Abono": abono,
+    }
+
+
+INVESTMENT = _movement(
+    "2023-02-01", "Inversión, solicitud: Crédito Kio Solutions 99999", 50000, None
+)
+
+# January and February
+FIRST_RANGE = [
+    _movement("2023-01-10", "Inversión, solicitud: Crédito NotebookCenter 88888", 100000, None),
+    _movement("2023-01-15", "Abono a Saldo Cumplo", None, 500000),
+    INVESTMENT,
+    _movement(
+        "2023-02-05", "Pago de inversión, solicitud: Crédito NotebookCenter 88888", None, 5000
+    ),
+]
+
+# February (overlapping) and March; the same investment twice on the same day
+SECOND_RANGE = [
+    INVESTMENT,
+    INVESTMENT,
+    _movement(
+        "2023-02-05", "Pago de inversión, solicitud: Crédito NotebookCenter 88888", None, 5000
+    ),
+    _movement(
+        "2023-03-01", "Pago de inversión, solicitud: Crédito Kio Solutions 99999", None, 9000
+    ),
+]
+
+
+def merged_rows(movs_file_paths: list[str], chunk_size: int = 100) -> list[tuple]:
+    return [
+        (index, row)
+        for chunk in iter_merged_chunks(movs_file_paths, chunk_size)
+        for index, row in chunk.to_dict("index").items()
+    ]
+
+
+class TestMergeMovements(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.movs_file_paths = []
+        for name, movements in [("2023-02-28", FIRST_RANGE), ("2023-03-31", SECOND_RANGE)]:
+            file_path = os.path.join(self.folder.name, f"Resumen de movimientos - {name}.xlsx")
+            pd.DataFrame(movements).to_excel(file_path, index=False)
+            self.movs_file_paths.append(file_path)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_overlapping_exports(self):
+        """Test that movements on both exports are kept once, but same-day repeats survive"""
+        for chunk_size in [1, 2, 3, 100]:
+            with self.subTest(chunk_size=chunk_size):
+                rows = merged_rows(self.movs_file_paths, chunk_size)
+                self.assertEqual([index for index, _ in rows], list(range(6)))
+                descriptions = [row["Descripción"] for _, row in rows]
+                self.assertEqual(descriptions.count(INVESTMENT["Descripción"]), 2)
+                self.assertEqual([row["Abono"] for _, row in rows].count(5000), 1)
+
+        # Each export is kept as it is, no matter the order
+        self.assertEqual(len(merged_rows(self.movs_file_paths[::-1])), 6)
+        self.assertEqual(len(merged_rows([self.movs_file_paths[1]] * 2)), len(SECOND_RANGE))
+
+    def test_same_as_single_export(self):
+        """Test that the merged output is the one of an export with every movement"""
+        single_file_path = os.path.join(self.folder.name, "single.xlsx")
+        pd.DataFrame(FIRST_RANGE + [INVESTMENT] + SECOND_RANGE[-1:]).to_excel(
+            single_file_path, index=False
+        )
+
+        output_path = os.path.join(self.folder.name, "movements.arrow")
+        expected = load_streamed(stream_movements(single_file_path, output_path))
+        merged = load_streamed(merge_movements(self.movs_file_paths, output_path))
+        pd.testing.assert_frame_equal(merged, expected)
+
+        movs_df = load_merged_movements(self.movs_file_paths)
+        self.assertEqual(movs_df.index.tolist(), expected.index.tolist())
+        self.assertEqual(movs_df["Descripción"].dtype, some_utils.STRING_DTYPE)
+
+    def test_load_exports(self):
+        """Test that the pipeline takes every movements export on a folder"""
+        movs_file_paths = some_utils.get_matching_filenames(
+            self.folder.name, "Resumen de movimientos - ", "xlsx"
+        )
+        self.assertEqual(movs_file_paths, self.movs_file_paths)
+
+        flows_file_path = "./cumplo_sanitizer/tests/flujo_files/Resumen de flujos_6active.xlsx"
+        movs_df, _, _ = cumplo_pipeline.load_exports(movs_file_paths, flows_file_path)
+        self.assertEqual(movs_df["Abono"].sum(), 14000)
+
+        with self.assertRaises(ValueError):
+            cumplo_pipeline.load_exports([], flows_file_path)
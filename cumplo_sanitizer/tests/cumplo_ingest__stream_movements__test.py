@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_pipeline
+from cumplo_sanitizer.src.cumplo_ingest import (
+    iter_movement_chunks,
+    load_streamed,
+    stream_movements,
+)
+
+
+def _movement(fecha: str, descripcion: str, cargo, abono) -> dict:
+    return {
+        "Fecha": pd.Timestamp(fecha),
+        "Descripción": descripcion,
+        "Cargo": cargo,
+        "Abono": abono,
+    }
+
+
+MOVEMENTS = [
+    _movement("2023-04-01", "Abono a Saldo Cumplo", None, 500000),
+    _movement("2023-04-02", "Inversión, solicitud: Crédito NotebookCenter", 100000, None),
+    _movement("2023-04-03", "Retiro de saldo Cumplo", 3000, None),
+    _movement("2023-04-04", "Inversión, solicitud: Crédito Kio Solutions 99999", 50000, None),
+    _movement(
+        "2023-04-05", "Pago de inversión, solicitud: Crédito Kio Solutions 99999", None, 49500
+    ),
+    _movement("2023-04-06", "Comisión sin monto", None, None),
+    _movement("2013-04-05", "Inversión, solicitud: Credito Green Logistic", 10000, None),
+]
+
+
+class TestStreamMovements(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.movs_file_path = os.path.join(self.folder.name, "Resumen de movimientos.xlsx")
+        self.output_path = os.path.join(self.folder.name, "movements.arrow")
+        pd.DataFrame(MOVEMENTS).to_excel(self.movs_file_path, index=False)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_same_output_as_whole_file(self):
+        """Test that any chunk size gives the frame the notebook stages give"""
+        expected = cumplo_pipeline.load_movements(self.movs_file_path)
+        expected = cumplo_pipeline.extract_remate_ids(cumplo_pipeline.extract_solicitud(expected))
+        expected = expected.astype({"Cargo": float, "Abono": float})
+
+        for chunk_size in [1, 2, 3, len(MOVEMENTS), 100]:
+            with self.subTest(chunk_size=chunk_size):
+                stream_movements(self.movs_file_path, self.output_path, chunk_size)
+                pd.testing.assert_frame_equal(load_streamed(self.output_path), expected)
+
+    def test_chunks(self):
+        """Test chunk sizes and their index (the row on the export)"""
+        chunks = list(iter_movement_chunks(self.movs_file_path, chunk_size=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual(chunks[1].index.tolist(), [3, 4, 5])
+
+    def test_empty_export(self):
+        """Test an export without movements"""
+        pd.DataFrame(columns=["Fecha", "Descripción", "Cargo", "Abono"]).to_excel(
+            self.movs_file_path, index=False
+        )
+        stream_movements(self.movs_file_path, self.output_path)
+        movs_df = load_streamed(self.output_path)
+        self.assertTrue(movs_df.empty)
+        self.assertIn("RemateID", movs_df.columns)
+
+    def test_unknown_extension(self):
+        """Test that only Excel files are accepted, and no output is left"""
+        with self.assertRaises(ValueError):
+            stream_movements(os.path.join(self.folder.name, "movs.csv"), self.output_path)
+        self.assertEqual(os.listdir(self.folder.name), ["Resumen de movimientos.xlsx"])
@@ -0,0 +1,123 @@
+import glob
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import openpyxl
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_core, cumplo_pipeline
+from cumplo_sanitizer.src.cumplo_layouts import (
+    UnknownLayoutError,
+    detect_layout,
+    fingerprint,
+    read_flows_v1,
+)
+
+FLOWS_FILE_PATHS = sorted(glob.glob("./cumplo_sanitizer/tests/flujo_files/*.xlsx"))
+FLOWS_FILE_PATH = "./cumplo_sanitizer/tests/flujo_files/Resumen de flujos_4completed_2active.xlsx"
+
+
+class TestDetectLayout(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _changed_flows(self, change) -> str:
+        workbook = openpyxl.load_workbook(FLOWS_FILE_PATH)
+        change(workbook.active)
+        file_path = os.path.join(self.tmp_dir.name, "flows.xlsx")
+        workbook.save(file_path)
+        return file_path
+
+    def _movements(self) -> str:
+        file_path = os.path.join(self.tmp_dir.name, "movements.xlsx")
+        pd.DataFrame(
+            {
+                "Fecha": [pd.Timestamp("2023-04-02")],
+                "Descripción": ["Inversión, solicitud: Crédito NotebookCenter"],
+                "Cargo": [100000],
+                "Abono": [0],
+                "Saldo": [400000],
+            }
+        ).to_excel(file_path, index=False)
+        return file_path
+
+    def test_known_layouts(self):
+        """Test that the flows exports, and a movements export, are identified"""
+        for file_path in FLOWS_FILE_PATHS:
+            self.assertEqual(detect_layout(file_path, "flows").name, "flows-v1")
+
+        movs_file_path = self._movements()
+        self.assertEqual(detect_layout(movs_file_path, "movements").name, "movements-v1")
+        self.assertEqual(fingerprint(movs_file_path).date_columns, 0)
+
+        with self.assertRaises(ValueError):
+            detect_layout(movs_file_path, "statements")
+
+    def test_flows_parity(self):
+        """Test that the fast flows parser gives what the generic parsers give"""
+        for file_path in FLOWS_FILE_PATHS:
+            with self.subTest(file_path=file_path):
+                flows_df, flow_schedule = read_flows_v1(file_path)
+                pd.testing.assert_frame_equal(
+                    flow_schedule, cumplo_core.extract_flow_schedule(file_path)
+                )
+                expected = cumplo_pipeline.load_flows(file_path)[["ID", "Solicitud"]]
+                pd.testing.assert_frame_equal(
+                    flows_df[["ID", "Solicitud"]], expected.reset_index(drop=True)
+                )
+
+    def test_blank_styled_inversion(self):
+        """Test that an empty (but styled) 'Inversión' cell is read as NaN, as `load_flows` does"""
+
+        def blank_inversion(sheet):
+            column = [cell.value for cell in sheet[1]].index("Inversión") + 1
+            cell = sheet.cell(row=2, column=column)
+            cell.value = None
+            cell.font = openpyxl.styles.Font(bold=True)
+
+        file_path = self._changed_flows(blank_inversion)
+        flows_df, _ = read_flows_v1(file_path)
+        expected = cumplo_pipeline.load_flows(file_path)[["ID", "Solicitud", "Inversión"]]
+        self.assertTrue(pd.isna(flows_df["Inversión"].iloc[0]))
+        pd.testing.assert_frame_equal(flows_df, expected.reset_index(drop=True))
+
+    def test_renamed_column(self):
+        """Test that a renamed column fails with the differences"""
+
+        def rename(sheet):
+            sheet["B1"] = "Operación"
+
+        with self.assertRaises(UnknownLayoutError) as raised:
+            detect_layout(self._changed_flows(rename), "flows")
+        message = str(raised.exception)
+        self.assertIn("flows-v1", message)
+        self.assertIn("missing columns: ['Solicitud']", message)
+        self.assertIn("unexpected columns: ['Operación']", message)
+
+    def test_new_font_color(self):
+        """Test that a font color that is not a flow status fails with the differences"""
+
+        def recolor(sheet):
+            sheet["D2"].font = openpyxl.styles.Font(color="FF123456")
+
+        with self.assertRaises(UnknownLayoutError) as raised:
+            detect_layout(self._changed_flows(recolor), "flows")
+        self.assertIn("unknown font colors: ['FF123456']", str(raised.exception))
+
+    def test_load_exports_fails_fast(self):
+        """Test that nothing is parsed when an export has an unknown layout"""
+
+        def drop_dates(sheet):
+            sheet.delete_cols(4, sheet.max_column)
+
+        with (
+            mock.patch.object(cumplo_pipeline, "LAYOUT_PARSERS", {}),
+            self.assertRaises(UnknownLayoutError) as raised,
+        ):
+            cumplo_pipeline.load_exports(self._movements(), self._changed_flows(drop_dates))
+        self.assertIn("no payment date columns", str(raised.exception))
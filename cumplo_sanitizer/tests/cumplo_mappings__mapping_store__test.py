@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_pipeline
+from cumplo_sanitizer.src.cumplo_mappings import MappingStore, normalize_solicitud
+from cumplo_sanitizer.src.some_utils import to_string_dtype
+
+FLOWS_FILE_PATH = "./cumplo_sanitizer/tests/flujo_files/Resumen de flujos_4completed_2active.xlsx"
+
+MOVEMENTS = pd.DataFrame(
+    {
+        "Fecha": pd.to_datetime(["2023-04-02", "2023-04-04", "2023-04-05", "2013-04-05"]),
+        "Descripción": [
+            "Inversión, solicitud: Crédito NotebookCenter",
+            "Inversión, solicitud: Crédito Kio Solutions 99999",
+            "Pago de inversión, solicitud: Crédito Kio Solutions 99999",
+            "Inversión, solicitud: Credito Green Logistic",
+        ],
+        "Cargo": [100000, 50000, 0, 10000],
+        "Abono": [0, 0, 49500, 0],
+    }
+)
+
+
+class TestMappingStore(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.store_dir = os.path.join(self.folder.name, "mappings")
+        self.movs_df = cumplo_pipeline.filter_movements(to_string_dtype(MOVEMENTS.copy()))
+        self.flows_df = cumplo_pipeline.load_flows(FLOWS_FILE_PATH)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _sanitize(self, flows_df: pd.DataFrame, store: MappingStore = None) -> pd.DataFrame:
+        return cumplo_pipeline.sanitize(
+            self.movs_df.copy(), flows_df, verbose=False, mapping_store=store
+        )
+
+    def test_learn_and_reuse(self):
+        """Test that resolved mappings are stored, and reused without matching them again"""
+        expected = self._sanitize(self.flows_df)
+        store = MappingStore(self.store_dir)
+        pd.testing.assert_frame_equal(self._sanitize(self.flows_df, store), expected)
+
+        # Only the 'Solicitud' that had to be matched, and no 'Actor' used as 'RemateID'
+        self.assertEqual(store.solicitudes, {"credito notebookcenter": "20970"})
+        self.assertEqual(store.actors["99999"], "kio solutions 99999")
+        self.assertNotIn("green logistic", store.actors)
+        self.assertEqual(store.version, 1)
+
+        # Nothing to match on a second run; no flows needed, and no new version
+        store = MappingStore(self.store_dir)
+        pd.testing.assert_frame_equal(self._sanitize(self.flows_df.iloc[0:0], store), expected)
+        self.assertEqual(store.versions()["version"].tolist(), [1])
+
+    def test_versions(self):
+        """Test that bad mappings can be forgotten or rolled back"""
+        store = MappingStore(self.store_dir)
+        self.assertEqual(store.add({"Crédito  Más Ingeniería": "23028"}, note="by hand"), 1)
+        self.assertEqual(store.add({"credito mas ingenieria": "99999"}), 1)
+        self.assertEqual(store.add({"Crédito Bad": "1"}, {"1": "bad actor"}), 2)
+        self.assertEqual(store.solicitudes[normalize_solicitud("Credito mas ingenieria")], "23028")
+
+        self.assertEqual(store.forget(["credito bad"], ["1"]), 3)
+        self.assertNotIn("credito bad", store.solicitudes)
+        self.assertEqual(store.forget(["credito bad"]), 3)
+
+        store.rollback(1)
+        self.assertEqual(MappingStore(self.store_dir).version, 1)
+        self.assertEqual(store.add({"Crédito Otro": "2"}), 4)
+        self.assertEqual(store.versions()["parent"].tolist(), [0, 1, 2, 1])
+        self.assertEqual(store.versions()["note"].iloc[0], "by hand")
+        with self.assertRaises(ValueError):
+            store.rollback(10)
+
+    def test_run_stages(self):
+        """Test that the store version is part of the stage keys"""
+        movs_file_path = os.path.join(self.folder.name, "Resumen de movimientos.xlsx")
+        MOVEMENTS.to_excel(movs_file_path, index=False)
+        cache_dir = os.path.join(self.folder.name, "cache")
+        store = MappingStore(self.store_dir)
+
+        def run():
+            movs_df, _ = cumplo_pipeline.run_stages(
+                movs_file_path, FLOWS_FILE_PATH, cache_dir, verbose=False, mapping_store=store
+            )
+            return movs_df, len(os.listdir(os.path.join(cache_dir, "remate_ids")))
+
+        first, stored = run()
+        self.assertEqual((store.version, stored), (1, 1))
+        # New mappings, new keys; resolved from the store this time
+        second, stored = run()
+        pd.testing.assert_frame_equal(second, first)
+        self.assertEqual((store.version, stored), (1, 2))
+        _, stored = run()
+        self.assertEqual(stored, 2)
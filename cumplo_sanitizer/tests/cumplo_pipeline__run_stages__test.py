@@ -0,0 +1,119 @@
+import glob
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from cumplo_sanitizer.src import (
+    cumplo_fuzzy,
+    cumplo_ids,
+    cumplo_layouts,
+    cumplo_mappings,
+    cumplo_pipeline,
+)
+
+# Modules the stages call into, besides `cumplo_core`, `cumplo_ingest` and `some_utils`
+STAGE_MODULES = [cumplo_layouts, cumplo_ids, cumplo_fuzzy, cumplo_mappings]
+
+FLOWS_FILE_PATH = "./cumplo_sanitizer/tests/flujo_files/Resumen de flujos_4completed_2active.xlsx"
+
+
+def _movement(fecha: str, descripcion: str, cargo: int, abono: int) -> dict:
+    return {
+        "Fecha": pd.Timestamp(fecha),
+        "Descripción": descripcion,
+        "Cargo": cargo,
+        "Abono": abono,
+    }
+
+
+MOVEMENTS = [
+    _movement("2023-04-01", "Abono a Saldo Cumplo", 0, 500000),
+    _movement("2023-04-02", "Inversión, solicitud: Crédito NotebookCenter", 100000, 0),
+    _movement("2023-04-04", "Inversión, solicitud: Crédito Kio Solutions 99999", 50000, 0),
+    _movement("2023-04-05", "Pago de inversión, solicitud: Crédito Kio Solutions 99999", 0, 49500),
+    _movement("2013-04-05", "Inversión, solicitud: Credito Green Logistic", 10000, 0),
+    _movement("2013-08-05", "Pago de inversión, solicitud: Credito Green Logistic", 0, 10500),
+]
+
+
+class TestRunStages(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.folder.name, "cache")
+        self.movs_file_path = os.path.join(self.folder.name, "Resumen de movimientos.xlsx")
+        pd.DataFrame(MOVEMENTS).to_excel(self.movs_file_path, index=False)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _run(self, **classify_kwargs) -> pd.DataFrame:
+        movs_df, _ = cumplo_pipeline.run_stages(
+            self.movs_file_path, FLOWS_FILE_PATH, self.cache_dir, verbose=False, **classify_kwargs
+        )
+        return movs_df
+
+    def _stored(self, stage: str) -> int:
+        return len(glob.glob(os.path.join(self.cache_dir, stage, "*.pkl")))
+
+    def test_same_output_as_uncached(self):
+        """Test that the memoized output (computed and loaded) is the uncached one"""
+        expected = cumplo_pipeline.sanitize(
+            cumplo_pipeline.load_movements(self.movs_file_path),
+            cumplo_pipeline.load_flows(FLOWS_FILE_PATH),
+            verbose=False,
+        )
+        expected = cumplo_pipeline.classify(
+            expected, cumplo_pipeline.cumplo_core.extract_flow_schedule(FLOWS_FILE_PATH)
+        )
+        pd.testing.assert_frame_equal(self._run(), expected)
+        pd.testing.assert_frame_equal(self._run(), expected)
+
+    def test_late_stage_change(self):
+        """Test that a new threshold only runs the classification again"""
+        self._run()
+        with mock.patch.object(
+            cumplo_pipeline, "extract_actors", wraps=cumplo_pipeline.extract_actors
+        ) as extract_actors:
+            self._run()
+            result = self._run(despreciable_amount=100000)
+            # An explicit default shares the key with the implicit one
+            self._run(despreciable_amount=200)
+
+        extract_actors.assert_not_called()
+        self.assertEqual(self._stored("actors"), 1)
+        self.assertEqual(self._stored("classify"), 2)
+        self.assertEqual(set(result["Estado"]), {"Unexecuted"})
+
+    def test_input_change(self):
+        """Test that a new export invalidates every stage"""
+        self._run()
+        pd.DataFrame(MOVEMENTS[:-1]).to_excel(self.movs_file_path, index=False)
+        result = self._run()
+
+        for stage in cumplo_pipeline.CACHED_STAGES:
+            self.assertEqual(self._stored(stage), 2)
+        self.assertEqual(len(result), len(MOVEMENTS) - 2)
+
+    def test_unknown_threshold(self):
+        """Test that unknown thresholds fail before running any stage"""
+        with self.assertRaises(TypeError):
+            self._run(despreciable=1000)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_code_version(self):
+        """Test that a change on any module the stages call into gives a new code version"""
+        version = cumplo_pipeline.code_version()
+        getsource = cumplo_pipeline.cumplo_cache.inspect.getsource
+        for module in STAGE_MODULES:
+            with (
+                self.subTest(module=module.__name__),
+                mock.patch.object(
+                    cumplo_pipeline.cumplo_cache.inspect,
+                    "getsource",
+                    lambda obj, module=module: getsource(obj) + ("#" if obj is module else ""),
+                ),
+            ):
+                self.assertNotEqual(cumplo_pipeline.code_version(), version)
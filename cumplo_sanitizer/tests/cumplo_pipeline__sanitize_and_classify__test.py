@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_core import extract_flow_schedule
+from cumplo_sanitizer.src.cumplo_pipeline import (
+    classify,
+    filter_movements,
+    load_flows,
+    sanitize,
+)
+
+FLOWS_FILE_PATH = "./cumplo_sanitizer/tests/flujo_files/Resumen de flujos_4completed_2active.xlsx"
+
+
+def _movement(fecha: str, descripcion: str, cargo: int, abono: int) -> dict:
+    return {
+        "Fecha": pd.Timestamp(fecha),
+        "Descripción": descripcion,
+        "Cargo": cargo,
+        "Abono": abono,
+    }
+
+
+class TestSanitizeAndClassify(unittest.TestCase):
+    def setUp(self):
+        """Synthetic movements for the investments on the flows fixture"""
+        self.raw_movs_df = pd.DataFrame(
+            [
+                _movement("2023-04-01", "Abono a Saldo Cumplo", 0, 500000),
+                _movement(
+                    "2023-04-02", "Inversión, solicitud: Crédito Viveros Chile 21033", 100000, 0
+                ),
+                _movement("2023-04-02", "Inversión, solicitud: Crédito NotebookCenter", 100000, 0),
+                _movement(
+                    "2023-06-01", "Pago de inversión, solicitud: Crédito NotebookCenter", 0, 101000
+                ),
+                _movement("2023-04-03", "Inversión, solicitud: Proyecto con 4 casas", 100000, 0),
+                _movement(
+                    "2023-04-04", "Inversión, solicitud: Crédito Kio Solutions 99999", 50000, 0
+                ),
+                _movement(
+                    "2023-04-05",
+                    "Devolución de fondos por crédito no concretado, solicitud: Crédito Kio Solutions 99999",
+                    0,
+                    50000,
+                ),
+                _movement("2013-04-05", "Inversión, solicitud: Credito Green Logistic", 10000, 0),
+                _movement(
+                    "2013-08-05", "Pago de inversión, solicitud: Credito Green Logistic", 0, 11000
+                ),
+                _movement("2023-04-06", "Retiro de saldo Cumplo", 100, 0),
+                _movement("2023-04-07", "Reajuste puntos Cumplo por solicitud 73278", 0, 0),
+            ]
+        )
+        self.flows_df = load_flows(FLOWS_FILE_PATH)
+
+    def test_filter_movements(self):
+        """Test that non investment and zero amount movements are dropped"""
+        movs_df = filter_movements(self.raw_movs_df)
+        self.assertEqual(len(movs_df), 8)
+        self.assertFalse(movs_df["Descripción"].str.contains("Saldo|saldo").any())
+
+    def test_sanitize(self):
+        """Test Solicitud, RemateID and Actor extraction"""
+        movs_df = sanitize(filter_movements(self.raw_movs_df), self.flows_df, verbose=False)
+        self.assertCountEqual(
+            movs_df["RemateID"].unique(), ["21033", "20970", "15572", "99999", "green logistic"]
+        )
+        self.assertEqual(
+            movs_df.set_index("RemateID")["Actor"].groupby(level=0).first().to_dict(),
+            {
+                "15572": "proyecto con 4 casas",
+                "20970": "notebookcenter",
+                "21033": "viveros chile 21033",
+                "99999": "kio solutions 99999",
+                "green logistic": "green logistic",
+            },
+        )
+
+    @patch("cumplo_sanitizer.src.cumplo_core.some_utils.is_date_past_grace_period")
+    def test_classify(self, mock_is_date_past_grace_period):
+        """Test the Estado assigned to each investment"""
+        mock_is_date_past_grace_period.return_value = False
+
+        movs_df = sanitize(filter_movements(self.raw_movs_df), self.flows_df, verbose=False)
+        movs_df = classify(movs_df, extract_flow_schedule(FLOWS_FILE_PATH))
+        estados = movs_df.groupby("RemateID")["Estado"].first().to_dict()
+        self.assertEqual(
+            estados,
+            {
+                "15572": "Completed",
+                "20970": "Completed",
+                "21033": "Active",
+                "99999": "Unexecuted",
+                "green logistic": "Completed",
+            },
+        )
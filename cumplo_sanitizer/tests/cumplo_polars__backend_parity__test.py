@@ -0,0 +1,145 @@
+import glob
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_pipeline, cumplo_storage
+from cumplo_sanitizer.src.cumplo_core import extract_flow_schedule
+
+try:
+    from cumplo_sanitizer.src import cumplo_polars
+except ImportError:
+    cumplo_polars = None
+
+PATH = "./cumplo_sanitizer/tests/flujo_files/"
+
+
+def _movement(fecha, descripcion: str, cargo: int, abono: int) -> dict:
+    return {
+        "Fecha": pd.Timestamp(fecha),
+        "Descripción": descripcion,
+        "Cargo": cargo,
+        "Abono": abono,
+    }
+
+
+def _movements_from_flows(flow_schedule: pd.DataFrame, flows_df: pd.DataFrame) -> list[dict]:
+    """Investment and payment movements for every flow, as cumplo.cl registers them"""
+    solicitudes = dict(zip(flows_df["ID"], flows_df["Solicitud"]))
+    rows = []
+    for remate_id, flows in flow_schedule.groupby("RemateID"):
+        solicitud = solicitudes[remate_id]
+        invested = int(flows["amount"].sum() * 0.9)
+        rows.append(
+            _movement(
+                flows["due_date"].min() - pd.Timedelta(days=30),
+                f"Inversión, solicitud: {solicitud}",
+                invested,
+                0,
+            )
+        )
+        paid = flows[flows["status"].isin(["on-time", "late-paid"]) & flows["amount"].notna()]
+        for due_date, amount in zip(paid["due_date"], paid["amount"]):
+            rows.append(
+                _movement(due_date, f"Pago de inversión, solicitud: {solicitud}", 0, amount)
+            )
+    return rows
+
+
+# Movements with no flows; old investments, refunds, odd descriptions and accents
+SYNTHETIC_ROWS = [
+    _movement("2023-04-01", "Abono a Saldo Cumplo", 0, 500000),
+    _movement("2023-04-02", "Inversión, solicitud: Crédito NotebookCenter", 100000, 0),
+    _movement("2023-04-04", "Inversión, solicitud: Crédito Kio Solutions 99999", 50000, 0),
+    _movement(
+        "2023-04-05",
+        "Devolución de fondos por crédito no concretado, solicitud: Crédito Kio Solutions 99999",
+        0,
+        50000,
+    ),
+    _movement("2013-04-05", "Inversión, solicitud: Credito Green Logistic", 10000, 0),
+    _movement("2013-08-05", "Pago de inversión, solicitud: Credito Green Logistic", 0, 11000),
+    _movement("2014-01-05", "Inversión, solicitud: CAMPAÑA Año Nuevo: Crédito pyme", 300000, 0),
+    _movement("2014-02-05", "Pago de inversión, solicitud: CAMPAÑA Año Nuevo: Crédito pyme", 0, 1),
+    _movement("2023-05-05", "Inversión, solicitud: Credito COMERCIAL 2050 SPA 24494", 200000, 0),
+    _movement("2023-04-06", "Retiro de saldo Cumplo", 100, 0),
+    _movement("2023-04-07", "Reajuste puntos Cumplo por solicitud 73278", 0, 300),
+    _movement("2023-04-08", 'Devolución de Puntos por solicitud "Linea Comex".', 0, 150),
+    _movement("2023-04-09", "regularizacion saldo cumplo (3cuotas) operación 71701", 0, 5000),
+    _movement("2023-04-10", "Comisión sin solicitud", 2000, 0),
+]
+
+
+@unittest.skipIf(cumplo_polars is None, "polars is not installed")
+class TestBackendParity(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _output(self, movs_df: pd.DataFrame, backend: str, **kwargs) -> pd.DataFrame:
+        """Run a backend and read back its 'sanitized_and_classified' output"""
+        movs_df = cumplo_pipeline.filter_movements(movs_df.copy())
+        if backend == "polars":
+            result = cumplo_polars.sanitize_and_classify(movs_df, verbose=False, **kwargs)
+        else:
+            flow_schedule = kwargs.pop("flow_schedule")
+            result = cumplo_pipeline.sanitize(movs_df, verbose=False, **kwargs)
+            result = cumplo_pipeline.classify(result, flow_schedule)
+
+        data_out_folder = os.path.join(self.tmp_dir.name, backend)
+        os.makedirs(data_out_folder, exist_ok=True)
+        return pd.read_feather(cumplo_storage.save_classified(result, data_out_folder))
+
+    def _assert_parity(self, flows_file_path: str, rows: list[dict], fixdata_csv_path=None):
+        flows_df = cumplo_pipeline.load_flows(flows_file_path)
+        flow_schedule = extract_flow_schedule(flows_file_path)
+        movs_df = pd.DataFrame(rows)
+
+        kwargs = {"flows_df": flows_df, "flow_schedule": flow_schedule}
+        if fixdata_csv_path is not None:
+            kwargs["fixdata_csv_path"] = fixdata_csv_path
+        pandas_output = self._output(movs_df, "pandas", **kwargs)
+        polars_output = self._output(movs_df, "polars", **kwargs)
+        pd.testing.assert_frame_equal(polars_output, pandas_output)
+        return polars_output
+
+    def test_bundled_fixtures(self):
+        """Test both backends on movements generated from every bundled flows file"""
+        for flows_file_path in sorted(glob.glob(PATH + "*.xlsx")):
+            with self.subTest(flows_file_path=flows_file_path):
+                flows_df = cumplo_pipeline.load_flows(flows_file_path)
+                rows = _movements_from_flows(extract_flow_schedule(flows_file_path), flows_df)
+                self._assert_parity(flows_file_path, rows)
+
+    def test_synthetic_movements(self):
+        """Test both backends on movements without flows, old investments and odd rows"""
+        flows_file_path = PATH + "Resumen de flujos_4completed_2active.xlsx"
+        output = self._assert_parity(flows_file_path, SYNTHETIC_ROWS)
+        self.assertIn("green logistic", output["RemateID"].tolist())
+        self.assertIn("Unexecuted", output["Estado"].tolist())
+
+    def test_fixes(self):
+        """Test both backends with a fix_data.csv"""
+        fixdata_csv_path = os.path.join(self.tmp_dir.name, "fix_data.csv")
+        with open(fixdata_csv_path, "w") as csv_file:
+            csv_file.write("RemateID,Actor,Date_YYYY-MM-DD,Abono,Cargo\n")
+            csv_file.write("24494,Comercial 2050 SPA,2023-09-01,210000,0\n")
+
+        flows_file_path = PATH + "Resumen de flujos_6completed.xlsx"
+        output = self._assert_parity(flows_file_path, SYNTHETIC_ROWS, fixdata_csv_path)
+        self.assertEqual(output["Tipo"].tolist()[-1], "Fix")
+
+    def test_run_pipeline_backend(self):
+        """Test that an unknown backend is rejected"""
+        with self.assertRaises(ValueError):
+            cumplo_pipeline.run_pipeline(
+                self.tmp_dir.name,
+                self.tmp_dir.name,
+                movs_file_path="unused.xls",
+                flows_file_path=PATH + "Resumen de flujos_6completed.xlsx",
+                backend="spark",
+            )
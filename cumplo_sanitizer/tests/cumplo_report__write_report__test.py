@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import openpyxl
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_report, cumplo_storage
+from cumplo_sanitizer.src.cumplo_report import investment_summary, write_report
+
+
+class TestWriteReport(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.movs_df = pd.DataFrame(
+            {
+                "Fecha": pd.to_datetime(
+                    ["2023-01-01", "2023-06-01", "2023-02-01", "2023-03-01", "2023-04-01"]
+                ),
+                "Descripción": ["Inversión", "Pago", "Inversión", "Pago", "Devolución"],
+                "Cargo": [1000.0, 0.0, 500.0, 0.0, 0.0],
+                "Abono": [0.0, 1100.0, 0.0, 100.0, 20.0],
+                "RemateID": ["20932", "20932", "15572", "15572", "21033"],
+                "Actor": ["acme", "acme", "beta", "beta", "gamma"],
+                "Estado": ["Completed", "Completed", "Active", "Active", "Completed"],
+            }
+        )
+        self.output_path = cumplo_storage.save_classified(self.movs_df, self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_summary(self):
+        """Test one row per investment, with its rates (none when nothing was invested)"""
+        summary = investment_summary(self.movs_df).set_index("RemateID")
+        self.assertEqual(summary.index.tolist(), ["15572", "20932", "21033"])
+        self.assertEqual(summary.loc["20932", "net"], 100.0)
+        self.assertEqual(summary.loc["20932", "days"], 151)
+        self.assertAlmostEqual(summary.loc["20932", "rate"], 0.1)
+        self.assertGreater(summary.loc["20932", "xirr"], 0.1)
+        self.assertTrue(pd.isna(summary.loc["21033", "rate"]))
+
+    def test_excel(self):
+        """Test that the workbook has the summary, all the movements and per-Estado sheets"""
+        report_path = os.path.join(self.tmp_dir.name, "report.xlsx")
+        written = write_report(self.output_path, report_path, per_estado=True, chunk_size=2)
+        self.assertEqual(written, [report_path])
+
+        workbook = openpyxl.load_workbook(report_path, read_only=True)
+        self.assertEqual(workbook.sheetnames, ["Summary", "Movements", "Active", "Completed"])
+        summary = pd.DataFrame(workbook["Summary"].values)
+        self.assertEqual(summary.iloc[1:, 0].tolist(), ["15572", "20932", "21033"])
+        movements = list(workbook["Movements"].values)
+        self.assertEqual(len(movements), len(self.movs_df) + 1)
+        self.assertEqual(len(list(workbook["Completed"].values)), 4)
+
+    def test_csv(self):
+        """Test one CSV file per sheet, with the same rows as the output"""
+        written = write_report(self.output_path, os.path.join(self.tmp_dir.name, "report.csv"))
+        self.assertEqual(
+            [os.path.basename(file_path) for file_path in written],
+            ["report_Summary.csv", "report_Movements.csv"],
+        )
+        movements = pd.read_csv(written[1], dtype={"RemateID": str})
+        self.assertEqual(sorted(movements["RemateID"]), sorted(self.movs_df["RemateID"]))
+        self.assertEqual(movements["Abono"].sum(), self.movs_df["Abono"].sum())
+
+        with self.assertRaises(ValueError):
+            write_report(self.output_path, os.path.join(self.tmp_dir.name, "report.ods"))
+
+    def test_partitioned_output(self):
+        """Test the same report from the partitioned dataset, with investments split by year"""
+        dataset_path = cumplo_storage.save_classified(
+            self.movs_df, self.tmp_dir.name, partitioned=True
+        )
+        written = write_report(dataset_path, os.path.join(self.tmp_dir.name, "dataset.csv"), True)
+        expected = write_report(self.output_path, os.path.join(self.tmp_dir.name, "file.csv"))
+
+        summary = pd.read_csv(written[0], dtype={"RemateID": str}).sort_values("RemateID")
+        pd.testing.assert_frame_equal(
+            summary.reset_index(drop=True), pd.read_csv(expected[0], dtype={"RemateID": str})
+        )
+
+    def test_investments_never_split(self):
+        """Test that chunks have whole investments"""
+        chunks = list(cumplo_storage.iter_investments(self.output_path, chunk_size=1))
+        self.assertEqual(
+            [chunk.column("RemateID").to_pylist() for chunk in chunks],
+            [["15572", "15572"], ["20932", "20932"], ["21033"]],
+        )
+
+    def test_sheet_rows_and_missing_estado(self):
+        """Test that long sheets go on to new ones, and the sheet for a missing Estado"""
+        movs_df = self.movs_df.assign(Estado=self.movs_df["Estado"].replace("Completed", None))
+        output_path = cumplo_storage.save_classified(movs_df, self.tmp_dir.name)
+        report_path = os.path.join(self.tmp_dir.name, "report.xlsx")
+        with mock.patch.object(cumplo_report, "MAX_SHEET_ROWS", 3):
+            write_report(output_path, report_path, per_estado=True, chunk_size=2)
+
+        workbook = openpyxl.load_workbook(report_path, read_only=True)
+        rows = {name: len(list(workbook[name].values)) for name in workbook.sheetnames}
+        self.assertTrue(all(count <= 3 for count in rows.values()))
+
+        def data_rows(*names):
+            return sum(rows[name] - 1 for name in names)
+
+        self.assertEqual(data_rows("Summary", "Summary_2"), 3)
+        self.assertEqual(data_rows("Movements", "Movements_2", "Movements_3"), len(movs_df))
+        self.assertEqual(data_rows("No Estado", "No Estado_2"), 3)
+        self.assertEqual(data_rows("Active"), 2)
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_storage import ClassifiedReader, save_classified
+
+
+class TestClassifiedReader(unittest.TestCase):
+    def setUp(self):
+        """Write a small classified output to a temporary folder"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.movs_df = pd.DataFrame(
+            {
+                "Fecha": pd.to_datetime(
+                    ["2023-02-01", "2022-01-01", "2023-03-01", "2023-01-15", "2022-06-01"]
+                ),
+                "Cargo": [0, 1000, 0, 500, 0],
+                "Abono": [1100, 0, 520, 0, 100],
+                "Descripción": ["d1", "d2", "d3", "d4", "d5"],
+                "RemateID": ["20932", "20932", "15572", "15572", "21033"],
+                "Actor": ["comercial 2050", "comercial 2050", "dolphins", "dolphins", "dolphins"],
+                "Estado": ["Completed", "Completed", "Active", "Active", "Uncollectible"],
+            }
+        )
+        self.output_path = save_classified(self.movs_df, self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_by_id(self):
+        """Test that by_id returns the movements of one id sorted by Fecha"""
+        reader = ClassifiedReader(self.output_path)
+        result = reader.by_id("20932")
+        self.assertEqual(result["Descripción"].tolist(), ["d2", "d1"])
+        self.assertEqual(len(reader.by_id("99999")), 0)
+
+    def test_by_actor_and_estado(self):
+        """Test the actor and estado lookups"""
+        reader = ClassifiedReader(self.output_path)
+        self.assertCountEqual(reader.ids_by_actor("Dolphins"), ["15572", "21033"])
+        self.assertCountEqual(reader.by_actor("dolphins")["Descripción"], ["d3", "d4", "d5"])
+        self.assertCountEqual(reader.by_estado("Active")["Descripción"], ["d3", "d4"])
+        self.assertEqual(len(reader.by_estado("Unexecuted")), 0)
+
+    def test_by_date_range(self):
+        """Test that date ranges are inclusive and sorted by Fecha"""
+        reader = ClassifiedReader(self.output_path)
+        result = reader.by_date_range("2023-01-15", "2023-02-01")
+        self.assertEqual(result["Descripción"].tolist(), ["d4", "d1"])
+
+    def test_index_is_persisted_and_refreshed(self):
+        """Test that the index is reused, and rebuilt when the output changes"""
+        ClassifiedReader(self.output_path)
+        index_file = os.path.join(f"{self.output_path}.idx", "data.arrow")
+        built_at = os.stat(index_file).st_mtime_ns
+
+        ClassifiedReader(self.output_path)
+        self.assertEqual(os.stat(index_file).st_mtime_ns, built_at)
+
+        save_classified(self.movs_df.iloc[:2], self.tmp_dir.name)
+        reader = ClassifiedReader(self.output_path)
+        self.assertEqual(len(reader), 2)
+        self.assertEqual(reader.ids(), ["20932"])
+
+    def test_partitioned_output(self):
+        """Test that the reader also works over the partitioned dataset"""
+        dataset_path = save_classified(self.movs_df, self.tmp_dir.name, partitioned=True)
+        reader = ClassifiedReader(dataset_path)
+        self.assertEqual(reader.by_id("15572")["Descripción"].tolist(), ["d4", "d3"])
+        self.assertNotIn("Year", reader.by_id("15572").columns)
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cumplo_sanitizer.src.cumplo_storage import load_classified, save_classified
+
+
+class TestSaveClassified(unittest.TestCase):
+    def setUp(self):
+        """Create a small classified movements frame and a temporary output folder"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.movs_df = pd.DataFrame(
+            {
+                "Fecha": pd.to_datetime(
+                    ["2023-02-01", "2022-01-01", "2023-03-01", "2023-01-15", "2022-06-01"]
+                ),
+                "Cargo": [0, 1000, 0, 500, 0],
+                "Abono": [1100, 0, 520, 0, 100],
+                "Descripción": ["d1", "d2", "d3", "d4", "d5"],
+                "RemateID": ["20932", "20932", "15572", "15572", "21033"],
+                "Actor": ["a1", "a1", "a2", "a2", "a3"],
+                "Estado": ["Completed", "Completed", "Active", "Active", "Uncollectible"],
+            }
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_default_is_single_feather_file(self):
+        """Test that the default output is the single feather file"""
+        output_path = save_classified(self.movs_df, self.tmp_dir.name)
+        self.assertEqual(
+            output_path, os.path.join(self.tmp_dir.name, "sanitized_and_classified.feather")
+        )
+        pd.testing.assert_frame_equal(pd.read_feather(output_path), self.movs_df)
+
+    def test_partitioned_layout(self):
+        """Test that partitions are created by Estado and year of Fecha"""
+        output_path = save_classified(self.movs_df, self.tmp_dir.name, partitioned=True)
+        partitions = sorted(
+            os.path.relpath(root, output_path)
+            for root, _, files in os.walk(output_path)
+            if len(files) > 0
+        )
+        self.assertEqual(
+            partitions,
+            [
+                os.path.join("Estado=Active", "Year=2023"),
+                os.path.join("Estado=Completed", "Year=2022"),
+                os.path.join("Estado=Completed", "Year=2023"),
+                os.path.join("Estado=Uncollectible", "Year=2022"),
+            ],
+        )
+
+    def test_partitioned_files_sorted_with_statistics(self):
+        """Test that rows are sorted by RemateID and row groups have statistics"""
+        output_path = save_classified(
+            self.movs_df, self.tmp_dir.name, partitioned=True, row_group_size=1
+        )
+        partition_dir = os.path.join(output_path, "Estado=Active", "Year=2023")
+        file_path = os.path.join(partition_dir, os.listdir(partition_dir)[0])
+
+        parquet_file = pq.ParquetFile(file_path)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        r_id_col = parquet_file.schema_arrow.get_field_index("RemateID")
+        stats = parquet_file.metadata.row_group(0).column(r_id_col).statistics
+        self.assertTrue(stats.has_min_max)
+
+        fechas = parquet_file.read().column("Fecha").to_pandas()
+        self.assertTrue(fechas.is_monotonic_increasing)
+
+    def test_load_classified_filters(self):
+        """Test that both outputs can be read back filtered by Estado, year and RemateID"""
+        single_path = save_classified(self.movs_df, self.tmp_dir.name)
+        dataset_path = save_classified(self.movs_df, self.tmp_dir.name, partitioned=True)
+
+        for output_path in [single_path, dataset_path]:
+            result = load_classified(output_path, estados=["Completed"], years=[2023])
+            self.assertEqual(result["Descripción"].tolist(), ["d1"])
+
+            result = load_classified(output_path, remate_ids=["15572"])
+            self.assertCountEqual(result["Descripción"].tolist(), ["d3", "d4"])
+
+    def test_resave_after_estado_change(self):
+        """Test that re-saving drops the partitions of the previous Estado of an investment"""
+        save_classified(self.movs_df, self.tmp_dir.name, partitioned=True)
+        changed_df = self.movs_df.assign(
+            Estado=self.movs_df["Estado"].replace({"Active": "Uncollectible"})
+        )
+        output_path = save_classified(changed_df, self.tmp_dir.name, partitioned=True)
+
+        self.assertFalse(os.path.exists(os.path.join(output_path, "Estado=Active")))
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["sanitized_and_classified"])
+        result = load_classified(output_path, remate_ids=["15572"])
+        self.assertEqual(len(result), 2)
+        self.assertEqual(set(result["Estado"]), {"Uncollectible"})
@@ -0,0 +1,122 @@
+import datetime
+import unittest
+
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_core import extract_flow_schedule
+from cumplo_sanitizer.src.cumplo_pipeline import (
+    classify,
+    filter_movements,
+    load_flows,
+    sanitize,
+)
+from cumplo_sanitizer.src.cumplo_sweep import (
+    classify_summary,
+    investment_summary,
+    sweep,
+)
+
+PATH = "./cumplo_sanitizer/tests/flujo_files/"
+
+
+def _movement(fecha: str, descripcion: str, cargo: int, abono: int) -> dict:
+    return {
+        "Fecha": pd.Timestamp(fecha),
+        "Descripción": descripcion,
+        "Cargo": cargo,
+        "Abono": abono,
+    }
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        """Synthetic movements for the investments on a flows fixture with late flows"""
+        flows_file_path = PATH + "Resumen de flujos_6_not_paid_but_collectible.xlsx"
+        self.flow_schedule = extract_flow_schedule(flows_file_path)
+        raw_movs_df = pd.DataFrame(
+            [
+                _movement(
+                    "2023-04-02", "Inversión, solicitud: Crédito Viveros Chile 21033", 90000, 0
+                ),
+                _movement(
+                    "2023-06-02",
+                    "Pago de inversión, solicitud: Crédito Viveros Chile 21033",
+                    0,
+                    30000,
+                ),
+                _movement("2023-04-02", "Inversión, solicitud: Proyecto con 4 casas", 100000, 0),
+                _movement(
+                    "2023-04-04", "Inversión, solicitud: Crédito Kio Solutions 99999", 50000, 0
+                ),
+                _movement(
+                    "2023-04-05",
+                    "Pago de inversión, solicitud: Crédito Kio Solutions 99999",
+                    0,
+                    49500,
+                ),
+                _movement("2013-04-05", "Inversión, solicitud: Credito Green Logistic", 10000, 0),
+                _movement(
+                    "2013-08-05", "Pago de inversión, solicitud: Credito Green Logistic", 0, 8000
+                ),
+                _movement(
+                    "2023-05-05",
+                    "Inversión, solicitud: Credito COMERCIAL 2050 SPA 24494",
+                    200000,
+                    0,
+                ),
+                _movement("2023-04-10", "Comisión sin solicitud", 2000, 0),
+            ]
+        )
+        self.movs_df = sanitize(
+            filter_movements(raw_movs_df), load_flows(flows_file_path), verbose=False
+        )
+
+    def test_summary_matches_classify(self):
+        """Test that the summary classification matches `classify` for several thresholds"""
+        summary = investment_summary(self.movs_df, self.flow_schedule)
+        for parameters in [
+            {},
+            {"grace_period_days": 100000},
+            {"despreciable_amount": 1000, "uncollectible_amount": 0},
+            {"considerable_amount": 1, "grace_period_days_since_last_payment": 0},
+        ]:
+            with self.subTest(**parameters):
+                expected = classify(self.movs_df.copy(), self.flow_schedule, **parameters)
+                expected = expected.groupby("RemateID", dropna=False, sort=False)["Estado"].first()
+                result = classify_summary(summary, **parameters)
+                pd.testing.assert_series_equal(result, expected, check_index_type=False)
+
+    def test_sweep(self):
+        """Test Estado counts and amounts per combination"""
+        result = sweep(
+            self.movs_df,
+            self.flow_schedule,
+            grace_period_days=[60, 100000],
+            despreciable_amount=[200, 1000],
+        )
+        combinations = result.groupby(["grace_period_days", "despreciable_amount"])
+        self.assertEqual(combinations.ngroups, 4)
+
+        # Every investment and amount is counted once per combination
+        investments = self.movs_df["RemateID"].nunique(dropna=False)
+        self.assertTrue((combinations["investments"].sum() == investments).all())
+        self.assertTrue((combinations["cost"].sum() == self.movs_df["Cargo"].sum()).all())
+
+        estados = result.set_index(["grace_period_days", "despreciable_amount", "Estado"])
+        # 15572 and 21033 are late for too long, and 'green logistic' was never fully payed
+        self.assertEqual(estados.loc[(60, 200, "Uncollectible"), "investments"], 3)
+        self.assertEqual(estados.loc[(100000, 200, "Uncollectible"), "investments"], 1)
+        self.assertEqual(estados.loc[(100000, 200, "Active"), "investments"], 3)
+        self.assertEqual(estados.loc[(60, 1000, "Unexecuted"), "investments"], 1)
+
+    def test_as_of(self):
+        """Test that days are counted up to `as_of`"""
+        summary = investment_summary(
+            self.movs_df, self.flow_schedule, as_of=datetime.date(2013, 9, 4)
+        )
+        self.assertEqual(summary.loc["green logistic", "days_since_last_payment"], 30)
+
+    def test_unknown_parameter(self):
+        """Test that grids for unknown parameters are rejected"""
+        with self.assertRaises(ValueError):
+            sweep(self.movs_df, self.flow_schedule, grace_days=[30])
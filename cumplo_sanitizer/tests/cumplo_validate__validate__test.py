@@ -0,0 +1,99 @@
+import glob
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_core, cumplo_layouts, cumplo_validate
+from cumplo_sanitizer.src.cumplo_validate import compare_frames, generate_exports, validate
+
+FLOWS_FILE_PATHS = sorted(glob.glob("./cumplo_sanitizer/tests/flujo_files/*.xlsx"))
+
+# Fixed, so the synthetic exports do not change with the date the tests run on
+TODAY = pd.Timestamp("2024-03-01")
+
+
+class TestValidate(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.file_paths = generate_exports(cls.tmp_dir.name, investments=40, today=TODAY)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_no_differences(self):
+        """Test that the fast implementations match the reference ones on synthetic exports"""
+        summary, differences = validate(*self.file_paths)
+        self.assertEqual(
+            summary["check"].tolist(), [check.name for check in cumplo_validate.CHECKS]
+        )
+        self.assertTrue((summary["rows"] > 0).all())
+        self.assertEqual(summary["differences"].sum(), 0, differences.to_string())
+        self.assertTrue(differences.empty)
+
+    def test_reference_loops(self):
+        """Test that the checks of loops replaced by vectorized code report their drift"""
+        extract_unexecuted = cumplo_core.extract_unexecuted
+
+        def adding_one(df, despreciable_amount):
+            return extract_unexecuted(df, despreciable_amount) + ["20001"]
+
+        with mock.patch.object(cumplo_core, "extract_unexecuted", adding_one):
+            summary, differences = validate(*self.file_paths, checks=["extractors", "rates"])
+        self.assertEqual(summary["differences"].tolist(), [1, 0])
+        self.assertEqual(
+            differences[["RemateID", "column"]].values.tolist(), [["20001", "unexecuted"]]
+        )
+
+    def test_bundled_flows(self):
+        """Test the checks on the flows (only) against every bundled flows export"""
+        for flows_file_path in FLOWS_FILE_PATHS:
+            with self.subTest(flows_file_path):
+                summary, differences = validate(
+                    None, flows_file_path, checks=["flow_schedule", "flows", "flow_ids"]
+                )
+                self.assertEqual(len(summary), 3)
+                self.assertTrue(differences.empty, differences.to_string())
+
+    def test_reports_differences(self):
+        """Test that a candidate that drifts from the reference is reported, per value"""
+        read_flows_v1 = cumplo_layouts.read_flows_v1
+
+        def drifting(file_path):
+            flows_df, flow_schedule = read_flows_v1(file_path)
+            flow_schedule.loc[flow_schedule.index[0], "amount"] += 1
+            return flows_df, flow_schedule
+
+        with mock.patch.object(cumplo_layouts, "read_flows_v1", drifting):
+            summary, differences = validate(*self.file_paths, checks=["flow_schedule"])
+        self.assertEqual(summary["differences"].tolist(), [1])
+        self.assertEqual(
+            differences[["check", "column"]].values.tolist(), [["flow_schedule", "amount"]]
+        )
+        self.assertEqual(differences["candidate"].iloc[0] - differences["reference"].iloc[0], 1)
+
+        with self.assertRaises(ValueError):
+            validate(*self.file_paths, checks=["estado"])
+
+    def test_compare_frames(self):
+        """Test the tolerance on numbers, missing values, and rows found on one side only"""
+        reference = pd.DataFrame({"id": ["a", "b", "c"], "rate": [0.1, None, 0.3], "estado": "x"})
+        candidate = pd.DataFrame(
+            {"id": ["a", "b", "d"], "rate": [0.1 + 1e-12, None, 0.3], "estado": "x"}
+        )
+        differences = compare_frames(reference, candidate, ["id"])
+        self.assertEqual(
+            differences[["id", "column"]].values.tolist(), [["c", "<row>"], ["d", "<row>"]]
+        )
+
+        candidate.loc[0, ["rate", "estado"]] = [0.1001, "y"]
+        differences = compare_frames(reference, candidate, ["id"], tolerance=1e-3)
+        self.assertEqual(
+            differences[differences["column"] != "<row>"]["column"].tolist(), ["estado"]
+        )
+
+        with self.assertRaises(ValueError):
+            compare_frames(reference, pd.concat([candidate, candidate.iloc[:1]]), ["id"])
@@ -0,0 +1,180 @@
+import contextlib
+import datetime
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from cumplo_sanitizer.src import cumplo_pipeline, cumplo_watch
+from cumplo_sanitizer.src.cumplo_watch import (
+    ExportScanner,
+    parse_export_date,
+    pending_export,
+    watch,
+)
+from cumplo_sanitizer.src.some_utils import get_most_recent_filename
+
+
+class TestParseExportDate(unittest.TestCase):
+    def test_parse_export_date(self):
+        """Test the supported date formats on export names"""
+        self.assertEqual(
+            parse_export_date("Resumen de flujos - 2023-11-06.xlsx"),
+            datetime.datetime(2023, 11, 6),
+        )
+        self.assertEqual(
+            parse_export_date("Resumen de movimientos - 06-11-2023 14_35.xls"),
+            datetime.datetime(2023, 11, 6, 14, 35),
+        )
+        self.assertEqual(
+            parse_export_date("Resumen de flujos - 20231106.xlsx"),
+            datetime.datetime(2023, 11, 6),
+        )
+        self.assertIsNone(parse_export_date("Resumen de flujos.xlsx"))
+
+
+class TestExportScanner(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_in = os.path.join(self.tmp_dir.name, "data_in")
+        self.data_out = os.path.join(self.tmp_dir.name, "data_out")
+        os.makedirs(self.data_in)
+        os.makedirs(self.data_out)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, name: str, content: bytes) -> str:
+        file_path = os.path.join(self.data_in, name)
+        with open(file_path, "wb") as file:
+            file.write(content)
+        return file_path
+
+    def _failed(self) -> set:
+        with open(os.path.join(self.data_out, ".watch_state.json")) as state_file:
+            return {tuple(pair) for pair in json.load(state_file)["failed"]}
+
+    def test_latest_by_parsed_date(self):
+        """Test that the latest export is picked by date and not by name"""
+        self._write("Resumen de flujos - 25-10-2023.xlsx", b"old")
+        newest = self._write("Resumen de flujos - 06-11-2023.xlsx", b"new")
+        self._write("Resumen de movimientos - 07-11-2023.xls", b"movs")
+
+        scanner = ExportScanner(self.data_in)
+        latest = scanner.latest("Resumen de flujos - ", "xlsx")
+        self.assertEqual(latest.path, newest)
+        self.assertEqual(latest.size, 3)
+        self.assertEqual(len(scanner.files("Resumen de flujos - ", "xlsx")), 2)
+
+    def test_refresh_only_reports_changes(self):
+        """Test that refresh only returns new files"""
+        self._write("Resumen de flujos - 2023-10-25.xlsx", b"old")
+        scanner = ExportScanner(self.data_in)
+        self.assertEqual(scanner.refresh(), [])
+
+        self._write("Resumen de flujos - 2023-11-06.xlsx", b"new")
+        changed = scanner.refresh()
+        self.assertEqual(
+            [export_file.name for export_file in changed], ["Resumen de flujos - 2023-11-06.xlsx"]
+        )
+
+    def test_pending_export_ignores_same_content(self):
+        """Test that a re-download of the same content is not a new export"""
+        self._write("Resumen de flujos - 2023-10-25.xlsx", b"flows")
+        self._write("Resumen de movimientos - 2023-10-25.xls", b"movs")
+        scanner = ExportScanner(self.data_in)
+
+        movs_file, flows_file = pending_export(scanner, set())
+        processed = {(movs_file.content_hash, flows_file.content_hash)}
+
+        self._write("Resumen de movimientos - 2023-11-06.xls", b"movs")
+        scanner.refresh()
+        self.assertIsNone(pending_export(scanner, processed))
+
+        self._write("Resumen de movimientos - 2023-11-07.xls", b"new movs")
+        scanner.refresh()
+        movs_file, _ = pending_export(scanner, processed)
+        self.assertEqual(movs_file.name, "Resumen de movimientos - 2023-11-07.xls")
+
+    def test_watch_runs_once_per_new_export(self):
+        """Test that watch runs on the pending export and remembers it"""
+        flows_path = self._write("Resumen de flujos - 2023-10-25.xlsx", b"flows")
+        movs_path = self._write("Resumen de movimientos - 2023-10-25.xls", b"movs")
+
+        calls = []
+        watch(self.data_in, self.data_out, lambda *paths: calls.append(paths), max_runs=1)
+        self.assertEqual(calls, [(movs_path, flows_path)])
+        self.assertTrue(os.path.exists(os.path.join(self.data_out, ".watch_state.json")))
+
+    def test_watch_survives_failed_export(self):
+        """Test that a failing export is skipped until it changes, without stopping the watch"""
+        self._write("Resumen de flujos - 2023-10-25.xlsx", b"flows")
+        movs_path = self._write("Resumen de movimientos - 2023-10-25.xls", b"broken")
+
+        calls = []
+
+        def on_new_export(movs_file_path, flows_file_path):
+            calls.append(movs_file_path)
+            with open(movs_file_path, "rb") as movs_file:
+                if movs_file.read() == b"broken":
+                    raise ValueError("Malformed export")
+
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            watch(self.data_in, self.data_out, on_new_export, max_runs=1)
+            # Remembered across restarts; the same content is not run again
+            scanner = ExportScanner(self.data_in)
+            self.assertIsNone(pending_export(scanner, self._failed()))
+
+            self._write("Resumen de movimientos - 2023-10-25.xls", b"fixed")
+            watch(self.data_in, self.data_out, on_new_export, max_runs=1)
+        self.assertEqual(calls, [movs_path, movs_path])
+        self.assertEqual(len(self._failed()), 1)
+
+    def test_watch_rescans_on_wait_timeout(self):
+        """Test that the folder is rescanned when inotify times out without events"""
+        flows_path = self._write("Resumen de flujos - 2023-10-25.xlsx", b"flows")
+        waits = []
+
+        def wait(timeout):
+            # No events ever; the export lands after the first wait
+            waits.append(timeout)
+            self._write("Resumen de movimientos - 2023-10-25.xls", b"movs")
+            return False
+
+        calls = []
+        with mock.patch.object(cumplo_watch, "_inotify_waiter", return_value=wait):
+            watch(
+                self.data_in,
+                self.data_out,
+                lambda *paths: calls.append(paths),
+                poll_interval=0.01,
+                max_runs=1,
+            )
+        self.assertEqual(waits, [0.01])
+        self.assertEqual(calls[0][1], flows_path)
+
+    def test_run_pipeline_picks_latest_export(self):
+        """Test that run_pipeline picks the exports by the date on their names"""
+        self._write("Resumen de flujos - 25-10-2023.xlsx", b"old")
+        flows_path = self._write("Resumen de flujos - 06-11-2023.xlsx", b"new")
+        movs_path = self._write("Resumen de movimientos - 07-11-2023.xls", b"movs")
+
+        with mock.patch.object(cumplo_pipeline, "load_exports", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                cumplo_pipeline.run_pipeline(self.data_in, self.data_out)
+            cumplo_pipeline.load_exports.assert_called_once_with(movs_path, flows_path)
+
+        os.remove(movs_path)
+        with self.assertRaises(FileNotFoundError):
+            cumplo_pipeline.run_pipeline(self.data_in, self.data_out)
+
+    def test_get_most_recent_filename_nested_folder(self):
+        """Test that the most recent file path uses its own folder"""
+        os.makedirs(os.path.join(self.data_in, "old"))
+        self._write(os.path.join("old", "Resumen de flujos - 2023-10-25.xlsx"), b"old")
+        newest = self._write("Resumen de flujos - 2023-11-06.xlsx", b"new")
+        self.assertEqual(
+            get_most_recent_filename(self.data_in, "Resumen de flujos - ", "xlsx"), newest
+        )
@@ -0,0 +1,163 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cumplo_sanitizer.src import cumplo_pipeline
+from cumplo_sanitizer.src.cumplo_worker import (
+    DONE_SUFFIX,
+    JOB_SUFFIX,
+    MAX_ATTEMPTS,
+    RUNNING_SUFFIX,
+    Worker,
+    read_result,
+    read_status,
+    submit_job,
+    wait_for_job,
+)
+from cumplo_sanitizer.src.some_utils import STRING_DTYPE
+
+FLOWS_FILE_PATH = "./cumplo_sanitizer/tests/flujo_files/Resumen de flujos_4completed_2active.xlsx"
+
+MOVEMENTS = pd.DataFrame(
+    {
+        "Fecha": pd.to_datetime(["2023-04-02", "2023-04-04", "2023-04-05", "2013-04-05"]),
+        "Descripción": [
+            "Inversión, solicitud: Crédito NotebookCenter",
+            "Inversión, solicitud: Crédito Kio Solutions 99999",
+            "Pago de inversión, solicitud: Crédito Kio Solutions 99999",
+            "Inversión, solicitud: Credito Green Logistic",
+        ],
+        "Cargo": [100000, 50000, 0, 10000],
+        "Abono": [0, 0, 49500, 0],
+    }
+)
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.movs_file_path = os.path.join(self.folder.name, "Resumen de movimientos.xlsx")
+        MOVEMENTS.to_excel(self.movs_file_path, index=False)
+        self.worker = Worker(os.path.join(self.folder.name, "spool"))
+        self.worker.warm_up()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_run_job(self):
+        """Test that a job writes the classified movements and its status next to it"""
+        job_id = submit_job(
+            self.worker.spool_dir, self.movs_file_path, FLOWS_FILE_PATH, despreciable_amount=1000
+        )
+        self.assertIsNone(read_status(self.worker.spool_dir, job_id))
+
+        status = self.worker.run_job(job_id)
+        self.assertEqual(status["status"], "done")
+        self.assertEqual(read_status(self.worker.spool_dir, job_id), status)
+        self.assertTrue(os.path.exists(os.path.join(self.worker.spool_dir, job_id + DONE_SUFFIX)))
+
+        expected = cumplo_pipeline.classify(
+            cumplo_pipeline.sanitize(
+                cumplo_pipeline.load_movements(self.movs_file_path),
+                cumplo_pipeline.load_flows(FLOWS_FILE_PATH),
+                verbose=False,
+            ),
+            cumplo_pipeline.cumplo_core.extract_flow_schedule(FLOWS_FILE_PATH),
+            despreciable_amount=1000,
+        )
+        pd.testing.assert_frame_equal(
+            read_result(status), expected.reset_index(drop=True).astype({"Estado": STRING_DTYPE})
+        )
+        self.assertEqual(status["estados"], expected["Estado"].value_counts().to_dict())
+        # Kept for the next jobs
+        self.assertIn("99999", self.worker.registry.decode(np.arange(len(self.worker.registry))))
+
+        # Already claimed
+        self.assertIsNone(self.worker.run_job(job_id))
+
+    def test_warm_stages(self):
+        """Test that a second job on the same export reuses the stage outputs"""
+        self.worker.run_job(submit_job(self.worker.spool_dir, self.movs_file_path, FLOWS_FILE_PATH))
+        stored = len(self.worker.cache)
+        status = self.worker.run_job(
+            submit_job(
+                self.worker.spool_dir, self.movs_file_path, FLOWS_FILE_PATH, despreciable_amount=1
+            )
+        )
+        self.assertEqual(status["status"], "done")
+        self.assertEqual(len(self.worker.cache), stored + 1)
+
+    def test_failed_job(self):
+        """Test that a failing job is reported, and the worker goes on"""
+        job_id = submit_job(self.worker.spool_dir, "missing.xlsx", FLOWS_FILE_PATH)
+        status = self.worker.run_job(job_id)
+        self.assertEqual(status["status"], "failed")
+        self.assertIn("missing.xlsx", status["traceback"])
+
+    def test_serve(self):
+        """Test that served jobs run in submission order"""
+        job_ids = [
+            submit_job(self.worker.spool_dir, self.movs_file_path, FLOWS_FILE_PATH)
+            for _ in range(2)
+        ]
+        server = threading.Thread(
+            target=self.worker.serve,
+            kwargs={"poll_interval": 0.01, "use_inotify": False, "max_jobs": 3},
+        )
+        server.start()
+        job_ids.append(submit_job(self.worker.spool_dir, self.movs_file_path, FLOWS_FILE_PATH))
+        statuses = [wait_for_job(self.worker.spool_dir, job_id, timeout=30) for job_id in job_ids]
+        server.join(timeout=30)
+
+        self.assertFalse(server.is_alive())
+        self.assertEqual([status["status"] for status in statuses], ["done"] * 3)
+        self.assertEqual(self.worker.pending_jobs(), [])
+
+    def _running_job(self, worker: dict | None = None, attempts: int = 0) -> str:
+        # A job claimed by `worker` (None when it wasn't recorded)
+        job_id = submit_job(self.worker.spool_dir, self.movs_file_path, FLOWS_FILE_PATH)
+        job_path = os.path.join(self.worker.spool_dir, job_id)
+        with open(job_path + JOB_SUFFIX) as job_file:
+            job = json.load(job_file)
+        if worker is not None:
+            job["worker"] = worker
+        with open(job_path + RUNNING_SUFFIX, "w") as job_file:
+            json.dump({**job, "attempts": attempts}, job_file)
+        os.remove(job_path + JOB_SUFFIX)
+        return job_id
+
+    def test_recover_stale_jobs(self):
+        """Test that jobs of dead workers are queued again, and the live ones are left alone"""
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        host = socket.gethostname()
+        dead_job = self._running_job({"pid": dead.pid, "host": host})
+        live_job = self._running_job({"pid": os.getpid(), "host": host})
+        remote_job = self._running_job({"pid": os.getpid(), "host": f"not-{host}"})
+        unrecorded_job = self._running_job()
+
+        self.assertEqual(self.worker.recover_stale_jobs(), [dead_job])
+        self.assertEqual(self.worker.pending_jobs(), [dead_job])
+        # Only checked by age
+        self.assertEqual(
+            self.worker.recover_stale_jobs(stale_seconds=0), sorted([remote_job, unrecorded_job])
+        )
+        self.assertNotIn(live_job, self.worker.pending_jobs())
+
+        self.assertEqual(self.worker.run_job(dead_job)["status"], "done")
+
+    def test_recover_stale_jobs_gives_up(self):
+        """Test that a job whose worker died `MAX_ATTEMPTS` times is finished as failed"""
+        job_id = self._running_job(attempts=MAX_ATTEMPTS - 1)
+        self.assertEqual(self.worker.recover_stale_jobs(stale_seconds=0), [job_id])
+        self.assertEqual(self.worker.pending_jobs(), [])
+        self.assertEqual(read_status(self.worker.spool_dir, job_id)["status"], "failed")
+        self.assertTrue(os.path.exists(os.path.join(self.worker.spool_dir, job_id + DONE_SUFFIX)))
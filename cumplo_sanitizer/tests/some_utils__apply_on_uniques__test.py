@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cumplo_sanitizer.src.some_utils import (
+    apply_on_uniques,
+    clean_spanish_characters,
+    match_group_and_assign,
+)
+
+
+class TestApplyOnUniques(unittest.TestCase):
+    def setUp(self):
+        self.series = pd.Series(
+            [
+                "Crédito Más Ingenieria 23028",
+                np.nan,
+                "Crédito Más Ingenieria 23028",
+                "Credito Green Logistic",
+                "Crédito Más Ingenieria 23028",
+            ],
+            index=[10, 11, 12, 13, 14],
+        )
+
+    def test_vectorized_transform(self):
+        """Test that results are broadcast back to every row, keeping the index"""
+        result = apply_on_uniques(self.series, lambda uniques: uniques.str.split().str[-1])
+        expected = self.series.str.split().str[-1]
+        pd.testing.assert_series_equal(result, expected)
+
+    def test_elementwise_transform(self):
+        """Test an element by element transform"""
+        result = apply_on_uniques(self.series, clean_spanish_characters, elementwise=True)
+        expected = self.series.apply(clean_spanish_characters)
+        pd.testing.assert_series_equal(result, expected)
+
+    def test_transform_runs_once_per_distinct_value(self):
+        """Test that the transform only sees the distinct values"""
+        seen = []
+        apply_on_uniques(self.series, lambda value: seen.append(value), elementwise=True)
+        self.assertEqual(len(seen), 3)
+
+    def test_dataframe_result(self):
+        """Test transforms returning a DataFrame, like str.extract"""
+        result = apply_on_uniques(self.series, lambda uniques: uniques.str.extract(r"(\d+)$"))
+        expected = self.series.str.extract(r"(\d+)$")
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_empty_series(self):
+        """Test that an empty Series gives an empty result"""
+        result = apply_on_uniques(pd.Series([], dtype=object), lambda uniques: uniques.str.strip())
+        self.assertEqual(len(result), 0)
+
+
+class TestMatchGroupAndAssign(unittest.TestCase):
+    def test_match_group_and_assign(self):
+        """Test that only rows without a previous value are assigned"""
+        df = pd.DataFrame(
+            {
+                "Descripción": [
+                    "Pago de inversión, solicitud: Crédito Kio Solutions",
+                    "Reajuste puntos Cumplo por solicitud 73278",
+                    "Pago de inversión, solicitud: Crédito Kio Solutions",
+                    "Abono a Saldo Cumplo",
+                ],
+            }
+        )
+        df = match_group_and_assign(df, r"solicitud: (\w.+)", "Descripción", "Solicitud")
+        df = match_group_and_assign(df, r"solicitud (\w.+)", "Descripción", "Solicitud")
+        self.assertEqual(
+            df["Solicitud"].fillna("").tolist(),
+            ["Crédito Kio Solutions", "73278", "Crédito Kio Solutions", ""],
+        )
@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cumplo_sanitizer.src.cumplo_core import extract_flow_schedule
+from cumplo_sanitizer.src.cumplo_pipeline import (
+    classify,
+    filter_movements,
+    load_flows,
+    sanitize,
+)
+from cumplo_sanitizer.src.some_utils import (
+    STRING_DTYPE,
+    match_group_and_assign,
+    to_string_dtype,
+)
+
+FLOWS_FILE_PATH = "./cumplo_sanitizer/tests/flujo_files/Resumen de flujos_4completed_2active.xlsx"
+
+
+def _as_objects(df: pd.DataFrame) -> pd.DataFrame:
+    """Text columns as 'object', with None as missing value, to compare dtypes"""
+    df = df.astype({column: object for column in df.select_dtypes(["object", "string"])})
+    return df.where(df.notna(), None)
+
+
+class TestToStringDtype(unittest.TestCase):
+    def setUp(self):
+        self.movs_df = pd.DataFrame(
+            {
+                "Fecha": pd.to_datetime(["2023-04-02", "2023-04-04", "2023-04-05", "2013-04-05"]),
+                "Descripción": [
+                    "Inversión, solicitud: Crédito Viveros Chile 21033",
+                    "Inversión, solicitud: Crédito Kio Solutions 99999",
+                    "Devolución de fondos por crédito no concretado, solicitud: Crédito Kio Solutions 99999",
+                    "Inversión, solicitud: Credito Green Logistic",
+                ],
+                "Cargo": [100000, 50000, np.nan, 10000],
+                "Abono": [0, 0, 50000, 0],
+                "Tipo": ["Cargo", None, "Abono", "Cargo"],
+                "Mixed": ["a", 1, None, "b"],
+            }
+        )
+
+    def test_only_text_columns_are_converted(self):
+        """Test that only columns with strings (and NAs) are converted"""
+        df = to_string_dtype(self.movs_df.copy())
+        self.assertEqual(df["Descripción"].dtype, STRING_DTYPE)
+        self.assertEqual(df["Tipo"].dtype, STRING_DTYPE)
+        self.assertTrue(df["Tipo"].isna().iloc[1])
+        self.assertEqual(df["Mixed"].dtype, object)
+        self.assertEqual(df["Cargo"].dtype, np.float64)
+
+    def test_match_group_and_assign(self):
+        """Test that extraction gives the same values on both dtypes"""
+        pattern = r"solicitud: (\w.+)"
+        expected = match_group_and_assign(self.movs_df.copy(), pattern, "Descripción", "Solicitud")
+        result = match_group_and_assign(
+            to_string_dtype(self.movs_df.copy()), pattern, "Descripción", "Solicitud"
+        )
+        self.assertEqual(result["Solicitud"].dtype, STRING_DTYPE)
+        self.assertEqual(result["Solicitud"].tolist(), expected["Solicitud"].fillna(pd.NA).tolist())
+
+    def test_pipeline_on_both_dtypes(self):
+        """Test that sanitize and classify give the same output on both dtypes"""
+        flows_df = load_flows(FLOWS_FILE_PATH)
+        flow_schedule = extract_flow_schedule(FLOWS_FILE_PATH)
+        movs_df = self.movs_df.drop(columns="Mixed")
+
+        expected = sanitize(
+            filter_movements(movs_df.copy()),
+            flows_df.astype({"ID": object, "Solicitud": object}),
+            verbose=False,
+        )
+        expected = classify(expected, flow_schedule)
+        result = sanitize(
+            filter_movements(to_string_dtype(movs_df.copy())), flows_df, verbose=False
+        )
+        result = classify(result, flow_schedule)
+
+        for column in ["Descripción", "Solicitud", "RemateID", "Actor"]:
+            self.assertEqual(result[column].dtype, STRING_DTYPE)
+        pd.testing.assert_frame_equal(_as_objects(result), _as_objects(expected))